@@ -193,6 +193,13 @@ class Projection(common.Projection):
             filtered_value = value[syn_obj.postsynaptic, syn_obj.presynaptic]
             setattr(syn_obj, name, filtered_value)
     
+    def _set_connection_values(self, values):
+        if isinstance(self.post, common.Assembly) or isinstance(self.pre, common.Assembly):
+            raise NotImplementedError
+        syn_obj = self._brian_synapses[0][0]
+        for name, value in values.items():
+            setattr(syn_obj, name, value)
+
     def _get_attributes_as_arrays(self, attribute_names, multiple_synapses='sum'):
         if isinstance(self.post, common.Assembly) or isinstance(self.pre, common.Assembly):
             raise NotImplementedError
@@ -209,6 +216,10 @@ class Projection(common.Projection):
         return values  # should put NaN where there is no connection?
 
     def _get_attributes_as_list(self, attribute_names):
+        values = numpy.array(self._get_attributes_as_columns(attribute_names))
+        return [tuple(x) for x in values.T]
+
+    def _get_attributes_as_columns(self, attribute_names):
         if isinstance(self.post, common.Assembly) or isinstance(self.pre, common.Assembly):
             raise NotImplementedError
         values = []
@@ -228,10 +239,8 @@ class Projection(common.Projection):
                 # this whole "get attributes" thing needs refactoring in all backends to properly use translation
                 ps.evaluate()
                 value = ps[name]
-            #value = value.tolist()
-            values.append(value)
-        a = numpy.array(values)
-        return [tuple(x) for x in a.T]
+            values.append(numpy.asarray(value))
+        return values
 
     def _set_tau_syn_for_tsodyks_markram(self):
         if isinstance(self.post, common.Assembly) or isinstance(self.pre, common.Assembly):
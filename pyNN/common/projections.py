@@ -9,17 +9,12 @@ backend-specific Projection classes.
 
 try:
     basestring
-    reduce
-    xrange
 except NameError:
     basestring = str
-    from functools import reduce
-    xrange = range
 import numpy
 import logging
-import operator
 from pyNN import recording, errors, models, core, descriptions
-from pyNN.parameters import ParameterSpace, LazyArray
+from pyNN.parameters import ParameterSpace, LazyArray, ConnectionValues
 from pyNN.space import Space
 from pyNN.standardmodels import StandardSynapseType
 from .populations import BasePopulation, Assembly
@@ -58,12 +53,14 @@ class Projection(object):
             TO DOCUMENT
     """
     _nProj = 0
+    # ufuncs used to combine the values of multiple connections between the
+    # same pair of neurons ('first' and 'last' are handled by sorting)
     MULTI_SYNAPSE_OPERATIONS = {
-        'last': lambda a, b: b,
-        'first': lambda a, b: a,
-        'sum': operator.iadd,
-        'min': min,
-        'max': max
+        'last': None,
+        'first': None,
+        'sum': numpy.add,
+        'min': numpy.minimum,
+        'max': numpy.maximum
     }
 
     def __init__(self, presynaptic_neurons, postsynaptic_neurons, connector,
@@ -155,28 +152,39 @@ class Projection(object):
                 (as returned by `get(format='array')`
             (4) a mapping function, which accepts a single float argument (the
                 distance between pre- and post-synaptic cells) and returns a single value.
+            (5) a list or 1D array of the same length as the number of local
+                connections, in the same order as the connections returned by
+                `get(format='list', gather=False)`
 
         Weights should be in nA for current-based and µS for conductance-based
         synapses. Delays should be in milliseconds.
 
         Note that where a projection contains multiple connections between a given pair
-        of neurons, all these connections will be set to the same value.
+        of neurons, all these connections will be set to the same value, unless
+        the values are given as a list or 1D array.
         """
         # should perhaps add a "distribute" argument, for symmetry with "gather" in get()
-
-        # Note: we have removed the option:
-        #      "a list/1D array of the same length as the number of local connections"
-        # because it was proving tricky to implement and was holding up the release.
-        # The plan is to add this option back at a later date.
-
-        attributes = self._value_list_to_array(attributes)
-        parameter_space = ParameterSpace(attributes,
-                                         self.synapse_type.get_schema(),
-                                         (self.pre.size, self.post.size))
-        parameter_space = self._handle_distance_expressions(parameter_space)
-        if isinstance(self.synapse_type, StandardSynapseType):
-            parameter_space = self.synapse_type.translate(parameter_space)
-        self._set_attributes(parameter_space)
+        connection_attributes = {}
+        for name, value in list(attributes.items()):
+            if isinstance(value, list) or (isinstance(value, numpy.ndarray) and value.ndim == 1):
+                connection_attributes[name] = attributes.pop(name)
+        if attributes:
+            parameter_space = ParameterSpace(attributes,
+                                             self.synapse_type.get_schema(),
+                                             (self.pre.size, self.post.size))
+            parameter_space = self._handle_distance_expressions(parameter_space)
+            if isinstance(self.synapse_type, StandardSynapseType):
+                parameter_space = self.synapse_type.translate(parameter_space)
+            self._set_attributes(parameter_space)
+        if connection_attributes:
+            # one value per local connection, so no communication between MPI nodes is needed
+            parameter_space = ParameterSpace(connection_attributes,
+                                             self.synapse_type.get_schema(),
+                                             (len(self),))
+            if isinstance(self.synapse_type, StandardSynapseType):
+                parameter_space = self.synapse_type.translate(parameter_space)
+            parameter_space.evaluate()
+            self._set_connection_values(parameter_space.as_dict())
 
     def initialize(self, **initial_values):
         """
@@ -203,15 +211,24 @@ class Projection(object):
             self._set_initial_value_array(variable, initial_value)
             self.initial_values[variable] = initial_value
 
-    def _value_list_to_array(self, attributes):
-        """Convert a list of connection parameters/attributes to a 2D array."""
-        connection_mask = ~numpy.isnan(self.get('weight', format='array', gather='all'))
-        for name, value in attributes.items():
-            if isinstance(value, list) or (isinstance(value, numpy.ndarray) and value.ndim == 1):
-                array_value = numpy.nan * numpy.ones(self.shape)
-                array_value[connection_mask] = value
-                attributes[name] = array_value
-        return attributes
+    def _set_connection_values(self, values):
+        """
+        Set connection attributes from a dict of arrays, each containing one
+        (native) value per local connection, in the order given by
+        `_get_attributes_as_list()`.
+
+        This implementation passes the values to `_set_attributes()` as a
+        sparse array (see :class:`~pyNN.parameters.ConnectionValues`).
+        Backends should override it to write the values directly into their
+        connection storage.
+        """
+        addresses = numpy.array(self._get_attributes_as_list(["presynaptic_index", "postsynaptic_index"]),
+                                dtype=int).reshape((-1, 2))
+        parameter_space = ParameterSpace(
+            dict((name, ConnectionValues(addresses[:, 0], addresses[:, 1], value, self.shape))
+                 for name, value in values.items()),
+            shape=self.shape)
+        self._set_attributes(parameter_space)
 
     def _handle_distance_expressions(self, parameter_space):
         # also index-based expressions
@@ -265,7 +282,7 @@ class Projection(object):
             name of the attributes whose values are wanted, or a list of such
             names.
         `format`:
-            "list" or "array".
+            "list", "array" or "columns".
         `gather`:
             if True, get connection information from all MPI nodes, otherwise
             only from connections that exist in this node.
@@ -302,6 +319,19 @@ class Projection(object):
         controlled by the `multiple_synapses` argument, which must be one of
         {'last', 'first', 'sum', 'min', 'max'}.
 
+        With columns format, returns a dict of 1D NumPy arrays, with one element
+        per connection, in the same order as for the list format. The keys are
+        "presynaptic_index" and "postsynaptic_index" (unless `with_address` is
+        False) and the names in `attribute_names`. This avoids creating any
+        Python objects per connection, so is much more efficient than the list
+        format for large projections. Example::
+
+            >>> columns = prj.get(["weight", "delay"], format="columns")
+            >>> columns["postsynaptic_index"][:5]
+            array([0, 1, 2, 3, 4])
+            >>> columns["weight"][:5]
+            array([ 0.34018925,  0.79907132,  0.61808418,  0.67581498,  0.71669067])
+
         Values will be expressed in the standard PyNN units (i.e. millivolts,
         nanoamps, milliseconds, microsiemens, nanofarads, event per second).
         """
@@ -310,18 +340,24 @@ class Projection(object):
             return_single = True
         else:
             return_single = False
+        column_names = list(attribute_names)
         if isinstance(self.synapse_type, StandardSynapseType):
             attribute_names = self.synapse_type.get_native_names(*attribute_names)
-        if format == 'list':
+        if format == 'columns':
+            names = list(attribute_names)
+            if with_address:
+                names = ["presynaptic_index", "postsynaptic_index"] + names
+                column_names = ["presynaptic_index", "postsynaptic_index"] + column_names
+            return dict(zip(column_names, self._get_columns(names, gather)))
+        elif format == 'list':
             names = list(attribute_names)
             if with_address:
                 names = ["presynaptic_index", "postsynaptic_index"] + names
-            values = self._get_attributes_as_list(names)
             if gather and self._simulator.state.num_processes > 1:
-                all_values = {self._simulator.state.mpi_rank: values}
-                all_values = recording.gather_dict(all_values, all=(gather == 'all'))
-                if gather == 'all' or self._simulator.state.mpi_rank == 0:
-                    values = reduce(operator.add, all_values.values())
+                columns = self._get_columns(names, gather)
+                values = list(zip(*[column.tolist() for column in columns]))
+            else:
+                values = self._get_attributes_as_list(names)
             if not with_address and return_single:
                 values = [val[0] for val in values]
             return values
@@ -331,18 +367,13 @@ class Projection(object):
             if gather and self._simulator.state.num_processes > 1:
                 # Node 0 is the only one creating a full connection matrix, and returning it (saving memory)
                 # Slaves nodes are returning list of connections, so this may be inconsistent...
-                names = list(attribute_names)
-                names = ["presynaptic_index", "postsynaptic_index"] + names
-                values = self._get_attributes_as_list(names)
-                all_values = {self._simulator.state.mpi_rank: values}
-                all_values = recording.gather_dict(all_values, all=(gather == 'all'))
+                names = ["presynaptic_index", "postsynaptic_index"] + list(attribute_names)
+                columns = self._get_columns(names, gather)
                 if gather == 'all' or self._simulator.state.mpi_rank == 0:
-                    tmp_values = reduce(operator.add, all_values.values())
-                    values = self._get_attributes_as_arrays(attribute_names,
-                                                            multiple_synapses=multiple_synapses)
-                    tmp_values = numpy.array(tmp_values)
-                    for i in xrange(len(values)):
-                        values[i][tmp_values[:, 0].astype(int), tmp_values[:, 1].astype(int)] = tmp_values[:, 2 + i]
+                    values = [self._connection_matrix(columns[0], columns[1], column, multiple_synapses)
+                              for column in columns[2:]]
+                else:
+                    values = list(zip(*[column.tolist() for column in columns]))
             else:
                 values = self._get_attributes_as_arrays(attribute_names,
                                                         multiple_synapses=multiple_synapses)
@@ -353,27 +384,72 @@ class Projection(object):
             else:
                 return values
         else:
-            raise Exception("format must be 'list' or 'array'")
+            raise Exception("format must be 'list', 'array' or 'columns'")
 
     def _get_attributes_as_list(self, names):
         return [c.as_tuple(*names) for c in self.connections]
 
+    def _get_attributes_as_columns(self, names):
+        """
+        Return a list of 1D arrays, one for each name in `names`, containing
+        the attribute values for the local connections, in the same order as
+        `_get_attributes_as_list()`.
+
+        Backends should override this to read directly from their connection
+        storage.
+        """
+        values = numpy.array(self._get_attributes_as_list(names), dtype=float).reshape((-1, len(names)))
+        return [values[:, i] for i in range(len(names))]
+
+    def _get_columns(self, names, gather=False):
+        """
+        Return a list of 1D arrays, one for each name in `names`, with indices
+        as integers and attribute values as floats.
+
+        If `gather` is set in a distributed simulation, the arrays from all MPI
+        nodes are gathered as typed buffers (see
+        :func:`~pyNN.recording.gather_columns`), without pickling.
+        """
+        columns = [column.astype(int) if name in ("presynaptic_index", "postsynaptic_index")
+                   else numpy.asarray(column, dtype=float)
+                   for name, column in zip(names, self._get_attributes_as_columns(names))]
+        if gather and self._simulator.state.num_processes > 1:
+            columns = recording.gather_columns(columns, all=(gather == 'all'))
+        return columns
+
     def _get_attributes_as_arrays(self, names, multiple_synapses='sum'):
-        multi_synapse_operation = Projection.MULTI_SYNAPSE_OPERATIONS[multiple_synapses]
-        all_values = []
-        for attribute_name in names:
-            values = numpy.nan * numpy.ones((self.pre.size, self.post.size))
-            if attribute_name[-1] == "s":  # weights --> weight, delays --> delay
-                attribute_name = attribute_name[:-1]
-            for c in self.connections:
-                value = getattr(c, attribute_name)
-                addr = (c.presynaptic_index, c.postsynaptic_index)
-                if numpy.isnan(values[addr]):
-                    values[addr] = value
-                else:
-                    values[addr] = multi_synapse_operation(values[addr], value)
-            all_values.append(values)
-        return all_values
+        names = [name[:-1] if name[-1] == "s" else name  # weights --> weight, delays --> delay
+                 for name in names]
+        columns = self._get_attributes_as_columns(["presynaptic_index", "postsynaptic_index"] + names)
+        return [self._connection_matrix(columns[0], columns[1], values, multiple_synapses)
+                for values in columns[2:]]
+
+    def _connection_matrix(self, presynaptic_indices, postsynaptic_indices, values,
+                           multiple_synapses='sum'):
+        """
+        Return a 2D array with the given connection values at the given
+        addresses, and NaN where there is no connection. Where there are
+        several connections between the same pair of neurons, their values are
+        combined according to `multiple_synapses` (see :meth:`get`).
+        """
+        shape = (self.pre.size, self.post.size)
+        addresses = numpy.ravel_multi_index((numpy.asarray(presynaptic_indices, dtype=int),
+                                             numpy.asarray(postsynaptic_indices, dtype=int)),
+                                            shape)
+        values = numpy.asarray(values, dtype=float)
+        matrix = numpy.empty((shape[0] * shape[1],))
+        matrix.fill(numpy.nan)
+        operation = Projection.MULTI_SYNAPSE_OPERATIONS[multiple_synapses]
+        if operation is None:
+            if multiple_synapses == 'last':
+                addresses = addresses[::-1]
+                values = values[::-1]
+            unique_addresses, first_index = numpy.unique(addresses, return_index=True)
+            matrix[unique_addresses] = values[first_index]
+        else:
+            matrix[addresses] = 0 if multiple_synapses == 'sum' else values
+            operation.at(matrix, addresses, values)
+        return matrix.reshape(shape)
 
     @deprecated("get('weight', format, gather)")
     def getWeights(self, format='list', gather=True):
@@ -392,6 +468,13 @@ class Projection(object):
         Print synaptic attributes (weights, delays, etc.) to file. In the array
         format, zeros are printed for non-existent connections.
 
+        In a distributed simulation, if `gather` is True the connections are
+        gathered to the root MPI node, which writes a single file. If `gather`
+        is False, each node writes the connections that exist on that node to
+        its own file, named by appending the MPI rank to the file name (e.g.
+        "connections.txt.3"), in the same format as `file`. These files can be
+        read back in parallel with ``FromFileConnector(filename, distributed=True)``.
+
         Values will be expressed in the standard PyNN units (i.e. millivolts,
         nanoamps, milliseconds, microsiemens, nanofarads, event per second).
         """
@@ -399,11 +482,26 @@ class Projection(object):
             attribute_names = self.synapse_type.get_parameter_names()
         if isinstance(file, basestring):
             file = recording.files.StandardTextFile(file, mode='wb')
-        all_values = self.get(attribute_names, format=format, gather=gather, with_address=with_address)
+        if isinstance(attribute_names, basestring):
+            attribute_names = [attribute_names]
+        if format == 'list':
+            # built from NumPy arrays, rather than from a list of tuples, to save memory
+            columns = self.get(attribute_names, format='columns', gather=gather, with_address=with_address)
+            names = list(attribute_names)
+            if with_address:
+                names = ["presynaptic_index", "postsynaptic_index"] + names
+            all_values = numpy.empty((columns[names[0]].size, len(names)))
+            for i, name in enumerate(names):
+                all_values[:, i] = columns[name]
+        else:
+            all_values = self.get(attribute_names, format=format, gather=gather, with_address=with_address)
         if format == 'array':
             all_values = [numpy.where(numpy.isnan(values), 0.0, values)
                           for values in all_values]
-        if self._simulator.state.mpi_rank == 0:
+        write_shards = not gather and self._simulator.state.num_processes > 1
+        if write_shards:
+            file.rename("%s.%d" % (file.name, self._simulator.state.mpi_rank))
+        if write_shards or self._simulator.state.mpi_rank == 0:
             metadata = {"columns": attribute_names}
             if with_address:
                 metadata["columns"] = ["i", "j"] + list(metadata["columns"])
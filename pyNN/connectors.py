@@ -11,9 +11,10 @@ for improved performance.
 from __future__ import division
 from pyNN.random import RandomDistribution, AbstractRNG, NumpyRNG, get_mpi_config
 from pyNN.core import IndexBasedExpression
-from pyNN import errors, descriptions
+from pyNN import errors, descriptions, recording
 from pyNN.recording import files
-from pyNN.parameters import LazyArray
+from pyNN.parameters import LazyArray, ParameterSpace
+from pyNN.space import Space
 from pyNN.standardmodels import StandardSynapseType
 import numpy
 try:
@@ -24,8 +25,13 @@ try:
     basestring
 except NameError:
     basestring = str
-from itertools import repeat
+from itertools import repeat, islice
 import logging
+import hashlib
+import multiprocessing
+import numbers
+import os
+import types
 from copy import copy, deepcopy
 
 from lazyarray import arccos, arcsin, arctan, arctan2, ceil, cos, cosh, exp, \
@@ -39,8 +45,34 @@ try:
 except ImportError:
     haveCSA = False
 
+try:
+    import scipy.sparse
+    have_scipy = True
+except ImportError:
+    have_scipy = False
+
 logger = logging.getLogger("PyNN")
 
+# Upper bound, in bytes, on the size of the blocks of the connection map (and of
+# the arrays of connection parameters) that are evaluated in one go when the
+# backend supports bulk connection.
+MAX_BLOCK_MEMORY = 64 * 1024 * 1024
+
+# Number of chunks of post-synaptic neurons into which connection generation
+# is split when using several worker processes (see `MapConnector.processes`).
+# This, rather than the number of processes, determines the random number
+# streams, so that the connections do not depend on the number of processes.
+N_CHUNKS = 64
+
+# Worker processes inherit the connection generation task by forking.
+try:
+    _fork_context = multiprocessing.get_context("fork")
+except AttributeError:  # Python 2
+    _fork_context = multiprocessing if hasattr(os, "fork") else None
+except ValueError:  # no fork on this platform
+    _fork_context = None
+_worker_task = None
+
 
 def _get_rng(rng):
     if isinstance(rng, AbstractRNG):
@@ -133,13 +165,72 @@ class Connector(object):
                    'parameters': self.get_parameters()}
         return descriptions.render(engine, template, context)
 
+    def _connect_from_list(self, projection, conn_list, column_names):
+        """
+        Create the connections in `conn_list` whose targets are local.
+
+        `conn_list` should be an array with one row per connection, containing
+        the pre- and post-synaptic indices followed by the values of the
+        synaptic parameters named in `column_names`.
+        """
+        if numpy.any(conn_list[:, 0] >= projection.pre.size):
+            raise errors.ConnectionError("source index out of range")
+        targets = conn_list[:, 1].astype(int)
+        # keep only the local connections, sorted by target. The sort is
+        # stable, so the connections to each target stay in list order.
+        local_rows = projection.post._mask_local[targets].nonzero()[0]
+        idx = local_rows[numpy.argsort(targets[local_rows], kind='mergesort')]
+        if idx.size == 0:
+            return
+        sources = conn_list[idx, 0].astype(int)
+        targets = targets[idx]
+        logger.debug("conn_list (local, sorted by target) = \n%s", conn_list[idx])
+
+        # translate and evaluate the parameters once for all connections
+        connection_parameters = deepcopy(projection.synapse_type.parameter_space)
+        connection_parameters.shape = (idx.size,)
+        for col, name in enumerate(column_names, 2):
+            connection_parameters.update(**{name: conn_list[idx, col]})
+        if isinstance(projection.synapse_type, StandardSynapseType):
+            connection_parameters = projection.synapse_type.translate(
+                                        connection_parameters)
+        connection_parameters.evaluate(simplify=True)
+        connection_parameters = dict(connection_parameters.items())
+
+        if hasattr(projection, "_connect_bulk"):
+            projection._connect_bulk(sources, targets, **connection_parameters)
+        else:
+            boundaries = numpy.flatnonzero(numpy.diff(targets)) + 1
+            left = numpy.hstack(([0], boundaries))
+            right = numpy.hstack((boundaries, [targets.size]))
+            for l, r in zip(left, right):
+                parameters = {}
+                for name, value in connection_parameters.items():
+                    if isinstance(value, numpy.ndarray) and value.shape:
+                        value = value[l:r]
+                    parameters[name] = value
+                projection._convergent_connect(sources[l:r], targets[l], **parameters)
+
 
 class MapConnector(Connector):
     """
     Abstract base class for Connectors based on connection maps, where a map is a 2D lazy array
     containing either the (boolean) connectivity matrix (aka adjacency matrix, connection set mask, etc.)
     or the values of a synaptic connection parameter.
+
+    When not running with MPI, connection generation may be spread over
+    several worker processes, by setting the `processes` attribute of the
+    connector to a number greater than one. The post-synaptic neurons are
+    divided into chunks, each of which uses its own stream of random numbers
+    derived from the random number generators' current state, so the results
+    are reproducible and do not depend on the number of processes, although
+    they differ from those obtained with a single process. This requires a
+    backend whose projections support bulk connection, random number
+    generators that support independent streams (:class:`NumpyRNG` or
+    :class:`GSLRNG`) and a platform that supports `fork()`; otherwise the
+    connections are generated in the main process.
     """
+    processes = 1
 
     def _standard_connect(self, projection, connection_map_generator, distance_map=None):
         """
@@ -158,14 +249,16 @@ class MapConnector(Connector):
         The `mask` argument, a boolean array, can be used to limit processing to just
         neurons which exist on the local MPI node.
 
+        If the projection has a `_connect_bulk()` method, the columns are grouped into
+        blocks and connections are created one block at a time; otherwise
+        `_convergent_connect()` is called once per post-synaptic neuron.
+
         todo: explain the argument `distance_map`.
         """
 
         column_indices = numpy.arange(projection.post.size)
 
-        if (projection.synapse_type.native_parameters.parallel_safe
-            or hasattr(self, "rng") and self.rng.parallel_safe):
-
+        if self._parallel_safe(projection):
             # If any of the synapse parameters are based on parallel-safe random number generators,
             # we need to iterate over all post-synaptic cells, so we can generate then
             # throw away the random numbers for the non-local nodes.
@@ -184,6 +277,18 @@ class MapConnector(Connector):
 
         parameter_space = self._parameters_from_synapse_type(projection, distance_map)
 
+        if self._use_processes(projection, parameter_space):
+            def make_blocks(mask):
+                return self._group_columns(projection, (column_indices[mask],
+                                                        repeat(True),
+                                                        connection_map_generator(mask)))
+            self._connect_in_processes(projection, make_blocks, parameter_space)
+            return
+        if hasattr(projection, "_connect_bulk"):
+            self._connect_blocks(projection, self._group_columns(projection, components),
+                                 parameter_space)
+            return
+
         # Loop over columns of the connection_map array (equivalent to looping over post-synaptic neurons)
         for count, (col, local, source_mask) in enumerate(izip(*components)):
             # `col`: index of the post-synaptic neuron
@@ -231,6 +336,248 @@ class MapConnector(Connector):
                     if self.callback:
                         self.callback(count / projection.post.local_size)
 
+    def _remove_self_connections(self, sources, col):
+        """
+        Filter an array of pre-synaptic indices, for post-synaptic neuron `col`
+        of a projection from a population to itself, according to
+        `allow_self_connections`.
+        """
+        if self.allow_self_connections == 'NoMutual':
+            return sources[sources > col]
+        else:
+            return sources[sources != col]
+
+    def _parallel_safe(self, projection):
+        return (projection.synapse_type.native_parameters.parallel_safe
+                or hasattr(self, "rng") and self.rng.parallel_safe)
+
+    def _random_access(self, projection):
+        """
+        Determine whether the connection map can be evaluated for just the
+        local post-synaptic neurons while staying parallel safe, i.e. whether
+        the connector's RNG can generate any part of its sequence directly
+        (see :class:`~pyNN.random.PhiloxRNG`) and the synaptic parameters do
+        not use a parallel-safe RNG.
+        """
+        return (getattr(getattr(self, "rng", None), "random_access", False)
+                and not projection.synapse_type.native_parameters.parallel_safe)
+
+    def _block_size(self, projection):
+        """Number of columns of the connection map to evaluate in one go."""
+        return max(1, MAX_BLOCK_MEMORY // (8 * max(projection.pre.size, 1)))
+
+    def _group_columns(self, projection, components):
+        """
+        Group the column-by-column output of a connection map generator (see
+        `_standard_connect()`) into blocks. Yields tuples
+        `(column_indices, presynaptic_indices, postsynaptic_indices)`.
+        """
+        max_columns = self._block_size(projection)
+        max_connections = MAX_BLOCK_MEMORY // 8
+        columns, sources = [], []
+        n_connections = 0
+        for col, local, source_mask in izip(*components):
+            source_mask = numpy.asarray(source_mask)
+            if source_mask.dtype == bool:
+                if source_mask.ndim == 0:  # connect to all/none
+                    source_mask = numpy.arange(projection.pre.size if source_mask else 0)
+                else:
+                    source_mask = source_mask.nonzero()[0]
+            columns.append(col)
+            sources.append(source_mask.astype(int))
+            n_connections += source_mask.size
+            if len(columns) >= max_columns or n_connections >= max_connections:
+                yield self._flatten_columns(columns, sources)
+                columns, sources = [], []
+                n_connections = 0
+        if columns:
+            yield self._flatten_columns(columns, sources)
+
+    def _flatten_columns(self, columns, sources):
+        columns = numpy.array(columns, dtype=int)
+        targets = numpy.repeat(columns, [s.size for s in sources])
+        return columns, numpy.concatenate(sources), targets
+
+    def _blocks_from_map(self, projection, connection_map, mask=None):
+        """
+        Evaluate a boolean connection map block by block. Yields tuples
+        `(column_indices, presynaptic_indices, postsynaptic_indices)`.
+        """
+        for columns, block in connection_map.by_column_block(self._block_size(projection), mask):
+            if isinstance(block, numpy.ndarray) and block.ndim == 2:
+                # transpose, so connections are ordered by post-synaptic index
+                col_positions, sources = block.T.nonzero()
+                targets = columns[col_positions]
+            elif block:
+                sources = numpy.tile(numpy.arange(projection.pre.size), columns.size)
+                targets = numpy.repeat(columns, projection.pre.size)
+            else:
+                sources = targets = numpy.array([], dtype=int)
+            yield columns, sources, targets
+
+    def _connect_blocks(self, projection, blocks, parameter_space):
+        """
+        Create connections block by block, with one call to the projection's
+        `_connect_bulk()` method per block.
+
+        `blocks` should be an iterable producing tuples
+        `(column_indices, presynaptic_indices, postsynaptic_indices)`, ordered
+        by post-synaptic index. Connections to post-synaptic neurons that are
+        not on the local MPI node are evaluated (so as to use up the
+        corresponding random numbers) but not created.
+        """
+        mask_local = projection.post._mask_local
+        n_columns = 0
+        for columns, sources, targets in blocks:
+            if sources.size > 0:
+                connection_parameters = self._block_parameters(parameter_space, sources, targets)
+                local = mask_local[targets]
+                if not local.all():
+                    sources = sources[local]
+                    targets = targets[local]
+                    for name, value in connection_parameters.items():
+                        if isinstance(value, numpy.ndarray) and value.shape:
+                            connection_parameters[name] = value[local]
+                if sources.size > 0:
+                    projection._connect_bulk(sources, targets, **connection_parameters)
+            if self.callback:
+                n_columns += mask_local[columns].sum()
+                self.callback(n_columns / projection.post.local_size)
+
+    def _block_parameters(self, parameter_space, sources, targets):
+        """
+        Evaluate the lazy arrays containing the synaptic parameters, only for
+        the connections `(sources, targets)`.
+        """
+        connection_parameters = {}
+        for name, map in parameter_space.items():
+            if map.is_homogeneous:
+                connection_parameters[name] = map.evaluate(simplify=True)
+            else:
+                connection_parameters[name] = map[sources, targets]
+        return connection_parameters
+
+    def _random_number_generators(self, parameter_space):
+        """
+        Return the random number generators used by the connector and by the
+        synaptic parameters.
+        """
+        rngs = []
+        values = list(vars(self).values()) + [map.base_value for name, map in parameter_space.items()]
+        for value in values:
+            if isinstance(value, RandomDistribution):
+                value = value.rng
+            if isinstance(value, AbstractRNG) and not any(value is rng for rng in rngs):
+                rngs.append(value)
+        return rngs
+
+    def _use_processes(self, projection, parameter_space):
+        """
+        Determine whether connections should be generated in several worker
+        processes (see `_connect_in_processes()`).
+        """
+        return (self.processes > 1
+                and _fork_context is not None
+                and projection._simulator.state.num_processes == 1
+                and hasattr(projection, "_connect_bulk")
+                and all(hasattr(rng, "_set_stream")
+                        for rng in self._random_number_generators(parameter_space)))
+
+    def _connect_in_processes(self, projection, make_blocks, parameter_space):
+        """
+        Generate the connections, and evaluate their parameters, for chunks of
+        post-synaptic neurons in a pool of `processes` worker processes, then
+        create them in this process, one block at a time.
+
+        `make_blocks(mask)` should return an iterable of blocks (see
+        `_connect_blocks()`) for the post-synaptic neurons selected by the
+        boolean array `mask`.
+        """
+        global _worker_task
+        rngs = self._random_number_generators(parameter_space)
+        keys = [rng._stream_key() for rng in rngs]
+        chunk_size = max(1, -(-projection.post.size // N_CHUNKS))
+        chunks = [numpy.arange(start, min(start + chunk_size, projection.post.size))
+                  for start in range(0, projection.post.size, chunk_size)]
+        _worker_task = (self, make_blocks, parameter_space, rngs, keys, projection.post.size)
+        pool = _fork_context.Pool(self.processes)
+        try:
+            n_columns = 0
+            for blocks in pool.imap(_generate_chunk, enumerate(chunks)):
+                for columns, sources, targets, connection_parameters in blocks:
+                    if sources.size > 0:
+                        projection._connect_bulk(sources, targets, **connection_parameters)
+                    if self.callback:
+                        n_columns += columns.size
+                        self.callback(n_columns / projection.post.size)
+            pool.close()
+        finally:
+            pool.terminate()
+            pool.join()
+            _worker_task = None
+
+    def _candidate_connection_map(self, projection, find_candidates, probability):
+        """
+        Return a connection map generator (see `_standard_connect()`) which
+        only evaluates the connection probability for candidate pairs of cells,
+        a block of post-synaptic cells at a time.
+
+        `find_candidates(columns)` should return arrays `(sources, targets)`
+        containing the candidate pairs for the post-synaptic cells with indices
+        `columns`, ordered by post-synaptic index. `probability(sources, targets)`
+        should return the connection probability for each pair.
+
+        Random numbers are drawn for every candidate pair, in column order,
+        whether or not the post-synaptic cell is local, so that with a
+        parallel-safe RNG the result does not depend on the number of MPI
+        processes.
+        """
+        block_size = self._block_size(projection)
+        check_self_connections = (projection.pre == projection.post
+                                  and self.allow_self_connections is not True)
+
+        def connection_map_generator(mask=None):
+            column_indices = numpy.arange(projection.post.size)
+            if mask is not None:
+                column_indices = column_indices[mask]
+            for start in range(0, column_indices.size, block_size):
+                columns = column_indices[start:start + block_size]
+                sources, targets = find_candidates(columns)
+                u = self.rng.next(sources.size, 'uniform', {'low': 0.0, 'high': 1.0},
+                                  mask_local=False)
+                connected = u < probability(sources, targets)
+                sources = sources[connected]
+                targets = targets[connected]
+                left = numpy.searchsorted(targets, columns, 'left')
+                right = numpy.searchsorted(targets, columns, 'right')
+                for col, l, r in zip(columns, left, right):
+                    col_sources = sources[l:r]
+                    if check_self_connections:
+                        col_sources = self._remove_self_connections(col_sources, col)
+                    yield col_sources
+        return connection_map_generator
+
+    def _connect_with_pairs(self, projection, sources, targets):
+        """
+        Create connections from the pre-synaptic neurons with indices `sources`
+        to the post-synaptic neurons with the corresponding indices `targets`.
+        """
+        # convert to compressed sparse column format
+        order = numpy.argsort(targets, kind='mergesort')
+        sources = numpy.asarray(sources, dtype=int)[order]
+        column_indptr = numpy.zeros((projection.post.size + 1,), dtype=int)
+        numpy.cumsum(numpy.bincount(numpy.asarray(targets, dtype=int),
+                                    minlength=projection.post.size),
+                     out=column_indptr[1:])
+
+        def build_source_masks(mask=None):
+            column_indices = numpy.arange(projection.post.size)
+            if mask is not None:
+                column_indices = column_indices[mask]
+            for col in column_indices:
+                yield sources[column_indptr[col]:column_indptr[col + 1]]
+        self._standard_connect(projection, build_source_masks)
+
     def _connect_with_map(self, projection, connection_map, distance_map=None):
         """
         Create connections according to a connection map.
@@ -245,7 +592,41 @@ class MapConnector(Connector):
                 TODO
         """
         logger.debug("Connecting %s using a connection map" % projection.label)
-        self._standard_connect(projection, connection_map.by_column, distance_map)
+        if hasattr(projection, "_connect_bulk"):
+            parameter_space = self._parameters_from_synapse_type(projection, distance_map)
+            if self._use_processes(projection, parameter_space):
+                self._connect_in_processes(
+                    projection,
+                    lambda mask: self._blocks_from_map(projection, connection_map, mask),
+                    parameter_space)
+                return
+            if self._parallel_safe(projection) and not self._random_access(projection):
+                mask = None
+            else:
+                mask = projection.post._mask_local
+            self._connect_blocks(projection,
+                                 self._blocks_from_map(projection, connection_map, mask),
+                                 parameter_space)
+        else:
+            self._standard_connect(projection, connection_map.by_column, distance_map)
+
+
+def _generate_chunk(args):
+    """
+    Generate the connections for one chunk of post-synaptic neurons, in a
+    worker process (see `MapConnector._connect_in_processes()`).
+    """
+    index, columns = args
+    connector, make_blocks, parameter_space, rngs, keys, size = _worker_task
+    for rng, key in zip(rngs, keys):
+        rng._set_stream(key, index)
+        # only the numbers for this chunk's columns should be drawn
+        rng.parallel_safe = False
+    mask = numpy.zeros((size,), dtype=bool)
+    mask[columns] = True
+    return [(block_columns, sources, targets,
+             connector._block_parameters(parameter_space, sources, targets))
+            for block_columns, sources, targets in make_blocks(mask)]
 
 
 class AllToAllConnector(MapConnector):
@@ -298,11 +679,18 @@ class FixedProbabilityConnector(MapConnector):
             or only to other neurons in the Population.
         `rng`:
             an :class:`RNG` instance used to evaluate whether connections exist
+        `sparse`:
+            if True, rather than drawing one random number for each possible
+            connection, draw the gaps between successive connections from a
+            geometric distribution, so that the number of random numbers drawn
+            is proportional to the number of connections. Recommended for small
+            values of `p_connect`. Note that the connections obtained are not
+            the same as with `sparse=False` for a given random seed.
     """
     parameter_names = ('allow_self_connections', 'p_connect')
 
     def __init__(self, p_connect, allow_self_connections=True,
-                 rng=None, safe=True, callback=None):
+                 rng=None, safe=True, callback=None, sparse=False):
         """
         Create a new connector.
         """
@@ -312,8 +700,12 @@ class FixedProbabilityConnector(MapConnector):
         self.p_connect = float(p_connect)
         assert 0 <= self.p_connect
         self.rng = _get_rng(rng)
+        self.sparse = sparse
 
     def connect(self, projection):
+        if self.sparse:
+            self._standard_connect(projection, self._sparse_connection_map(projection))
+            return
         random_map = LazyArray(RandomDistribution('uniform', (0, 1), rng=self.rng),
                                projection.shape)
         connection_map = random_map < self.p_connect
@@ -324,6 +716,62 @@ class FixedProbabilityConnector(MapConnector):
                 connection_map *= LazyArray(lambda i, j: i > j, shape=projection.shape)
         self._connect_with_map(projection, connection_map)
 
+    def _sparse_connection_map(self, projection):
+        """
+        Return a connection map generator (see `_standard_connect()`) which
+        produces, for each post-synaptic neuron, the indices of the
+        pre-synaptic neurons it should be connected to.
+
+        Columns are processed in blocks, and the random numbers for a block are
+        drawn whether or not it contains any local columns, so that with a
+        parallel-safe RNG the result does not depend on the number of MPI
+        processes.
+        """
+        n_pre = projection.pre.size
+        block_size = self._block_size(projection)
+        check_self_connections = (projection.pre == projection.post
+                                  and self.allow_self_connections is not True)
+
+        def connection_map_generator(mask=None):
+            column_indices = numpy.arange(projection.post.size)
+            if mask is not None:
+                column_indices = column_indices[mask]
+            for start in range(0, column_indices.size, block_size):
+                columns = column_indices[start:start + block_size]
+                positions = self._sample_positions(columns.size * n_pre)
+                bounds = numpy.searchsorted(positions, numpy.arange(columns.size + 1) * n_pre)
+                for k, col in enumerate(columns):
+                    sources = positions[bounds[k]:bounds[k + 1]] - k * n_pre
+                    if check_self_connections:
+                        sources = self._remove_self_connections(sources, col)
+                    yield sources
+        return connection_map_generator
+
+    def _sample_positions(self, size):
+        """
+        Return the sorted positions of the connections within a sequence of
+        `size` potential connections, each of which exists with probability
+        `p_connect`.
+        """
+        if self.p_connect <= 0 or size == 0:
+            return numpy.array([], dtype=int)
+        elif self.p_connect >= 1:
+            return numpy.arange(size)
+        log_q = numpy.log1p(-self.p_connect)
+        positions = []
+        last = -1
+        while last < size - 1:
+            # draw enough gaps to reach the end of the sequence most of the time
+            expected = (size - last - 1) * self.p_connect
+            n = int(expected + 3 * numpy.sqrt(expected)) + 1
+            u = self.rng.next(n, 'uniform', {'low': 0.0, 'high': 1.0}, mask_local=False)
+            gaps = numpy.floor(numpy.log1p(-u) / log_q)
+            new_positions = last + numpy.cumsum(gaps + 1)
+            positions.append(new_positions)
+            last = new_positions[-1]
+        positions = numpy.hstack(positions)
+        return positions[positions < size].astype(int)
+
 
 class DistanceDependentProbabilityConnector(MapConnector):
     """
@@ -341,11 +789,18 @@ class DistanceDependentProbabilityConnector(MapConnector):
             or only to other neurons in the Population.
         `rng`:
             an :class:`RNG` instance used to evaluate whether connections exist
+        `cutoff`:
+            if given, the connection probability is taken to be zero for
+            distances greater than `cutoff`, and only pairs of cells within
+            this distance of each other are considered (using a spatial index
+            if scipy is available). This makes building locally-connected
+            networks much faster. Note that the connections obtained are not
+            the same as with `cutoff=None` for a given random seed.
     """
     parameter_names = ('allow_self_connections', 'd_expression')
 
     def __init__(self, d_expression, allow_self_connections=True,
-                 rng=None, safe=True, callback=None):
+                 rng=None, safe=True, callback=None, cutoff=None):
         """
         Create a new connector.
         """
@@ -362,9 +817,14 @@ class DistanceDependentProbabilityConnector(MapConnector):
         self.allow_self_connections = allow_self_connections
         self.distance_function = eval("lambda d: %s" % self.d_expression)
         self.rng = _get_rng(rng)
+        self.cutoff = cutoff
 
     def connect(self, projection):
         distance_map = self._generate_distance_map(projection)
+        if self.cutoff is not None:
+            self._standard_connect(projection, self._cutoff_connection_map(projection),
+                                   distance_map)
+            return
         probability_map = self.distance_function(distance_map)
         random_map = LazyArray(RandomDistribution('uniform', (0, 1), rng=self.rng),
                                projection.shape)
@@ -376,6 +836,29 @@ class DistanceDependentProbabilityConnector(MapConnector):
                 connection_map *= LazyArray(lambda i, j: i > j, shape=projection.shape)
         self._connect_with_map(projection, connection_map, distance_map)
 
+    def _cutoff_connection_map(self, projection):
+        """
+        Return a connection map generator (see `_standard_connect()`) which
+        only evaluates the connection probability for pairs of cells within
+        `cutoff` of each other.
+        """
+        pre_positions = projection.pre.positions.T
+        post_positions = projection.post.positions.T
+
+        def find_candidates(columns):
+            candidates = projection.space.neighbours(pre_positions,
+                                                     post_positions[columns],
+                                                     self.cutoff)
+            sources = numpy.hstack(candidates + [numpy.array([], dtype=int)])
+            targets = numpy.repeat(columns, [c.size for c in candidates])
+            return sources, targets
+
+        def probability(sources, targets):
+            return self.distance_function(
+                projection.space.paired_distances(pre_positions[sources],
+                                                  post_positions[targets]))
+        return self._candidate_connection_map(projection, find_candidates, probability)
+
 
 class IndexBasedProbabilityConnector(MapConnector):
     """
@@ -394,11 +877,18 @@ class IndexBasedProbabilityConnector(MapConnector):
             or only to other neurons in the Population.
         `rng`:
             an :class:`RNG` instance used to evaluate whether connections exist
+        `max_offset`:
+            if given, the connection probability is taken to be zero for pairs
+            of cells whose indices differ by more than `max_offset`, and the
+            index expression is only evaluated for the other pairs (it is then
+            called with one-dimensional arrays of pre- and post-synaptic
+            indices). Note that the connections obtained are not the same as
+            with `max_offset=None` for a given random seed.
     """
     parameter_names = ('allow_self_connections', 'index_expression')
 
     def __init__(self, index_expression, allow_self_connections=True,
-                 rng=None, safe=True, callback=None):
+                 rng=None, safe=True, callback=None, max_offset=None):
         """
         Create a new connector.
         """
@@ -409,12 +899,19 @@ class IndexBasedProbabilityConnector(MapConnector):
         self.index_expression = index_expression
         self.allow_self_connections = allow_self_connections
         self.rng = _get_rng(rng)
+        self.max_offset = max_offset
 
     def connect(self, projection):
         # The index function is copied so as to avoid the connector being altered by the "connect"
         # function, which is probably unexpected behaviour.
         index_expression = copy(self.index_expression)
         index_expression.projection = projection
+        find_candidates = self._candidate_finder(projection)
+        if find_candidates is not None:
+            self._standard_connect(projection,
+                                   self._candidate_connection_map(projection, find_candidates,
+                                                                  index_expression))
+            return
         probability_map = LazyArray(index_expression, projection.shape)
         random_map = LazyArray(RandomDistribution('uniform', (0, 1), rng=self.rng),
                                projection.shape)
@@ -426,8 +923,52 @@ class IndexBasedProbabilityConnector(MapConnector):
                 connection_map *= LazyArray(lambda i, j: i > j, shape=projection.shape)
         self._connect_with_map(projection, connection_map)
 
+    def _candidate_finder(self, projection):
+        """
+        Return a function which finds the candidate pairs of cells for a block
+        of post-synaptic cells (see `_candidate_connection_map()`), or None if
+        all pairs are candidates.
+        """
+        if self.max_offset is None:
+            return None
+
+        def find_candidates(columns):
+            low = numpy.maximum(columns - self.max_offset, 0)
+            high = numpy.minimum(columns + self.max_offset + 1, projection.pre.size)
+            sizes = numpy.maximum(high - low, 0)
+            targets = numpy.repeat(columns, sizes)
+            starts = numpy.cumsum(sizes) - sizes
+            sources = numpy.repeat(low - starts, sizes) + numpy.arange(sizes.sum())
+            return sources, targets
+        return find_candidates
+
 
 class DisplacementDependentProbabilityConnector(IndexBasedProbabilityConnector):
+    """
+    For each pair of pre-post cells, the connection probability depends on the
+    displacement between them.
+
+    Takes any of the standard :class:`Connector` optional arguments and, in
+    addition:
+
+        `disp_function`:
+            a function that takes a 3xN numpy array of displacements (post-
+            synaptic position minus pre-synaptic position) and returns the
+            connection probability for each of them.
+        `allow_self_connections`:
+            if the connector is used to connect a Population to itself, this
+            flag determines whether a neuron is allowed to connect to itself,
+            or only to other neurons in the Population.
+        `rng`:
+            an :class:`RNG` instance used to evaluate whether connections exist
+        `max_displacement`:
+            if given, the connection probability is taken to be zero for
+            displacements longer than `max_displacement`, and `disp_function`
+            is only evaluated for pairs of cells closer than this (found
+            using a spatial index if scipy is available). Note that the
+            connections obtained are not the same as with
+            `max_displacement=None` for a given random seed.
+    """
 
     class DisplacementExpression(IndexBasedExpression):
         """
@@ -447,10 +988,27 @@ class DisplacementDependentProbabilityConnector(IndexBasedProbabilityConnector):
             return self._disp_function(disp)
 
     def __init__(self, disp_function, allow_self_connections=True,
-                 rng=None, safe=True, callback=None):
+                 rng=None, safe=True, callback=None, max_displacement=None):
         super(DisplacementDependentProbabilityConnector, self).__init__(
                 self.DisplacementExpression(disp_function),
                 allow_self_connections=allow_self_connections, rng=rng, callback=callback)
+        self.max_displacement = max_displacement
+
+    def _candidate_finder(self, projection):
+        if self.max_displacement is None:
+            return None
+        pre_positions = projection.pre.positions.T
+        post_positions = projection.post.positions.T
+        # displacements are not affected by the projection's space, so use a default one
+        space = Space()
+
+        def find_candidates(columns):
+            candidates = space.neighbours(pre_positions, post_positions[columns],
+                                          self.max_displacement)
+            sources = numpy.hstack(candidates + [numpy.array([], dtype=int)])
+            targets = numpy.repeat(columns, [c.size for c in candidates])
+            return sources, targets
+        return find_candidates
 
 
 class FromListConnector(Connector):
@@ -501,57 +1059,44 @@ class FromListConnector(Connector):
     def connect(self, projection):
         """Connect-up a Projection."""
         logger.debug("conn_list (original) = \n%s", self.conn_list)
+        self._check_column_names(projection)
+        self._connect_from_list(projection, self.conn_list, self.column_names)
+
+    def _check_column_names(self, projection):
         synapse_parameter_names = projection.synapse_type.get_parameter_names()
         for name in self.column_names:
             if name not in synapse_parameter_names:
                 raise ValueError("%s is not a valid parameter for %s" % (
                                  name, projection.synapse_type.__class__.__name__))
-        if numpy.any(self.conn_list[:, 0] >= projection.pre.size):
-            raise errors.ConnectionError("source index out of range")
-        # need to do some profiling, to figure out the best way to do this:
-        #  - order of sorting/filtering by local
-        #  - use numpy.unique, or just do in1d(self.conn_list)?
-        idx = numpy.argsort(self.conn_list[:, 1])
-        targets = numpy.unique(self.conn_list[:, 1]).astype(numpy.int)
-        local = numpy.in1d(targets,
-                           numpy.arange(projection.post.size)[projection.post._mask_local],
-                           assume_unique=True)
-        local_targets = targets[local]
-        self.conn_list = self.conn_list[idx]
-        left = numpy.searchsorted(self.conn_list[:, 1], local_targets, 'left')
-        right = numpy.searchsorted(self.conn_list[:, 1], local_targets, 'right')
-        logger.debug("idx = %s", idx)
-        logger.debug("targets = %s", targets)
-        logger.debug("local_targets = %s", local_targets)
-        logger.debug("conn_list (sorted by target) = \n%s", self.conn_list)
-        logger.debug("left = %s", left)
-        logger.debug("right = %s", right)
-
-        for tgt, l, r in zip(local_targets, left, right):
-            sources = self.conn_list[l:r, 0].astype(numpy.int)
-            connection_parameters = deepcopy(projection.synapse_type.parameter_space)
-            connection_parameters.shape = (r - l,)
-            for col, name in enumerate(self.column_names, 2):
-                connection_parameters.update(**{name: self.conn_list[l:r, col]})
-            if isinstance(projection.synapse_type, StandardSynapseType):
-                connection_parameters = projection.synapse_type.translate(
-                                            connection_parameters)
-            connection_parameters.evaluate()
-            projection._convergent_connect(sources, tgt, **connection_parameters)
-
 
 class FromFileConnector(FromListConnector):
     """
     Make connections according to a list read from a file.
 
+    The list is read in chunks of at most `chunk_size` rows, and only the
+    connections whose targets are local are kept, so the full list never needs
+    to be held in memory. For binary formats that support partial reads
+    (:class:`NumpyMemmapFile`, :class:`HDF5ArrayFile`) only one chunk at a time
+    is read from disk.
+
+    The names of the parameter columns are taken from the "columns" entry of
+    the file's metadata. Files without this entry must have two columns
+    (indices only) or four (indices, weight and delay).
+
     Arguments:
         `file`:
             either an open file object or the filename of a file containing a
             list of connections, in the format required by `FromListConnector`.
+            Filenames ending in ".npy" are opened as a :class:`NumpyMemmapFile`,
+            those ending in ".h5" as an :class:`HDF5ArrayFile`, others as a
+            :class:`StandardTextFile`.
         `distributed`:
             if this is True, then each node will read connections from a file
             called `filename.x`, where `x` is the MPI rank. This speeds up
             loading connections for distributed simulations.
+        `chunk_size`:
+            the maximum number of rows of the connection list to be read at
+            once.
         `safe`:
             if True, check that weights and delays have valid values. If False,
             this check is skipped.
@@ -560,27 +1105,58 @@ class FromFileConnector(FromListConnector):
     """
     parameter_names = ('filename', 'distributed')
 
-    def __init__(self, file, distributed=False, safe=True, callback=None):
+    def __init__(self, file, distributed=False, chunk_size=100000, safe=True, callback=None):
         """
         Create a new connector.
         """
         Connector.__init__(self, safe=safe, callback=callback)
         if isinstance(file, basestring):
-            file = files.StandardTextFile(file, mode='r')
+            if file.endswith(".npy"):
+                file = files.NumpyMemmapFile(file, mode='r')
+            elif file.endswith(".h5") and files.have_hdf5:
+                file = files.HDF5ArrayFile(file, mode='r')
+            else:
+                file = files.StandardTextFile(file, mode='r')
         self.file = file
         self.distributed = distributed
+        self.chunk_size = chunk_size
 
     def connect(self, projection):
         """Connect-up a Projection."""
         if self.distributed:
             self.file.rename("%s.%d" % (self.file.name,
                                         projection._simulator.state.mpi_rank))
-        self.column_names = self.file.get_metadata().get('columns', ('weight', 'delay'))
-        for ignore in "ij":
-            if ignore in self.column_names:
-                self.column_names.remove(ignore)
-        self.conn_list = self.file.read()
-        FromListConnector.connect(self, projection)
+        columns = self.file.get_metadata().get('columns')
+        if columns is None:
+            self.column_names = None  # determined from the number of columns, as for FromListConnector
+        else:
+            self.column_names = [name for name in columns if name not in ("i", "j")]
+            self._check_column_names(projection)
+        mask_local = projection.post._mask_local
+        for chunk in self.file.read_chunks(self.chunk_size):
+            chunk = numpy.atleast_2d(chunk)
+            if chunk.size == 0:
+                continue
+            if self.column_names is None:
+                if chunk.shape[1] == 2:
+                    self.column_names = []
+                elif chunk.shape[1] == 4:
+                    self.column_names = ['weight', 'delay']
+                else:
+                    raise errors.ConnectionError(
+                        "%s has %d columns, but no column names are given in its metadata" % (
+                            self.file.name, chunk.shape[1]))
+                self._check_column_names(projection)
+            if chunk.shape[1] != len(self.column_names) + 2:
+                raise errors.ConnectionError(
+                    "%s has %d parameter columns, but %d column names are given in its metadata" % (
+                        self.file.name, chunk.shape[1] - 2, len(self.column_names)))
+            targets = chunk[:, 1].astype(int)
+            if numpy.any(targets >= projection.post.size):
+                raise errors.ConnectionError("target index out of range")
+            # drop non-local connections before connecting, so that only
+            # one chunk of the list is in memory at any time
+            self._connect_from_list(projection, chunk[mask_local[targets]], self.column_names)
 
 
 class FixedNumberConnector(MapConnector):
@@ -597,7 +1173,7 @@ class FixedNumberConnector(MapConnector):
         self.allow_self_connections = allow_self_connections
         self.with_replacement = with_replacement
         self.n = n
-        if isinstance(n, int):
+        if isinstance(n, numbers.Integral):
             assert n >= 0
         elif isinstance(n, RandomDistribution):
             # weak check that the random distribution is ok
@@ -606,17 +1182,91 @@ class FixedNumberConnector(MapConnector):
             raise TypeError("n must be an integer or a RandomDistribution object")
         self.rng = _get_rng(rng)
 
-    def _rng_uniform_int_exclude(self, n, size, exclude):
-        res = self.rng.next(n, 'uniform_int', {"low": 0, "high": size}, mask_local=False)
-        logger.debug("RNG0 res=%s" % res)
-        idx = numpy.where(res == exclude)[0]
-        logger.debug("RNG1 exclude=%d, res=%s idx=%s" % (exclude, res, idx))
-        while idx.size > 0:
-            redrawn = self.rng.next(idx.size, 'uniform_int', {"low": 0, "high": size}, mask_local=False)
-            res[idx] = redrawn
-            idx = idx[numpy.where(res == exclude)[0]]
-            logger.debug("RNG2 exclude=%d redrawn=%s res=%s idx=%s" % (exclude, redrawn, res, idx))
-        return res
+    def _sample(self, size, counts, exclude=None):
+        """
+        For each element of `counts`, choose that number of integers from
+        `range(size)`, excluding the corresponding element of `exclude` if
+        given, with or without replacement according to `with_replacement`.
+
+        Returns the samples in compressed sparse row format, i.e. as a tuple
+        `(indptr, indices)` where the samples for element `i` of `counts` are
+        `indices[indptr[i]:indptr[i + 1]]`.
+        """
+        counts = numpy.asarray(counts, dtype=int)
+        indptr = numpy.zeros((counts.size + 1,), dtype=int)
+        numpy.cumsum(counts, out=indptr[1:])
+        available = size if exclude is None else size - 1
+        if indptr[-1] == 0:
+            return indptr, numpy.zeros((0,), dtype=int)
+        assert available > 0, "No cells available to connect to"
+        if self.with_replacement:
+            indices = self.rng.next(indptr[-1], 'uniform_int', {"low": 0, "high": available},
+                                    mask_local=False).astype(int)
+        else:
+            # where n > size, first all cells are connected one or more times,
+            # then the remainder are chosen randomly
+            full_sets, remainders = numpy.divmod(counts, available)
+            indices = numpy.empty((indptr[-1],), dtype=int)
+            for i in full_sets.nonzero()[0]:
+                indices[indptr[i]:indptr[i] + full_sets[i] * available] = numpy.tile(numpy.arange(available),
+                                                                                     full_sets[i])
+            remainder_indptr = numpy.zeros_like(indptr)
+            numpy.cumsum(remainders, out=remainder_indptr[1:])
+            remainder_starts = indptr[:-1] + full_sets * available
+            positions = (numpy.repeat(remainder_starts - remainder_indptr[:-1], remainders)
+                         + numpy.arange(remainder_indptr[-1]))
+            indices[positions] = self._sample_distinct(available, remainders, remainder_indptr)
+        if exclude is not None:
+            # sampling was from `size - 1` cells, so shift the indices to skip the excluded cell
+            indices[indices >= numpy.repeat(exclude, counts)] += 1
+        return indptr, indices
+
+    def _sample_distinct(self, size, counts, indptr):
+        """
+        For each element of `counts`, choose that number of distinct integers
+        from `range(size)`, using Floyd's algorithm, which needs only one
+        random number per integer chosen. The random numbers are drawn for all
+        the elements of `counts` at once, one step at a time, then collisions
+        are resolved within each sample, so the cost is proportional to the
+        number of integers chosen, not to `size`.
+
+        Returns the samples concatenated into a single array, with the samples
+        for element `i` at `indptr[i]:indptr[i + 1]`.
+        """
+        n_total = indptr[-1]
+        rows = numpy.repeat(numpy.arange(counts.size), counts)
+        steps = numpy.arange(n_total) - indptr[rows]
+        # at each step, choose t in [0, j]; if t has already been chosen, take j instead
+        j = size - counts[rows] + steps
+        t = numpy.empty((n_total,), dtype=int)
+        by_step = numpy.argsort(steps, kind='mergesort')
+        step_indptr = numpy.zeros((counts.max() + 1,), dtype=int)
+        numpy.cumsum(numpy.bincount(steps, minlength=counts.max()), out=step_indptr[1:])
+        for step in range(counts.max()):
+            positions = by_step[step_indptr[step]:step_indptr[step + 1]]
+            for j_value in numpy.unique(j[positions]):
+                same_j = positions[j[positions] == j_value]
+                t[same_j] = self.rng.next(same_j.size, 'uniform_int',
+                                          {"low": 0, "high": j_value + 1},
+                                          mask_local=False)
+        # t has already been chosen at an earlier step either if it was drawn
+        # at an earlier step, or if it is the j of an earlier step which
+        # itself had a collision.
+        keys = rows * size + t
+        order = numpy.argsort(keys, kind='mergesort')  # stable, so in order of step for equal keys
+        drawn_before = numpy.zeros((n_total,), dtype=bool)
+        drawn_before[order[1:]] = keys[order[1:]] == keys[order[:-1]]
+        earlier_step = t - (j - steps)
+        candidates = numpy.flatnonzero((earlier_step >= 0) & (earlier_step < steps) & ~drawn_before)
+        earlier_positions = candidates - steps[candidates] + earlier_step[candidates]
+        collision = drawn_before.copy()
+        while True:  # each pass follows chains of collisions one step further back
+            updated = drawn_before.copy()
+            updated[candidates] |= collision[earlier_positions]
+            if (updated == collision).all():
+                break
+            collision = updated
+        return numpy.where(collision, j, t)
 
 
 class FixedNumberPostConnector(FixedNumberConnector):
@@ -658,43 +1308,35 @@ class FixedNumberPostConnector(FixedNumberConnector):
             are created.
     """
 
-    def _get_num_post(self):
-        if isinstance(self.n, int):
-            n_post = self.n
+    def _get_num_post(self, size):
+        if isinstance(self.n, numbers.Integral):
+            n_post = numpy.repeat(self.n, size)
         else:
-            n_post = self.n.next()
+            n_post = self.n.next(size)
         return n_post
 
     def connect(self, projection):
-        connections = [[] for i in range(projection.post.size)]
-        for source_index in range(projection.pre.size):
-            n = self._get_num_post()
-            if self.with_replacement:
-                if not self.allow_self_connections and projection.pre == projection.post:
-                    targets = self._rng_uniform_int_exclude(n, projection.post.size, source_index)
-                else:
-                    targets = self.rng.next(n, 'uniform_int', {"low": 0, "high": projection.post.size}, mask_local=False)
-            else:
-                all_cells = numpy.arange(projection.post.size)
-                if not self.allow_self_connections and projection.pre == projection.post:
-                    all_cells = all_cells[all_cells != source_index]
-                full_sets = n // all_cells.size
-                remainder = n % all_cells.size
-                target_sets = []
-                if full_sets > 0:
-                    target_sets = [all_cells] * full_sets
-                if remainder > 0:
-                    target_sets.append(self.rng.permutation(all_cells)[:remainder])
-                targets = numpy.hstack(target_sets)
-            assert targets.size == n
-            for target_index in targets:
-                connections[target_index].append(source_index)
+        if not self.allow_self_connections and projection.pre == projection.post:
+            exclude = numpy.arange(projection.pre.size)
+        else:
+            exclude = None
+        n_post = self._get_num_post(projection.pre.size)
+        indptr, targets = self._sample(projection.post.size, n_post, exclude)
+        # convert from one row per pre-synaptic cell to one column per
+        # post-synaptic cell
+        sources = numpy.repeat(numpy.arange(projection.pre.size), n_post.astype(int))
+        order = numpy.argsort(targets, kind='mergesort')
+        sources = sources[order]
+        column_indptr = numpy.zeros((projection.post.size + 1,), dtype=int)
+        numpy.cumsum(numpy.bincount(targets, minlength=projection.post.size),
+                     out=column_indptr[1:])
 
         def build_source_masks(mask=None):
-            if mask is None:
-                return [numpy.array(x) for x in connections]
-            else:
-                return [numpy.array(x) for x in numpy.array(connections)[mask]]
+            column_indices = numpy.arange(projection.post.size)
+            if mask is not None:
+                column_indices = column_indices[mask]
+            for col in column_indices:
+                yield sources[column_indptr[col]:column_indptr[col + 1]]
         self._standard_connect(projection, build_source_masks)
 
 
@@ -738,11 +1380,11 @@ class FixedNumberPreConnector(FixedNumberConnector):
     """
 
     def _get_num_pre(self, size, mask=None):
-        if isinstance(self.n, int):
+        if isinstance(self.n, numbers.Integral):
             if mask is None:
-                n_pre = repeat(self.n, size)
+                n_pre = numpy.repeat(self.n, size)
             else:
-                n_pre = repeat(self.n, mask.sum())
+                n_pre = numpy.repeat(self.n, mask.sum())
         else:
             if mask is None:
                 n_pre = self.n.next(size)
@@ -754,67 +1396,18 @@ class FixedNumberPreConnector(FixedNumberConnector):
         return n_pre
 
     def connect(self, projection):
-        if self.with_replacement:
-            if self.allow_self_connections or projection.pre != projection.post:
-                def build_source_masks(mask=None):
-                    n_pre = self._get_num_pre(projection.post.size, mask)
-                    for n in n_pre:
-                        sources = self.rng.next(n, 'uniform_int', {"low": 0, "high": projection.pre.size}, mask_local=False)
-                        assert sources.size == n
-                        yield sources
-            else:
-                def build_source_masks(mask=None):
-                    n_pre = self._get_num_pre(projection.post.size, mask)
-                    if self.rng.parallel_safe or mask is None:
-                        for i, n in enumerate(n_pre):
-                            sources = self._rng_uniform_int_exclude(n, projection.pre.size, i)
-                            assert sources.size == n
-                            yield sources
-                    else:
-                        # TODO: use mask to obtain indices i
-                        raise NotImplementedError("allow_self_connections=False currently requires a parallel safe RNG.")
-        else:
-            if self.allow_self_connections or projection.pre != projection.post:
-                def build_source_masks(mask=None):
-                    # where n > projection.pre.size, first all pre-synaptic cells
-                    # are connected one or more times, then the remainder
-                    # are chosen randomly
-                    n_pre = self._get_num_pre(projection.post.size, mask)
-                    all_cells = numpy.arange(projection.pre.size)
-                    for n in n_pre:
-                        full_sets = n // projection.pre.size
-                        remainder = n % projection.pre.size
-                        source_sets = []
-                        if full_sets > 0:
-                            source_sets = [all_cells] * full_sets
-                        if remainder > 0:
-                            source_sets.append(self.rng.permutation(all_cells)[:remainder])
-                        sources = numpy.hstack(source_sets)
-                        assert sources.size == n
-                        yield sources
+        def build_source_masks(mask=None):
+            column_indices = numpy.arange(projection.post.size)
+            if mask is not None:
+                column_indices = column_indices[mask]
+            if not self.allow_self_connections and projection.pre == projection.post:
+                exclude = column_indices
             else:
-                def build_source_masks(mask=None):
-                    # where n > projection.pre.size, first all pre-synaptic cells
-                    # are connected one or more times, then the remainder
-                    # are chosen randomly
-                    n_pre = self._get_num_pre(projection.post.size, mask)
-                    all_cells = numpy.arange(projection.pre.size)
-                    if self.rng.parallel_safe or mask is None:
-                        for i, n in enumerate(n_pre):
-                            full_sets = n // (projection.pre.size - 1)
-                            remainder = n % (projection.pre.size - 1)
-                            allowed_cells = all_cells[all_cells != i]
-                            source_sets = []
-                            if full_sets > 0:
-                                source_sets = [allowed_cells] * full_sets
-                            if remainder > 0:
-                                source_sets.append(self.rng.permutation(allowed_cells)[:remainder])
-                            sources = numpy.hstack(source_sets)
-                            assert sources.size == n
-                            yield sources
-                    else:
-                        raise NotImplementedError("allow_self_connections=False currently requires a parallel safe RNG.")
-
+                exclude = None
+            n_pre = self._get_num_pre(projection.post.size, mask)
+            indptr, sources = self._sample(projection.pre.size, n_pre, exclude)
+            for k in range(column_indices.size):
+                yield sources[indptr[k]:indptr[k + 1]]
         self._standard_connect(projection, build_source_masks)
 
 
@@ -834,10 +1427,16 @@ class OneToOneConnector(MapConnector):
         self._connect_with_map(projection, connection_map)
 
 
-class SmallWorldConnector(Connector):
+class SmallWorldConnector(MapConnector):
     """
     Connect cells so as to create a small-world network.
 
+    Each pre-synaptic neuron is first connected to all the post-synaptic
+    neurons within distance `degree` (as calculated using the projection's
+    :class:`Space`). Each of these connections is then rewired with
+    probability `rewiring`, i.e. its post-synaptic neuron is replaced by one
+    chosen at random from the whole post-synaptic population.
+
     Takes any of the standard :class:`Connector` optional arguments and, in
     addition:
 
@@ -851,6 +1450,8 @@ class SmallWorldConnector(Connector):
             or only to other neurons in the Population.
         `n_connections`:
             if specified, the number of efferent synaptic connections per neuron.
+            These are chosen at random from the neurons within distance
+            `degree` (all of them are used if there are fewer).
         `rng`:
             an :class:`RNG` instance used to evaluate which connections
             are created.
@@ -865,6 +1466,7 @@ class SmallWorldConnector(Connector):
         Connector.__init__(self, safe, callback)
         assert 0 <= rewiring <= 1
         assert isinstance(allow_self_connections, bool) or allow_self_connections == 'NoMutual'
+        self.degree = degree
         self.rewiring = rewiring
         self.d_expression = "d < %g" % degree
         self.allow_self_connections = allow_self_connections
@@ -873,7 +1475,104 @@ class SmallWorldConnector(Connector):
 
     def connect(self, projection):
         """Connect-up a Projection."""
-        raise NotImplementedError
+        state = projection._simulator.state
+        if state.num_processes > 1 and not self.rng.parallel_safe:
+            # the RNGs are not the same on all processes, so the connections
+            # are generated on the first one only, and sent to the others
+            if state.mpi_rank == recording.MPI_ROOT:
+                sources, targets = self._generate_connections(projection)
+            else:
+                sources = targets = numpy.zeros((0,), dtype=int)
+            sources, targets = recording.broadcast_columns([sources, targets])
+        else:
+            sources, targets = self._generate_connections(projection)
+        self._connect_with_pairs(projection, sources, targets)
+
+    def _generate_connections(self, projection):
+        """
+        Return arrays of pre- and post-synaptic indices for all the
+        connections, on all MPI nodes.
+        """
+        sources, targets = self._lattice_connections(projection)
+        if self.n_connections is not None:
+            sources, targets = self._select_connections(sources, targets)
+        targets = self._rewire(projection, sources, targets)
+        return sources.astype(int), targets.astype(int)
+
+    def _lattice_connections(self, projection):
+        """
+        Return arrays of pre- and post-synaptic indices for all pairs of
+        neurons closer than `degree`, ordered by pre-synaptic index.
+        """
+        pre_positions = projection.pre.positions.T
+        post_positions = projection.post.positions.T
+        sources, targets = [], []
+        # find the neighbours using a spatial index, a block of post-synaptic
+        # neurons at a time, allowing for the overhead of one array of
+        # neighbours per post-synaptic neuron
+        block_size = MAX_BLOCK_MEMORY // 64
+        for start in range(0, projection.post.size, block_size):
+            stop = min(start + block_size, projection.post.size)
+            neighbours = projection.space.neighbours(pre_positions, post_positions[start:stop],
+                                                     self.degree)
+            block_sources = numpy.hstack(neighbours + [numpy.zeros((0,), dtype=int)])
+            block_targets = numpy.repeat(numpy.arange(start, stop), [n.size for n in neighbours])
+            within = projection.space.paired_distances(pre_positions[block_sources],
+                                                       post_positions[block_targets]) < self.degree
+            sources.append(block_sources[within])
+            targets.append(block_targets[within])
+        sources = numpy.hstack(sources + [numpy.zeros((0,), dtype=int)]).astype(int)
+        targets = numpy.hstack(targets + [numpy.zeros((0,), dtype=int)]).astype(int)
+        if projection.pre == projection.post:
+            if self.allow_self_connections == 'NoMutual':
+                keep = sources > targets
+            elif not self.allow_self_connections:
+                keep = sources != targets
+            else:
+                keep = slice(None)
+            sources, targets = sources[keep], targets[keep]
+        order = numpy.argsort(sources, kind='mergesort')
+        return sources[order], targets[order]
+
+    def _select_connections(self, sources, targets):
+        """
+        Keep at most `n_connections` connections per pre-synaptic neuron,
+        chosen at random. `sources` must be sorted.
+        """
+        keys = self.rng.next(sources.size, 'uniform', {'low': 0.0, 'high': 1.0}, mask_local=False)
+        order = numpy.lexsort((keys, sources))
+        sources, targets = sources[order], targets[order]
+        first = numpy.searchsorted(sources, sources, 'left')
+        keep = numpy.arange(sources.size) - first < self.n_connections
+        return sources[keep], targets[keep]
+
+    def _rewire(self, projection, sources, targets):
+        """
+        Replace each post-synaptic index in `targets` by a random one with
+        probability `rewiring`, and return the new array of targets.
+        """
+        rewired = self.rng.next(sources.size, 'uniform', {'low': 0.0, 'high': 1.0},
+                                mask_local=False) < self.rewiring
+        n_rewired = rewired.sum()
+        if n_rewired == 0:
+            return targets
+        rewired_sources = sources[rewired]
+        # the number of possible new targets for each rewired connection
+        if projection.pre != projection.post or self.allow_self_connections is True:
+            n_choices = numpy.repeat(projection.post.size, n_rewired)
+        elif self.allow_self_connections == 'NoMutual':
+            n_choices = rewired_sources
+        else:
+            n_choices = numpy.repeat(projection.post.size - 1, n_rewired)
+        u = self.rng.next(n_rewired, 'uniform', {'low': 0.0, 'high': 1.0}, mask_local=False)
+        new_targets = numpy.minimum(numpy.floor(u * n_choices), n_choices - 1).astype(int)
+        if projection.pre == projection.post and self.allow_self_connections is False:
+            # skip over the source's own index
+            new_targets[new_targets >= rewired_sources] += 1
+        targets = targets.copy()
+        possible = n_choices > 0
+        targets[rewired.nonzero()[0][possible]] = new_targets[possible]
+        return targets
 
 
 class CSAConnector(MapConnector):
@@ -904,22 +1603,76 @@ class CSAConnector(MapConnector):
 
     def connect(self, projection):
         """Connect-up a Projection."""
-        # Cut out finite part
-        c = csa.cross((0, projection.pre.size - 1), (0, projection.post.size - 1)) * self.cset  # can't we cut out just the columns we want?
-
         if csa.arity(self.cset) == 2:
-            # Connection-set with arity 2
-            for (i, j, weight, delay) in c:
-                projection._convergent_connect([projection.pre[i]], projection.post[j], weight, delay)
+            # Connection-set with arity 2: the weights and delays come from the connection set
+            mask_local = projection.post._mask_local
+            for conn_list in self._column_blocks(projection):
+                conn_list = conn_list[mask_local[conn_list[:, 1].astype(int)]]
+                if conn_list.size > 0:
+                    self._connect_from_list(projection, conn_list, ('weight', 'delay'))
         elif csa.arity(self.cset) == 0:
-            # inefficient implementation as a starting point
-            connection_map = numpy.zeros((projection.pre.size, projection.post.size), dtype=bool)
-            for addr in c:
-                connection_map[addr] = True
-            self._connect_with_map(projection, LazyArray(connection_map))
+            def connection_map_generator(mask=None):
+                column_indices = numpy.arange(projection.post.size)
+                if mask is not None:
+                    column_indices = column_indices[mask]
+                start = 0
+                for conn_list in self._column_blocks(projection):
+                    sources = conn_list[:, 0].astype(int)
+                    targets = conn_list[:, 1].astype(int)
+                    stop = numpy.searchsorted(column_indices, targets[-1], 'right')
+                    columns = column_indices[start:stop]
+                    left = numpy.searchsorted(targets, columns, 'left')
+                    right = numpy.searchsorted(targets, columns, 'right')
+                    for l, r in zip(left, right):
+                        yield sources[l:r]
+                    start = stop
+                for col in column_indices[start:]:
+                    yield numpy.zeros((0,), dtype=int)
+            self._standard_connect(projection, connection_map_generator)
         else:
             raise NotImplementedError
 
+    def _column_blocks(self, projection):
+        """
+        Iterate over the connections in the finite part of the connection set,
+        producing arrays with one row per connection, `(i, j)` or
+        `(i, j, weight, delay)`. Each array contains complete columns, in order,
+        and its size is bounded by `MAX_BLOCK_MEMORY` unless a single column
+        is larger than this.
+
+        Connection sets are expected to produce their connections column by
+        column. If they do not, connections are sorted by column within each
+        block. A connection to a column which has already been produced in an
+        earlier block raises a `ConnectionError`.
+        """
+        # Cut out finite part. We do not cut out only the local columns, since
+        # some masks (e.g. full - oneToOne) give no connections in a region
+        # which does not intersect the diagonal.
+        c = csa.cross((0, projection.pre.size - 1), (0, projection.post.size - 1)) * self.cset
+        n_fields = 2 + csa.arity(self.cset)
+        rows_per_block = max(1, MAX_BLOCK_MEMORY // (8 * n_fields))
+        connections = iter(c)
+        remainder = numpy.zeros((0, n_fields))
+        last_column = None  # the last column produced
+        while True:
+            block = numpy.array(list(islice(connections, rows_per_block))).reshape((-1, n_fields))
+            if block.size == 0:
+                break
+            block = numpy.vstack((remainder, block))
+            if (numpy.diff(block[:, 1]) < 0).any():
+                block = block[numpy.argsort(block[:, 1], kind='mergesort')]
+            if last_column is not None and block[0, 1] <= last_column:
+                raise errors.ConnectionError(
+                    "The connection set does not produce its connections column by column")
+            # hold back the last column, which may continue in the next block
+            split = numpy.searchsorted(block[:, 1], block[-1, 1], 'left')
+            if split > 0:
+                yield block[:split]
+                last_column = block[split - 1, 1]
+            remainder = block[split:]
+        if remainder.size > 0:
+            yield remainder
+
 
 class CloneConnector(MapConnector):
     """
@@ -945,9 +1698,29 @@ class CloneConnector(MapConnector):
                                          .format(self.reference_projection.pre,
                                                  self.reference_projection.post,
                                                  projection.pre, projection.post))
-        connection_map = LazyArray(~numpy.isnan(self.reference_projection.get(['weight'], 'array',
-                                                                              gather='all')[0]))
-        self._connect_with_map(projection, connection_map)
+        connections = self._reference_connections(projection)
+        self._connect_with_pairs(projection, connections[:, 0], connections[:, 1])
+
+    def _reference_connections(self, projection):
+        """
+        Return the (pre-synaptic index, post-synaptic index) pairs of the
+        connections in the reference projection, as an array with two columns.
+
+        Since the two projections have the same post-synaptic population, only
+        the local connections are needed, unless the synaptic parameters use
+        parallel-safe random numbers, in which case connections on all MPI
+        nodes are needed to draw the same random numbers everywhere.
+        """
+        connections = numpy.array(
+            self.reference_projection._get_attributes_as_list(["presynaptic_index",
+                                                               "postsynaptic_index"]),
+            dtype=int).reshape((-1, 2))
+        if self._parallel_safe(projection) and projection._simulator.state.num_processes > 1:
+            all_connections = recording.gather_dict(
+                {projection._simulator.state.mpi_rank: connections}, all=True)
+            connections = numpy.vstack([all_connections[rank]
+                                        for rank in sorted(all_connections)])
+        return connections
 
 
 class ArrayConnector(MapConnector):
@@ -955,22 +1728,104 @@ class ArrayConnector(MapConnector):
     Provide an explicit boolean connection matrix, with shape (m, n) where m is
     the size of the presynaptic population and n that of the postsynaptic
     population.
+
+    The matrix may be a dense NumPy array or a :mod:`scipy.sparse` matrix (of
+    any format), in which case each stored non-zero element gives one connection.
+
+    Takes any of the standard :class:`Connector` optional arguments and, in
+    addition:
+
+        `parameters`:
+            an optional dict containing, for synaptic parameters such as
+            'weight' or 'delay', an (m, n) array or sparse matrix giving the
+            value for each connection. These values replace those given by the
+            synapse type.
     """
     parameter_names = ('array',)
 
-    def __init__(self, array, safe=True, callback=None):
+    def __init__(self, array, parameters=None, safe=True, callback=None):
         """
         Create a new connector.
         """
         Connector.__init__(self, safe, callback)
         self.array = array
+        self.parameters = parameters or {}
 
     def connect(self, projection):
-        connection_map = LazyArray(self.array, projection.shape)
-        self._connect_with_map(projection, connection_map)
+        if have_scipy and scipy.sparse.issparse(self.array):
+            array = self.array.tocoo(copy=True)  # canonicalising works in place
+            array.sum_duplicates()
+            array.eliminate_zeros()
+            self._connect_with_pairs(projection, array.row, array.col)
+        else:
+            connection_map = LazyArray(self.array, projection.shape)
+            self._connect_with_map(projection, connection_map)
+
+    def _parameters_from_synapse_type(self, projection, distance_map=None):
+        parameter_space = MapConnector._parameters_from_synapse_type(self, projection, distance_map)
+        if self.parameters:
+            synapse_type = projection.synapse_type
+            values = ParameterSpace(dict((name, _MatrixValues(matrix))
+                                         for name, matrix in self.parameters.items()),
+                                    schema=synapse_type.get_schema(),
+                                    shape=parameter_space.shape)
+            if isinstance(synapse_type, StandardSynapseType):
+                values = synapse_type.translate(values)
+            for name, value in values.items():
+                parameter_space[name] = value
+        return parameter_space
+
+
+class _MatrixValues(IndexBasedExpression):
+    """
+    Look up the parameter values for connections in a dense array or sparse
+    matrix with shape (m, n).
+    """
+
+    def __init__(self, matrix):
+        if have_scipy and scipy.sparse.issparse(matrix):
+            matrix = matrix.tocsr()
+        self.matrix = matrix
+
+    def __deepcopy__(self, memo):
+        # the matrix is never modified, so there is no need to copy it
+        return _MatrixValues(self.matrix)
+
+    def __call__(self, i, j):
+        i, j = numpy.broadcast_arrays(i, j)
+        if have_scipy and scipy.sparse.issparse(self.matrix):
+            return numpy.asarray(self.matrix[i.ravel(), j.ravel()]).reshape(i.shape)
+        else:
+            return numpy.asarray(self.matrix)[i, j]
 
 
 class FixedTotalNumberConnector(FixedNumberConnector):
+    """
+    Create exactly `n` connections between the pre- and post-synaptic
+    populations, choosing the pre- and post-synaptic neurons at random.
+
+    With a parallel-safe random number generator, the connections are the same
+    whatever the number of MPI processes. Otherwise, the total number is split
+    between the processes according to the number of possible connections
+    to local neurons, and each process chooses its own connections.
+
+    Takes any of the standard :class:`Connector` optional arguments and, in
+    addition:
+
+        `n`:
+            either a positive integer, or a `RandomDistribution` that produces
+            positive integers, giving the total number of connections.
+        `with_replacement`:
+            if True, the same pair of neurons may be connected more than once.
+            If False, each pair of neurons is connected at most once.
+        `allow_self_connections`:
+            if the connector is used to connect a Population to itself, this
+            flag determines whether a neuron is allowed to connect to itself,
+            or only to other neurons in the Population.
+        `rng`:
+            an :class:`RNG` instance used to evaluate which connections
+            are created.
+    """
     parameter_names = ('allow_self_connections', 'n')
 
     def __init__(self, n, allow_self_connections=True, with_replacement=True,
@@ -983,7 +1838,7 @@ class FixedTotalNumberConnector(FixedNumberConnector):
         self.allow_self_connections = allow_self_connections
         self.with_replacement = with_replacement
         self.n = n
-        if isinstance(n, int):
+        if isinstance(n, numbers.Integral):
             assert n >= 0
         elif isinstance(n, RandomDistribution):
             # weak check that the random distribution is ok
@@ -993,44 +1848,364 @@ class FixedTotalNumberConnector(FixedNumberConnector):
         self.rng = _get_rng(rng)
 
     def connect(self, projection):
-        # This implementation is not "parallel safe" for random numbers.
-        # todo: support the `parallel_safe` flag.
-
-        # Determine number of processes and current rank
         rank = projection._simulator.state.mpi_rank
         num_processes = projection._simulator.state.num_processes
+        if isinstance(self.n, numbers.Integral):
+            n = self.n
+        else:
+            n = int(self.n.next())
+        exclude_self = not self.allow_self_connections and projection.pre == projection.post
+        n_available = projection.pre.size - int(exclude_self)
+        mask_local = projection.post._mask_local
+
+        if self.rng.parallel_safe or num_processes == 1:
+            # All processes draw the same connections, and each keeps those
+            # whose targets are local, so the result does not depend on the
+            # number of processes.
+            sources, targets = self._draw_connections(n, n_available, exclude_self,
+                                                      numpy.arange(projection.post.size),
+                                                      mask_local)
+        else:
+            # Split the connections between the processes according to the
+            # number of potential connections on each process, then each
+            # process draws only its own connections.
+            local_columns = numpy.arange(projection.post.size)[mask_local]
+            all_pair_counts = recording.gather_dict({rank: n_available * local_columns.size},
+                                                    all=True)
+            pair_counts = numpy.array([all_pair_counts[k] for k in range(num_processes)])
+            if not self.with_replacement and n > pair_counts.sum():
+                raise errors.ConnectionError(
+                    "Cannot create %d connections without replacement: only %d are possible" % (
+                        n, pair_counts.sum()))
+            num_connections = numpy.zeros((num_processes,), dtype=int)
+            remaining = n
+            for k in range(num_processes - 1):
+                if remaining > 0 and pair_counts[k:].sum() > 0:
+                    p_local = pair_counts[k] / pair_counts[k:].sum()
+                    num_connections[k] = self.rng.next(1, 'binomial',
+                                                       {'n': remaining, 'p': p_local},
+                                                       mask_local=False)[0]
+                    if not self.with_replacement:
+                        # each process can only hold as many connections as it has potential connections
+                        num_connections[k] = min(max(num_connections[k],
+                                                     remaining - pair_counts[k + 1:].sum()),
+                                                 pair_counts[k])
+                remaining -= num_connections[k]
+            num_connections[-1] = remaining
+            # the RNGs are not the same on all processes, so use the values from the first one
+            num_connections = recording.gather_dict({rank: num_connections}, all=True)[0]
+            sources, targets = self._draw_connections(num_connections[rank], n_available,
+                                                      exclude_self, local_columns)
+
+        self._connect_with_pairs(projection, sources, targets)
+
+    def _draw_connections(self, n, n_available, exclude_self, columns, mask_local=None):
+        """
+        Draw `n` connections at random from the potential connections to the
+        post-synaptic cells with indices `columns`, each of which may receive
+        connections from `n_available` pre-synaptic cells (all of them except
+        itself if `exclude_self` is True).
 
-        # Assume that targets are equally distributed over processes
-        targets_per_process = int(len(projection.post) / num_processes)
-            
-        # Calculate the number of synapses on each process
-        bino = RandomDistribution('binomial',
-                                  [self.n, targets_per_process / len(projection.post)],
-                                  rng=self.rng)
-        num_conns_on_vp = numpy.zeros(num_processes, dtype=int)
-        sum_dist = 0
-        sum_partitions = 0
-        for k in range(num_processes):
-            p_local = targets_per_process / (len(projection.post) - sum_dist)
-            bino.parameters['p'] = p_local
-            bino.parameters['n'] = self.n - sum_partitions
-            num_conns_on_vp[k] = bino.next()
-            sum_dist += targets_per_process
-            sum_partitions += num_conns_on_vp[k]
-
-        # Draw random sources and targets 
-        connections = [[] for i in range(projection.post.size)]
-        possible_targets = numpy.arange(projection.post.size)[projection.post._mask_local]
-        for i in range(num_conns_on_vp[rank]):
-            source_index = self.rng.next(1, 'uniform_int',
-                                         {"low": 0, "high": projection.pre.size},
-                                         mask_local=False)[0]
-            target_index = self.rng.choice(possible_targets, size=1)
-            connections[target_index].append(source_index)
+        If `mask_local` is given, only the connections to local post-synaptic
+        cells are returned.
 
-        def build_source_masks(mask=None):
-            if mask is None:
-                return [numpy.array(x) for x in connections]
+        Returns a tuple of arrays `(presynaptic_indices, postsynaptic_indices)`.
+        """
+        n_pairs = n_available * columns.size
+        if n == 0 or n_pairs == 0:
+            return numpy.zeros((0,), dtype=int), numpy.zeros((0,), dtype=int)
+        if self.with_replacement:
+            # draw in chunks, so as to limit the memory needed when only a few
+            # of the connections are local
+            chunk_size = MAX_BLOCK_MEMORY // 8
+            pair_indices = []
+            for start in range(0, n, chunk_size):
+                chunk = self.rng.next(min(chunk_size, n - start), 'uniform_int',
+                                      {"low": 0, "high": n_pairs}, mask_local=False).astype(int)
+                if mask_local is not None:
+                    chunk = chunk[mask_local[columns[chunk // n_available]]]
+                pair_indices.append(chunk)
+            pair_indices = numpy.hstack(pair_indices)
+        else:
+            if n > n_pairs:
+                raise errors.ConnectionError(
+                    "Cannot create %d connections without replacement: only %d are possible" % (n, n_pairs))
+            if n > n_pairs // 2:
+                # cheaper to choose the potential connections which are not created
+                excluded = self._draw_distinct(n_pairs - n, n_pairs)
+                selected = numpy.ones((n_pairs,), dtype=bool)
+                selected[excluded] = False
+                pair_indices = selected.nonzero()[0]
             else:
-                return [numpy.array(x) for x in numpy.array(connections)[mask]]
-        self._standard_connect(projection, build_source_masks)
+                pair_indices = self._draw_distinct(n, n_pairs)
+            if mask_local is not None:
+                pair_indices = pair_indices[mask_local[columns[pair_indices // n_available]]]
+        targets = columns[pair_indices // n_available]
+        sources = pair_indices % n_available
+        if exclude_self:
+            # self-connections are excluded, so skip over the target's own index
+            sources[sources >= targets] += 1
+        return sources, targets
+
+    def _draw_distinct(self, n, size):
+        """Return a sorted array of `n` distinct integers drawn from `range(size)`."""
+        values = numpy.zeros((0,), dtype=int)
+        while values.size < n:
+            new_values = self.rng.next(n - values.size, 'uniform_int', {"low": 0, "high": size},
+                                       mask_local=False).astype(int)
+            values = numpy.unique(numpy.hstack((values, new_values)))
+        return values
+
+
+class CachedConnector(Connector):
+    """
+    Wrap another connector, storing the connections it creates on disk so that
+    later runs which build the same projection can re-use them, rather than
+    generating them again.
+
+    The cache is keyed by a hash of the connector and its parameters
+    (including the state of any random number generators), the synapse type
+    and its parameters, the sizes and positions of the pre- and post-synaptic
+    populations, the projection's :class:`Space` and receptor type, the
+    simulator and the MPI rank. Functions are represented by their code,
+    default arguments, closure variables and the globals they refer to. Each
+    MPI process stores only its own connections. Connectors whose parameters are not reproducible between
+    runs (e.g. objects whose representation contains a memory address) will
+    never find a stored entry.
+
+    On a cache hit, the stored connections are created with the projection's
+    `_connect_bulk()` method if it has one, and the random number generators
+    are set to the state they had after the original connection step, so the
+    rest of the simulation is not affected.
+
+    Connections created directly by the simulator (rather than through
+    `_connect_bulk()` or `_convergent_connect()`) cannot be cached.
+
+    Arguments:
+        `connector`:
+            the connector used to create the connections if they are not
+            found in the cache.
+        `directory`:
+            the directory in which connections are stored.
+    """
+    parameter_names = ('connector', 'directory')
+
+    def __init__(self, connector, directory, safe=True, callback=None):
+        """
+        Create a new connector.
+        """
+        Connector.__init__(self, safe=safe, callback=callback)
+        self.connector = connector
+        self.directory = directory
+
+    def connect(self, projection):
+        """Connect-up a Projection."""
+        try:
+            key, rngs = self._cache_key(projection)
+        except NotImplementedError as err:  # the state of one of the RNGs cannot be saved
+            logger.warning("Connections for %s cannot be cached: %s", projection.label, err)
+            self.connector.connect(projection)
+            return
+        path = os.path.join(self.directory, "%s.npz" % key)
+        if os.path.exists(path):
+            logger.debug("Loading connections for %s from %s", projection.label, path)
+            self._replay(projection, path, rngs)
+        else:
+            self._record(projection, path, rngs)
+
+    def _cache_key(self, projection):
+        """
+        Return the hash identifying the connections of `projection`, and the
+        list of random number generators which may be used to create them.
+        """
+        h = hashlib.sha1()
+        rngs = []
+        state = projection._simulator.state
+        for value in (self.connector, projection.synapse_type,
+                      projection.pre.size, projection.pre.positions,
+                      projection.post.size, projection.post.positions,
+                      projection.space, projection.receptor_type,
+                      projection._simulator.name, state.mpi_rank, state.num_processes):
+            _update_hash(h, value, rngs, set())
+        return h.hexdigest(), rngs
+
+    def _record(self, projection, path, rngs):
+        """
+        Create the connections with the wrapped connector, recording the
+        arguments of the projection's connection methods, then store them in
+        the file `path`.
+        """
+        recorded = []
+
+        def record(sources, targets, connection_parameters):
+            n = len(sources)
+            values = {}
+            for name, value in connection_parameters.items():
+                value = numpy.array(value)  # copy, since backends may modify the values
+                if value.shape != (n,):
+                    value = numpy.repeat(value, n)
+                values[name] = value
+            recorded.append((numpy.array(sources, dtype=int), targets, values))
+
+        if hasattr(projection, "_connect_bulk"):
+            connect_bulk = projection._connect_bulk
+
+            def _connect_bulk(presynaptic_indices, postsynaptic_indices, **connection_parameters):
+                record(presynaptic_indices, numpy.array(postsynaptic_indices, dtype=int),
+                       connection_parameters)
+                connect_bulk(presynaptic_indices, postsynaptic_indices, **connection_parameters)
+            projection._connect_bulk = _connect_bulk
+        convergent_connect = projection._convergent_connect
+
+        def _convergent_connect(presynaptic_indices, postsynaptic_index, **connection_parameters):
+            record(presynaptic_indices,
+                   numpy.repeat(int(postsynaptic_index), len(presynaptic_indices)),
+                   connection_parameters)
+            convergent_connect(presynaptic_indices, postsynaptic_index, **connection_parameters)
+        projection._convergent_connect = _convergent_connect
+        try:
+            self.connector.connect(projection)
+        finally:
+            del projection._convergent_connect
+            if "_connect_bulk" in projection.__dict__:
+                del projection._connect_bulk
+
+        names = set(recorded[0][2].keys()) if recorded else set()
+        n_recorded = sum(len(sources) for sources, targets, values in recorded)
+        if n_recorded != len(projection) or any(set(values.keys()) != names
+                                                for sources, targets, values in recorded):
+            logger.warning("Connections for %s could not be cached", projection.label)
+            return
+        data = {
+            "presynaptic_index": numpy.hstack([r[0] for r in recorded] + [numpy.zeros((0,), dtype=int)]),
+            "postsynaptic_index": numpy.hstack([r[1] for r in recorded] + [numpy.zeros((0,), dtype=int)]),
+        }
+        # the states are stored as plain arrays, one per element of the state
+        # tuple, so the file can be loaded without unpickling anything
+        for k, rng in enumerate(rngs):
+            for m, element in enumerate(rng.get_state()):
+                data["rng_state_%d_%d" % (k, m)] = numpy.asarray(element)
+        for name in names:
+            data["parameter_" + name] = numpy.hstack([values[name] for sources, targets, values in recorded])
+        if not os.path.exists(self.directory):
+            try:  # wrapping in try...except block for MPI
+                os.makedirs(self.directory)
+            except OSError:
+                pass  # we assume that the directory was already created by another MPI node
+        tmp_path = "%s.%d.tmp" % (path, os.getpid())
+        with open(tmp_path, "wb") as fp:
+            numpy.savez(fp, **data)
+        os.rename(tmp_path, path)
+
+    def _replay(self, projection, path, rngs):
+        """Create the connections stored in the file `path`."""
+        data = numpy.load(path, allow_pickle=False)
+        sources = data["presynaptic_index"]
+        targets = data["postsynaptic_index"]
+        connection_parameters = dict((name[len("parameter_"):], data[name])
+                                     for name in data.files if name.startswith("parameter_"))
+        for k, rng in enumerate(rngs):
+            n_elements = sum(1 for name in data.files if name.startswith("rng_state_%d_" % k))
+            rng.set_state(tuple(_from_array(data["rng_state_%d_%d" % (k, m)])
+                                for m in range(n_elements)))
+        if sources.size == 0:
+            return
+        if hasattr(projection, "_connect_bulk"):
+            projection._connect_bulk(sources, targets, **connection_parameters)
+        else:
+            boundaries = numpy.flatnonzero(numpy.diff(targets)) + 1
+            left = numpy.hstack(([0], boundaries))
+            right = numpy.hstack((boundaries, [targets.size]))
+            for l, r in zip(left, right):
+                projection._convergent_connect(
+                    sources[l:r], targets[l],
+                    **dict((name, value[l:r]) for name, value in connection_parameters.items()))
+
+
+def _from_array(value):
+    """Return the scalar held in a zero-dimensional array, or the array itself."""
+    return value.item() if value.ndim == 0 else value
+
+
+def _update_hash(h, value, rngs, seen):
+    """
+    Update the hash object `h` with a representation of `value` which is the
+    same in different runs, appending any random number generators found in
+    `value` to the list `rngs`.
+    """
+    h.update(type(value).__name__.encode('utf-8'))
+    if value is None or isinstance(value, (bool, int, float, complex, basestring, numpy.number)):
+        h.update(repr(value).encode('utf-8'))
+    elif isinstance(value, numpy.ndarray):
+        if value.dtype == object:
+            _update_hash(h, value.tolist(), rngs, seen)
+        else:
+            h.update(repr((value.dtype.str, value.shape)).encode('utf-8'))
+            h.update(numpy.ascontiguousarray(value).tobytes())
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            _update_hash(h, item, rngs, seen)
+    elif isinstance(value, (set, frozenset)):
+        for item in sorted(value, key=repr):
+            _update_hash(h, item, rngs, seen)
+    elif isinstance(value, dict):
+        for key in sorted(value, key=repr):
+            _update_hash(h, key, rngs, seen)
+            _update_hash(h, value[key], rngs, seen)
+    elif id(value) in seen:
+        return
+    else:
+        seen.add(id(value))
+        if isinstance(value, types.ModuleType):
+            h.update(value.__name__.encode('utf-8'))
+        elif isinstance(value, type):
+            h.update(("%s.%s" % (value.__module__, value.__name__)).encode('utf-8'))
+        elif isinstance(value, types.MethodType):
+            h.update(value.__name__.encode('utf-8'))
+            _update_hash(h, value.__func__, rngs, seen)
+            _update_hash(h, value.__self__, rngs, seen)
+        elif isinstance(value, types.FunctionType):
+            # a function is represented by its code and by all the values it
+            # can refer to: default arguments, closure cells and globals
+            names = _update_hash_code(h, value.__code__, rngs, seen)
+            _update_hash(h, value.__defaults__, rngs, seen)
+            _update_hash(h, getattr(value, "__kwdefaults__", None), rngs, seen)
+            for cell in value.__closure__ or ():
+                try:
+                    _update_hash(h, cell.cell_contents, rngs, seen)
+                except ValueError:  # empty cell
+                    _update_hash(h, None, rngs, seen)
+            _update_hash(h, dict((name, value.__globals__[name]) for name in names
+                                 if name in value.__globals__), rngs, seen)
+        elif isinstance(value, AbstractRNG):
+            # the wrapped generator is represented by its state
+            rngs.append(value)
+            _update_hash(h, value.get_state(), rngs, seen)
+            _update_hash(h, dict((k, v) for k, v in vars(value).items()
+                                 if k not in ("rng", "_dispatch_table")), rngs, seen)
+        elif have_scipy and scipy.sparse.issparse(value):
+            matrix = value.tocsr(copy=True)
+            matrix.sum_duplicates()  # also sorts the indices
+            _update_hash(h, [matrix.shape, matrix.data, matrix.indices, matrix.indptr], rngs, seen)
+        elif hasattr(value, "__dict__"):
+            _update_hash(h, dict((k, v) for k, v in vars(value).items()
+                                 if k not in ("_projection", "projection")), rngs, seen)
+        else:
+            h.update(repr(value).encode('utf-8'))
+
+
+def _update_hash_code(h, code, rngs, seen):
+    """
+    Update the hash object `h` with the byte code and constants of the code
+    object `code`, including those of any nested functions, and return the set
+    of names of globals and attributes they use.
+    """
+    h.update(code.co_code)
+    names = set(code.co_names)
+    _update_hash(h, code.co_names, rngs, seen)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            names.update(_update_hash_code(h, const, rngs, seen))
+        else:
+            _update_hash(h, const, rngs, seen)
+    return names
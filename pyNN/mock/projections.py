@@ -1,4 +1,5 @@
 from itertools import repeat
+import numpy
 try:
     from itertools import izip
 except ImportError:
@@ -45,8 +46,21 @@ class Projection(common.Projection):
     def __len__(self):
         return len(self.connections)
 
-    def set(self, **attributes):
-        raise NotImplementedError
+    def _set_attributes(self, parameter_space):
+        sources = numpy.array([c.presynaptic_index for c in self.connections], dtype=int)
+        targets = numpy.array([c.postsynaptic_index for c in self.connections], dtype=int)
+        values = {}
+        for name, value in parameter_space.items():
+            if value.is_homogeneous:
+                values[name] = repeat(value.evaluate(simplify=True))
+            else:
+                values[name] = value[sources, targets]
+        self._set_connection_values(values)
+
+    def _set_connection_values(self, values):
+        for name, value in values.items():
+            for connection, x in izip(self.connections, value):
+                setattr(connection, name, x)
 
     def _convergent_connect(self, presynaptic_indices, postsynaptic_index,
                             **connection_parameters):
@@ -58,3 +72,15 @@ class Projection(common.Projection):
             self.connections.append(
                 Connection(pre_idx, postsynaptic_index, **other_attributes)
             )
+
+    def _connect_bulk(self, presynaptic_indices, postsynaptic_indices,
+                      **connection_parameters):
+        for name, value in connection_parameters.items():
+            if numpy.isscalar(value):
+                connection_parameters[name] = repeat(value)
+        for (pre_idx, post_idx), other in ezip(izip(presynaptic_indices, postsynaptic_indices),
+                                               *connection_parameters.values()):
+            other_attributes = dict(zip(connection_parameters.keys(), other))
+            self.connections.append(
+                Connection(pre_idx, post_idx, **other_attributes)
+            )
@@ -7,6 +7,7 @@ Connection method classes for nest
 """
 
 import logging
+import numbers
 import nest
 try:
     import csa
@@ -28,7 +29,8 @@ from pyNN.connectors import (Connector,
                              FromFileConnector,
                              CloneConnector,
                              ArrayConnector,
-                             FixedTotalNumberConnector)
+                             FixedTotalNumberConnector,
+                             CachedConnector)
 
 from .random import NativeRNG, NEST_RDEV_TYPES
 
@@ -117,10 +119,52 @@ class NESTConnectorMixin(object):
                 else:
                     value.shape = (1, 1)
                     params[name] = float(value.evaluate())  # If parameter is given as a single number. Checking of the dimensions should be done in NEST
-                if name == "weight" and projection.receptor_type == 'inhibitory' and self.post.conductance_based:
+                if name == "weight" and projection.receptor_type == 'inhibitory' and projection.post.conductance_based:
                     params[name] *= -1  # NEST wants negative values for inhibitory weights, even if these are conductances
         return params
 
+    def _native_parameters_supported(self, projection):
+        """
+        Return True if all of the synapse parameters can be passed to a NEST
+        connection rule, i.e. they are either homogeneous or drawn from
+        random distributions using NEST's own RNGs.
+        """
+        for value in projection.synapse_type.native_parameters.values():
+            if isinstance(value.base_value, random.RandomDistribution):
+                if not isinstance(value.base_value.rng, NativeRNG):
+                    return False
+            elif not value.is_homogeneous:
+                return False
+        return True
+
+    def _native_rule_supported(self, projection):
+        """
+        Return True if the connector can be replaced by a NEST connection rule
+        with the same meaning. Connectors which draw random numbers do this
+        only if NEST's own RNGs are requested, since otherwise the
+        connectivity would no longer be determined by the user's RNG.
+        """
+        if not self._native_parameters_supported(projection):
+            return False
+        if not getattr(getattr(projection.post, "celltype", None), "standard_receptor_type", False):
+            return False
+        if getattr(self, "allow_self_connections", True) == 'NoMutual':
+            return False
+        if hasattr(self, "rng"):
+            return (projection.synapse_type.native_parameters.has_native_rngs
+                    or isinstance(self.rng, NativeRNG))
+        return True
+
+    def _n_partners(self, projection, size):
+        """
+        Return the number of distinct neurons, out of `size`, which a neuron
+        may be connected to: one fewer if self-connections are excluded within
+        a single population.
+        """
+        if not self.allow_self_connections and projection.pre == projection.post:
+            return size - 1
+        return size
+
 
 class FixedProbabilityConnector(FixedProbabilityConnector, NESTConnectorMixin):
 
@@ -155,71 +199,74 @@ class AllToAllConnector(AllToAllConnector, NESTConnectorMixin):
         projection._connect(rule_params, syn_params)
 
 
-#class OneToOneConnector():
-#
-#    def __init__(self, allow_self_connections=True, with_replacement=True, safe=True,
-#                 callback=None):
-#        self.allow_self_connections = allow_self_connections
-#        self.with_replacement = with_replacement
-#
-#    def connect(self, projection):
-#        syn_params = projection.synapse_parameters()
-#        rule_params = {'autapses': self.allow_self_connections,
-#                       'multapses': self.with_replacement,
-#                       'rule': 'one_to_one'}
-#
-#        projection._connect(rule_params, syn_params)
-#
-#
-#class FixedNumberPreConnector():
-#
-#    def __init__(self, n, allow_self_connections=True, with_replacement=True, safe=True,
-#                 callback=None, rng=None):
-#        self.allow_self_connections = allow_self_connections
-#        self.with_replacement = with_replacement
-#        self.n = n
-#
-#    def connect(self, projection):
-#        syn_params = projection.synapse_parameters()
-#        rule_params = {'autapses': self.allow_self_connections,
-#                       'multapses': self.with_replacement,
-#                       'rule': 'fixed_indegree',
-#                       'indegree': self.n }
-#
-#        projection._connect(rule_params, syn_params)
-#
-#
-#class FixedNumberPostConnector():
-#
-#    def __init__(self, n, allow_self_connections=True, with_replacement=True, safe=True,
-#                 callback=None, rng=None):
-#        self.allow_self_connections = allow_self_connections
-#        self.with_replacement = with_replacement
-#        self.n = n
-#
-#    def connect(self, projection):
-#        syn_params = projection.synapse_parameters()
-#        rule_params = {'autapses': self.allow_self_connections,
-#                       'multapses': self.with_replacement,
-#                       'rule': 'fixed_outdegree',
-#                       'outdegree': self.n }
-#
-#        projection._connect(rule_params, syn_params)
-#
-#
-#class FixedTotalNumberConnector():
-#
-#    def __init__(self, n, allow_self_connections=True, with_replacement=True, safe=True,
-#                 callback=None):
-#        self.allow_self_connections = allow_self_connections
-#        self.with_replacement = with_replacement
-#        self.n = n
-#
-#    def connect(self, projection):
-#        syn_params = projection.synapse_parameters()
-#        rule_params = {'autapses': self.allow_self_connections,
-#                       'multapses': self.with_replacement,
-#                       'rule': 'fixed_total_number',
-#                       'N': self.n
-#                   }
-#        projection._connect(rule_params, syn_params)
+class OneToOneConnector(OneToOneConnector, NESTConnectorMixin):
+
+    def connect(self, projection):
+        if (projection.pre.size == projection.post.size
+                and self._native_rule_supported(projection)):
+            return self.native_connect(projection)
+        else:
+            return super(OneToOneConnector, self).connect(projection)
+
+    def native_connect(self, projection):
+        syn_params = self.synapse_parameters(projection)
+        rule_params = {'rule': 'one_to_one'}
+        projection._connect(rule_params, syn_params)
+
+
+class FixedNumberPreConnector(FixedNumberPreConnector, NESTConnectorMixin):
+
+    def connect(self, projection):
+        if (isinstance(self.n, numbers.Integral)
+                and (self.with_replacement or self.n <= self._n_partners(projection, projection.pre.size))
+                and self._native_rule_supported(projection)):
+            return self.native_connect(projection)
+        else:
+            return super(FixedNumberPreConnector, self).connect(projection)
+
+    def native_connect(self, projection):
+        syn_params = self.synapse_parameters(projection)
+        rule_params = {'autapses': self.allow_self_connections,
+                       'multapses': self.with_replacement,
+                       'rule': 'fixed_indegree',
+                       'indegree': int(self.n)}
+        projection._connect(rule_params, syn_params)
+
+
+class FixedNumberPostConnector(FixedNumberPostConnector, NESTConnectorMixin):
+
+    def connect(self, projection):
+        if (isinstance(self.n, numbers.Integral)
+                and (self.with_replacement or self.n <= self._n_partners(projection, projection.post.size))
+                and self._native_rule_supported(projection)):
+            return self.native_connect(projection)
+        else:
+            return super(FixedNumberPostConnector, self).connect(projection)
+
+    def native_connect(self, projection):
+        syn_params = self.synapse_parameters(projection)
+        rule_params = {'autapses': self.allow_self_connections,
+                       'multapses': self.with_replacement,
+                       'rule': 'fixed_outdegree',
+                       'outdegree': int(self.n)}
+        projection._connect(rule_params, syn_params)
+
+
+class FixedTotalNumberConnector(FixedTotalNumberConnector, NESTConnectorMixin):
+
+    def connect(self, projection):
+        if (isinstance(self.n, numbers.Integral)
+                and (self.with_replacement
+                     or self.n <= projection.pre.size * self._n_partners(projection, projection.post.size))
+                and self._native_rule_supported(projection)):
+            return self.native_connect(projection)
+        else:
+            return super(FixedTotalNumberConnector, self).connect(projection)
+
+    def native_connect(self, projection):
+        syn_params = self.synapse_parameters(projection)
+        rule_params = {'autapses': self.allow_self_connections,
+                       'multapses': self.with_replacement,
+                       'rule': 'fixed_total_number',
+                       'N': int(self.n)}
+        projection._connect(rule_params, syn_params)
@@ -11,10 +11,6 @@ import numpy
 import nest
 import logging
 from itertools import repeat
-try:
-    xrange
-except NameError:  # Python 3
-    xrange = range
 from pyNN import common, errors
 from pyNN.space import Space
 from . import simulator
@@ -62,31 +58,37 @@ class Projection(common.Projection):
 
     def __getitem__(self, i):
         """Return the `i`th connection on the local MPI node."""
+        n = len(self)
         if isinstance(i, int):
-            if i < len(self):
+            if i < n:
                 return simulator.Connection(self, i)
             else:
-                raise IndexError("%d > %d" % (i, len(self) - 1))
+                raise IndexError("%d > %d" % (i, n - 1))
         elif isinstance(i, slice):
-            if i.stop < len(self):
+            if i.stop < n:
                 return [simulator.Connection(self, j) for j in range(i.start, i.stop, i.step or 1)]
             else:
-                raise IndexError("%d > %d" % (i.stop, len(self) - 1))
+                raise IndexError("%d > %d" % (i.stop, n - 1))
 
     def __len__(self):
         """Return the number of connections on the local MPI node."""
-        local_nodes = nest.GetNodes([0], local_only=True)[0]
-        local_connections = nest.GetConnections(target=local_nodes,
-                                                synapse_model=self.nest_synapse_model,
-                                                synapse_label=self.nest_synapse_label)
-        return len(local_connections)
+        return len(self.nest_connections)
+
+    def __iter__(self):
+        """Return an iterator over all connections on the local MPI node."""
+        return (simulator.Connection(self, i) for i in range(len(self)))
 
     @property
     def nest_connections(self):
+        """
+        Handles for the local connections of this projection, as returned by
+        `nest.GetConnections()`. These are cached, and only looked up again
+        after new connections have been created.
+        """
         if self._connections is None:
-            self._sources = numpy.unique(self._sources)
-            if self._sources.size > 0:
-                self._connections = nest.GetConnections(self._sources.tolist(),
+            self._sources = numpy.unique(self._sources).tolist()
+            if self._sources:
+                self._connections = nest.GetConnections(self._sources,
                                                         synapse_model=self.nest_synapse_model,
                                                         synapse_label=self.nest_synapse_label)
             else:
@@ -98,7 +100,7 @@ class Projection(common.Projection):
         """
         Returns an iterator over local connections in this projection, as `Connection` objects.
         """
-        return (simulator.Connection(self, i) for i in range(len(self)))
+        return iter(self)
 
     def _set_tsodyks_params(self):
         if 'tsodyks' in self.nest_synapse_model:
@@ -125,6 +127,7 @@ class Projection(common.Projection):
         nest.Connect(self.pre.all_cells.astype(int).tolist(),
                      self.post.all_cells.astype(int).tolist(),
                      rule_params, syn_params)
+        self._connections = None  # reset the caching of the connection list, since this will have to be recalculated
         self._sources = [cid[0] for cid in nest.GetConnections(synapse_model=self.nest_synapse_model,
                                                                synapse_label=self.nest_synapse_label)]
 
@@ -146,9 +149,9 @@ class Projection(common.Projection):
 
         weights = connection_parameters.pop('weight')
         if self.receptor_type == 'inhibitory' and self.post.conductance_based:
-            weights *= -1  # NEST wants negative values for inhibitory weights, even if these are conductances
+            weights = -weights  # NEST wants negative values for inhibitory weights, even if these are conductances
         if hasattr(self.post, "celltype") and hasattr(self.post.celltype, "receptor_scale"):  # this is a bit of a hack
-            weights *= self.post.celltype.receptor_scale                                      # needed for the Izhikevich model
+            weights = weights * self.post.celltype.receptor_scale                                # needed for the Izhikevich model
         delays = connection_parameters.pop('delay')
 
         # Create connections, with weights and delays
@@ -218,6 +221,110 @@ class Projection(common.Projection):
                 else:
                     self._set_common_synapse_property(name, value)
 
+    def _connect_bulk(self, presynaptic_indices, postsynaptic_indices,
+                      **connection_parameters):
+        """
+        Create many connections at once, with a single 'one_to_one' call to
+        nest.Connect, then set parameters other than weight and delay with a
+        single call to nest.SetStatus.
+
+        `presynaptic_indices`  -- a 1D array of pre-synaptic cell indices
+        `postsynaptic_indices` -- a 1D array, of the same length, of post-synaptic cell indices
+
+        Each connection parameter should be either a scalar or a 1D array with
+        one value per connection.
+        """
+        presynaptic_cells = self.pre.all_cells[presynaptic_indices].astype(int)
+        postsynaptic_cells = self.post.all_cells[postsynaptic_indices].astype(int)
+        assert presynaptic_cells.size == postsynaptic_cells.size
+        if presynaptic_cells.size == 0:
+            return
+
+        weights = connection_parameters.pop('weight')
+        if self.receptor_type == 'inhibitory' and self.post.conductance_based:
+            weights = -weights  # NEST wants negative values for inhibitory weights, even if these are conductances
+        if hasattr(self.post, "celltype") and hasattr(self.post.celltype, "receptor_scale"):  # this is a bit of a hack
+            weights = weights * self.post.celltype.receptor_scale                                # needed for the Izhikevich model
+        delays = connection_parameters.pop('delay')
+
+        syn_dict = {'model': self.nest_synapse_model,
+                    'weight': weights, 'delay': delays,
+                    'synapse_label': self.nest_synapse_label}
+        if hasattr(self.post, "celltype"):
+            celltypes = [self.post.celltype]
+        else:  # Assembly
+            celltypes = [self.post[i].celltype for i in postsynaptic_indices]
+        if not all(celltype.standard_receptor_type for celltype in celltypes):
+            receptor_types = [celltype.get_receptor_type(self.receptor_type) for celltype in celltypes]
+            if len(receptor_types) == 1:
+                syn_dict['receptor_type'] = receptor_types[0]
+            else:
+                syn_dict['receptor_type'] = numpy.array(receptor_types)
+        for name in ('weight', 'delay'):
+            if not numpy.isscalar(syn_dict[name]):
+                syn_dict[name] = numpy.array(syn_dict[name], dtype=float)
+
+        # Clean the connection parameters
+        connection_parameters.pop('tau_minus', None)  # TODO: set tau_minus on the post-synaptic cells
+        connection_parameters.pop('dendritic_delay_fraction', None)
+        connection_parameters.pop('w_min_always_zero_in_NEST', None)
+
+        if connection_parameters:
+            # remember which connections already exist between these cells, so
+            # that those we create can be told apart from them afterwards
+            connection_filter = {'source': numpy.unique(presynaptic_cells).tolist(),
+                                 'target': numpy.unique(postsynaptic_cells).tolist(),
+                                 'synapse_model': self.nest_synapse_model,
+                                 'synapse_label': self.nest_synapse_label}
+            existing_connections = set(tuple(int(x) for x in c)
+                                       for c in nest.GetConnections(**connection_filter))
+        try:
+            nest.Connect(presynaptic_cells.tolist(),
+                         postsynaptic_cells.tolist(),
+                         'one_to_one',
+                         syn_dict)
+        except nest.NESTError as e:
+            errmsg = "%s. presynaptic_cells=%s, postsynaptic_cells=%s, weights=%s, delays=%s, synapse model='%s'" % (
+                        e, presynaptic_cells, postsynaptic_cells,
+                        weights, delays, self.nest_synapse_model)
+            raise errors.ConnectionError(errmsg)
+
+        # Book-keeping
+        self._connections = None  # reset the caching of the connection list, since this will have to be recalculated
+        self._sources.extend(presynaptic_cells)
+
+        if not connection_parameters:
+            return
+
+        if self._common_synapse_property_names is None:
+            self._identify_common_synapse_properties()
+
+        # Set connection parameters other than weight and delay
+        local_parameters = {}
+        for name, value in connection_parameters.items():
+            value = make_sli_compatible(value)
+            if name in self._common_synapse_property_names:
+                self._set_common_synapse_property(name, value)
+            else:
+                local_parameters[str(name)] = value
+        if local_parameters:
+            connections = [c for c in nest.GetConnections(**connection_filter)
+                           if tuple(int(x) for x in c) not in existing_connections]
+            # match the connections returned by NEST to the (source, target)
+            # pairs requested, by sorting both
+            connection_array = numpy.array(connections, dtype=int)
+            nest_order = numpy.lexsort((connection_array[:, 0], connection_array[:, 1]))
+            requested_order = numpy.lexsort((presynaptic_cells, postsynaptic_cells))
+            assert len(nest_order) == len(requested_order)
+            for name, value in local_parameters.items():
+                if isinstance(value, numpy.ndarray):
+                    local_parameters[name] = value[requested_order].tolist()
+                else:
+                    local_parameters[name] = [value] * requested_order.size
+            status = [dict(zip(local_parameters.keys(), connection_values))
+                      for connection_values in zip(*local_parameters.values())]
+            nest.SetStatus([connections[i] for i in nest_order], status)
+
     def _identify_common_synapse_properties(self):
         """
             Use the connection between the sample indices to distinguish
@@ -259,6 +366,22 @@ class Projection(common.Projection):
                     else:
                         self._set_common_synapse_property(name, value)
 
+    def _set_connection_values(self, values):
+        # the values are in the same order as self.nest_connections
+        connections = self.nest_connections
+        if self._common_synapse_property_names is None:
+            self._identify_common_synapse_properties()
+        for name, value in values.items():
+            if name == "weight" and self.receptor_type == 'inhibitory' and self.post.conductance_based:
+                value = -value  # NEST uses negative values for inhibitory weights, even if these are conductances
+            if name in self._common_synapse_property_names:
+                if value.size > 0:
+                    if (value != value[0]).any():
+                        raise ValueError("{} cannot be heterogeneous within a single Projection".format(name))
+                    self._set_common_synapse_property(name, value[0])
+            elif connections:
+                nest.SetStatus(connections, name, make_sli_compatible(value))
+
     def _set_common_synapse_property(self, name, value):
         """
             Sets the common synapse property while making sure its value stays
@@ -309,7 +432,7 @@ class Projection(common.Projection):
     #        file.write(lines, {'pre' : self.pre.label, 'post' : self.post.label})
     #        file.close()
 
-    def _get_attributes_as_list(self, names):
+    def _get_attributes_as_columns(self, names):
         nest_names = []
         for name in names:
             if name == 'presynaptic_index':
@@ -318,44 +441,43 @@ class Projection(common.Projection):
                 nest_names.append('target')
             else:
                 nest_names.append(name)
-        values = nest.GetStatus(self.nest_connections, nest_names)
+        values = numpy.array(nest.GetStatus(self.nest_connections, nest_names),
+                             dtype=float).reshape((-1, len(names)))
+        columns = [values[:, i] for i in range(len(names))]
         if 'weight' in names:  # other attributes could also have scale factors - need to use translation mechanisms
-            values = numpy.array(values)  # ought to preserve int type for source, target
-            scale_factors = numpy.ones(len(names))
-            scale_factors[names.index('weight')] = 0.001
+            scale_factor = 0.001
             if self.receptor_type == 'inhibitory' and self.post.conductance_based:
-                scale_factors[names.index('weight')] *= -1  # NEST uses negative values for inhibitory weights, even if these are conductances
-            values *= scale_factors
-            values = values.tolist()
+                scale_factor *= -1  # NEST uses negative values for inhibitory weights, even if these are conductances
+            columns[names.index('weight')] *= scale_factor
         if 'presynaptic_index' in names:
-            values = numpy.array(values)
-            values[:, names.index('presynaptic_index')] -= self.pre.first_id
-            values = values.tolist()
+            columns[names.index('presynaptic_index')] -= self.pre.first_id
         if 'postsynaptic_index' in names:
-            values = numpy.array(values)
-            values[:, names.index('postsynaptic_index')] -= self.post.first_id
-            values = values.tolist()
-        for i in xrange(len(values)):
-            values[i] = tuple(values[i])
-        return values
+            columns[names.index('postsynaptic_index')] -= self.post.first_id
+        return columns
+
+    def _get_attributes_as_list(self, names):
+        columns = self._get_attributes_as_columns(names)
+        for name in ('presynaptic_index', 'postsynaptic_index'):
+            if name in names:
+                columns[names.index(name)] = columns[names.index(name)].astype(int)
+        return list(zip(*[column.tolist() for column in columns]))
 
     def _get_attributes_as_arrays(self, names, multiple_synapses='sum'):
-        multi_synapse_operation = Projection.MULTI_SYNAPSE_OPERATIONS[multiple_synapses]
         all_values = []
         for attribute_name in names:
             if attribute_name[-1] == "s":  # weights --> weight, delays --> delay
                 attribute_name = attribute_name[:-1]
-            value_arr = numpy.nan * numpy.ones((self.pre.size, self.post.size))
-            connection_attributes = nest.GetStatus(self.nest_connections,
-                                                   ('source', 'target', attribute_name))
-            for conn in connection_attributes:
+            connection_attributes = numpy.array(nest.GetStatus(self.nest_connections,
+                                                               ('source', 'target', attribute_name)),
+                                                dtype=float).reshape((-1, 3))
+            if connection_attributes.size > 0:
                 # (offset is always 0,0 for connections created with connect())
-                src, tgt, value = conn
-                addr = self.pre.id_to_index(src), self.post.id_to_index(tgt)
-                if numpy.isnan(value_arr[addr]):
-                    value_arr[addr] = value
-                else:
-                    value_arr[addr] = multi_synapse_operation(value_arr[addr], value)
+                sources = self.pre.id_to_index(connection_attributes[:, 0].astype(int))
+                targets = self.post.id_to_index(connection_attributes[:, 1].astype(int))
+            else:
+                sources = targets = numpy.array([], dtype=int)
+            value_arr = self._connection_matrix(sources, targets, connection_attributes[:, 2],
+                                                multiple_synapses)
             if attribute_name == 'weight':
                 value_arr *= 0.001
                 if self.receptor_type == 'inhibitory' and self.post.conductance_based:
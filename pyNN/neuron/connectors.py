@@ -21,4 +21,5 @@ from pyNN.connectors import AllToAllConnector, \
                             CSAConnector, \
                             CloneConnector, \
                             ArrayConnector, \
-                            FixedTotalNumberConnector
+                            FixedTotalNumberConnector, \
+                            CachedConnector
@@ -13,8 +13,7 @@ try:
     from itertools import izip
 except ImportError:
     izip = zip  # Python 3 zip returns an iterator already
-from itertools import repeat, chain
-from collections import defaultdict
+from itertools import repeat
 from pyNN import common, errors, core
 from pyNN.random import RandomDistribution, NativeRNG
 from pyNN.space import Space
@@ -39,7 +38,19 @@ class Projection(common.Projection):
         common.Projection.__init__(self, presynaptic_population, postsynaptic_population,
                                    connector, synapse_type, source, receptor_type,
                                    space, label)
-        self._connections = dict((index, defaultdict(list)) for index in self.post._mask_local.nonzero()[0])
+        # Local connections are stored in compressed sparse column (CSR-like)
+        # form: the `simulator.Connection` objects (which hold the NetCons) are
+        # kept in a flat list, grouped by post-synaptic neuron, with parallel
+        # arrays of pre- and post-synaptic indices. The connections to the
+        # post-synaptic neuron with index `j` are those in the slice
+        # `_indptr[j]:_indptr[j + 1]`. Newly-created connections are held
+        # separately until they are merged in by `_update_storage()`.
+        self._connections = []
+        self._presynaptic_indices = numpy.array([], dtype=int)
+        self._postsynaptic_indices = numpy.array([], dtype=int)
+        self._indptr = numpy.zeros((self.post.size + 1,), dtype=int)
+        self._new_connections = []
+        self._new_indices = []
         connector.connect(self)
         self._presynaptic_components = dict((index, {}) for index in 
                                             self.pre._mask_local.nonzero()[0])
@@ -48,29 +59,49 @@ class Projection(common.Projection):
         _projections.append(self)
         logger.info("--- Projection[%s].__init__() ---" % self.label)
 
+    def _update_storage(self):
+        """
+        Merge any connections created since the last call into the sorted
+        connection storage.
+        """
+        if self._new_connections:
+            connections = self._connections + self._new_connections
+            presynaptic_indices = numpy.hstack([self._presynaptic_indices] + [pre for pre, post in self._new_indices])
+            postsynaptic_indices = numpy.hstack([self._postsynaptic_indices] + [post for pre, post in self._new_indices])
+            if (numpy.diff(postsynaptic_indices) < 0).any():
+                order = numpy.argsort(postsynaptic_indices, kind='mergesort')
+                connections = [connections[i] for i in order]
+                presynaptic_indices = presynaptic_indices[order]
+                postsynaptic_indices = postsynaptic_indices[order]
+            self._connections = connections
+            self._presynaptic_indices = presynaptic_indices
+            self._postsynaptic_indices = postsynaptic_indices
+            self._indptr[1:] = numpy.cumsum(numpy.bincount(postsynaptic_indices, minlength=self.post.size))
+            self._new_connections = []
+            self._new_indices = []
+
     @property
     def connections(self):
-        for x in self._connections.values():
-            for y in x.values():
-                for z in y:
-                    yield z
+        self._update_storage()
+        return iter(self._connections)
 
     def __getitem__(self, i):
         __doc__ = common.Projection.__getitem__.__doc__
+        self._update_storage()
         if isinstance(i, int):
             if i < len(self):
-                return self.connections[i]
+                return self._connections[i]
             else:
                 raise IndexError("%d > %d" % (i, len(self) - 1))
         elif isinstance(i, slice):
             if i.stop < len(self):
-                return [self.connections[j] for j in range(*i.indices(i.stop))]
+                return self._connections[i]
             else:
                 raise IndexError("%d > %d" % (i.stop, len(self) - 1))
 
     def __len__(self):
         """Return the number of connections on the local MPI node."""
-        return len(list(self.connections))
+        return len(self._connections) + len(self._new_connections)
 
     def _convergent_connect(self, presynaptic_indices, postsynaptic_index,
                             **connection_parameters):
@@ -92,11 +123,14 @@ class Projection(common.Projection):
             if isinstance(value, (float, int)):
                 connection_parameters[name] = repeat(value)
         assert postsynaptic_cell.local
+        presynaptic_indices = numpy.asarray(presynaptic_indices, dtype=int).reshape((-1,))
         for pre_idx, values in core.ezip(presynaptic_indices, *connection_parameters.values()):
             parameters = dict(zip(connection_parameters.keys(), values))
             #logger.debug("Connecting neuron #%s to neuron #%s with synapse type %s, receptor type %s, parameters %s", pre_idx, postsynaptic_index, self.synapse_type, self.receptor_type, parameters)
-            self._connections[postsynaptic_index][pre_idx].append(
+            self._new_connections.append(
                 self.synapse_type.connection_type(self, pre_idx, postsynaptic_index, **parameters))
+        self._new_indices.append((presynaptic_indices,
+                                  postsynaptic_index * numpy.ones_like(presynaptic_indices)))
 
     def _configure_presynaptic_components(self):
         """
@@ -131,12 +165,42 @@ class Projection(common.Projection):
                         setattr(component[index], name, value[index])
         # Evaluate the parameters for the post-synaptic components (typically the "Connection" object)
         parameter_space.evaluate(mask=(slice(None), self.post._mask_local))  # only columns for connections that exist on this machine
-        for connection_group, connection_parameters in zip(self._connections.values(),
-                                                           parameter_space.columns()):
+        self._update_storage()
+        for postsynaptic_index, connection_parameters in zip(self.post._mask_local.nonzero()[0],
+                                                             parameter_space.columns()):
+            start, stop = self._indptr[postsynaptic_index:postsynaptic_index + 2]
+            if start == stop:
+                continue
+            sources = self._presynaptic_indices[start:stop]
+            values = {}
             for name, value in connection_parameters.items():
-                for index in connection_group:
-                    for connection in connection_group[index]:
-                        setattr(connection, name, value[index])
+                if isinstance(value, numpy.ndarray) and value.shape:
+                    values[name] = value[sources]
+                else:
+                    values[name] = repeat(value)
+            for name, value in values.items():
+                for connection, x in izip(self._connections[start:stop], value):
+                    setattr(connection, name, x)
+
+    def _set_connection_values(self, values):
+        # the values are in the same order as self.connections
+        self._update_storage()
+        for name, value in values.items():
+            for connection, x in izip(self._connections, value):
+                setattr(connection, name, x)
+
+    def _get_attributes_as_columns(self, names):
+        self._update_storage()
+        columns = []
+        for name in names:
+            if name == "presynaptic_index":
+                columns.append(self._presynaptic_indices)
+            elif name == "postsynaptic_index":
+                columns.append(self._postsynaptic_indices)
+            else:
+                columns.append(numpy.fromiter((getattr(c, name) for c in self._connections),
+                                              dtype=float, count=len(self._connections)))
+        return columns
 
     def _set_initial_value_array(self, variable, value):
         raise NotImplemented
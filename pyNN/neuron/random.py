@@ -4,7 +4,7 @@ docstring missing
 
 import numpy as np
 from neuron import h
-from pyNN.random import NativeRNG, WrappedRNG
+from pyNN.random import NativeRNG, WrappedRNG, have_scipy, truncated_normal_ppf
 
 try:
     xrange
@@ -82,6 +82,8 @@ class NativeRNG(NativeRNG, WrappedRNG):
 
     def normal_clipped(self, n, mu, sigma, low, high):
         """ """
+        if have_scipy:
+            return truncated_normal_ppf(self._next_n("uniform", n, (0.0, 1.0)), mu, sigma, low, high)
         gen = lambda n: self.normal(n, mu, sigma)
         return self._clipped(gen, low=low, high=high, size=n)
 
@@ -13,7 +13,7 @@ except NameError:  # Python 3
     long = int
 import numpy
 import collections
-from pyNN.core import is_listlike
+from pyNN.core import is_listlike, IndexBasedExpression
 from pyNN import errors
 from pyNN.random import RandomDistribution, NativeRNG
 from lazyarray import larray, partial_shape
@@ -88,6 +88,14 @@ class LazyArray(larray):
                 for j in column_indices:
                     yield self._apply_operations(self.base_value.next(self.nrows, mask_local=False),
                                                  (slice(None), j))
+            elif getattr(self.base_value.rng, "random_access", False):
+                # numbers are generated only for the local columns
+                column_indices = numpy.arange(self.ncols)
+                no_rows = numpy.zeros((self.nrows,), dtype=bool)
+                for j, local in zip(column_indices, mask):
+                    col = self.base_value.next(self.nrows, mask_local=False if local else no_rows)
+                    if local:
+                        yield self._apply_operations(col, (slice(None), j))
             else:
                 column_indices = numpy.arange(self.ncols)
                 for j, local in zip(column_indices, mask):
@@ -98,6 +106,52 @@ class LazyArray(larray):
             for j in column_indices:
                 yield self._partially_evaluate((slice(None), j), simplify=True)
 
+    def by_column_block(self, block_size, mask=None):
+        """
+        Iterate over blocks of adjacent columns of the array. Yields tuples
+        `(column_indices, block)`, where `block` is either a 2D array with one
+        column per element of `column_indices` or a single value (for a flat
+        array).
+
+        Random numbers are drawn in the same order as for :meth:`by_column`.
+
+        `block_size`: the maximum number of columns in a block.
+        `mask`: either `None` or a boolean array indicating which columns should be included.
+        """
+        column_indices = numpy.arange(self.ncols)
+        if mask is not None:
+            assert len(mask) == self.ncols
+        if isinstance(self.base_value, RandomDistribution):
+            if mask is not None and not self.base_value.rng.parallel_safe:
+                column_indices = column_indices[mask]
+            random_access = getattr(self.base_value.rng, "random_access", False)
+            for start in range(0, column_indices.size, block_size):
+                columns = column_indices[start:start + block_size]
+                if mask is not None and self.base_value.rng.parallel_safe and random_access:
+                    # the RNG can skip the numbers for non-local columns
+                    local = mask[columns]
+                    values = self.base_value.next(self.nrows * columns.size,
+                                                  mask_local=numpy.repeat(local, self.nrows))
+                    columns = columns[local]
+                    values = values.reshape((columns.size, self.nrows)).T
+                else:
+                    # column-major order, so each column gets a contiguous run of numbers
+                    values = self.base_value.next(self.nrows * columns.size, mask_local=False)
+                    values = values.reshape((columns.size, self.nrows)).T
+                    if mask is not None and self.base_value.rng.parallel_safe:
+                        # numbers for non-local columns have been drawn, now discard them
+                        local = mask[columns]
+                        columns = columns[local]
+                        values = values[:, local]
+                if columns.size > 0:
+                    yield columns, self._apply_operations(values, (slice(None), columns))
+        else:
+            if mask is not None:
+                column_indices = column_indices[mask]
+            for start in range(0, column_indices.size, block_size):
+                columns = column_indices[start:start + block_size]
+                yield columns, self._partially_evaluate((slice(None), columns), simplify=True)
+
 
 class Sequence(object):
     """
@@ -201,6 +255,62 @@ class Sequence(object):
         return "Sequence(%s)" % self.value
 
 
+class ConnectionValues(IndexBasedExpression):
+    """
+    Sparse representation of a connection parameter, holding one value for
+    each (pre, post) pair that is actually connected.
+
+    Used as the base value of a :class:`LazyArray` with shape
+    `(pre.size, post.size)`, it is evaluated only at the addresses requested,
+    so memory use is proportional to the number of connections rather than
+    to the size of the full connectivity matrix. Pairs that are not connected
+    evaluate to NaN.
+
+    Arguments:
+        `presynaptic_indices`, `postsynaptic_indices`:
+            arrays giving the address of each connection.
+        `values`:
+            array containing one value per connection.
+        `shape`:
+            the shape `(pre.size, post.size)` of the connectivity matrix.
+
+    Where a pair of neurons appears more than once, the first value given for
+    that pair is used.
+    """
+
+    def __init__(self, presynaptic_indices, postsynaptic_indices, values, shape):
+        self.shape = shape
+        keys = self._keys(numpy.asarray(presynaptic_indices, dtype=numpy.int64),
+                          numpy.asarray(postsynaptic_indices, dtype=numpy.int64))
+        values = numpy.asarray(values)
+        if values.shape != keys.shape:
+            raise errors.InvalidDimensionsError(
+                "Expected %d connection values, got %d" % (keys.size, values.size))
+        order = numpy.argsort(keys, kind='mergesort')
+        self.keys = keys[order]
+        self.values = values[order]
+
+    def _keys(self, i, j):
+        return i * self.shape[1] + j
+
+    def __call__(self, i, j):
+        i, j = numpy.broadcast_arrays(numpy.asarray(i, dtype=numpy.int64),
+                                      numpy.asarray(j, dtype=numpy.int64))
+        keys = self._keys(i, j).ravel()
+        values = numpy.empty(keys.shape, dtype=float)
+        values.fill(numpy.nan)
+        if self.keys.size > 0:
+            positions = numpy.searchsorted(self.keys, keys)
+            positions[positions == self.keys.size] = 0
+            found = self.keys[positions] == keys
+            values[found] = self.values[positions[found]]
+        return values.reshape(i.shape)
+
+    def __deepcopy__(self, memo):
+        # the connection arrays are never modified, so can be shared
+        return self
+
+
 class ParameterSpace(object):
     """
     Representation of one or more points in a parameter space.
@@ -344,6 +454,12 @@ class ParameterSpace(object):
         else:
             for name, value in self._parameters.items():
                 if isinstance(value.base_value, RandomDistribution) and value.base_value.rng.parallel_safe:
+                    if (getattr(value.base_value.rng, "random_access", False)
+                            and len(self._shape) == 1 and getattr(mask, "dtype", None) == bool):
+                        # the RNG can generate just the values selected by the mask
+                        values = value.base_value.next(self._shape[0], mask_local=mask)
+                        self._parameters[name] = value._apply_operations(values, (mask,))
+                        continue
                     value = value.evaluate()  # can't partially evaluate if using parallel safe
                 self._parameters[name] = value[mask]
             self._evaluated_shape = partial_shape(mask, self._shape)
@@ -4,6 +4,8 @@ common interface so that they can be used interchangeably in PyNN.
 
 Classes:
     NumpyRNG           - uses the numpy.random.RandomState RNG
+    PhiloxRNG          - counter-based RNG, which can generate any part of its
+                         sequence directly
     GSLRNG             - uses the RNGs from the Gnu Scientific Library
     NativeRNG          - indicates to the simulator that it should use it's own,
                          built-in RNG
@@ -25,6 +27,11 @@ try:
     have_gsl = True
 except (ImportError, Warning):
     have_gsl = False
+try:
+    from scipy.special import ndtr, ndtri
+    have_scipy = True
+except ImportError:
+    have_scipy = False
 import time
 
 logger = logging.getLogger("PyNN")
@@ -45,7 +52,7 @@ available_distributions = {
     'vonmises':       ('mu', 'kappa'),
 }
 
-MAX_REDRAWS = 1000  # for clipped distributions
+MAX_REDRAWS = 1000  # for clipped distributions, if scipy is not available
 
 
 def get_mpi_config():
@@ -59,12 +66,53 @@ def get_mpi_config():
     return mpi_rank, num_processes
 
 
+def truncated_normal_ppf(u, mu, sigma, low, high):
+    """
+    Transform numbers `u`, uniformly distributed in [0, 1), into numbers from
+    the normal distribution with mean `mu` and standard deviation `sigma`
+    truncated to the interval [`low`, `high`], by inverting the cumulative
+    distribution function. Requires scipy.
+
+    Unlike redrawing values which fall outside the interval, this needs
+    exactly one uniform number per value, however narrow the interval.
+    """
+    alpha = numpy.asarray((low - mu) / sigma, dtype=float)
+    beta = numpy.asarray((high - mu) / sigma, dtype=float)
+    if numpy.any(alpha > beta):
+        raise ValueError("Invalid clipped distribution: low > high")
+    # The normal CDF is accurate in the lower tail, but not in the upper tail,
+    # where it is close to 1, so intervals in the upper half are reflected.
+    with numpy.errstate(invalid='ignore'):
+        flip = alpha + beta > 0
+    a = numpy.where(flip, -beta, alpha)
+    b = numpy.where(flip, -alpha, beta)
+    u = numpy.where(flip, 1 - u, u)  # so that values increase with u
+    p_a = ndtr(a)
+    p_b = ndtr(b)
+    with numpy.errstate(invalid='ignore', divide='ignore', over='ignore'):
+        # (the smallest positive float avoids an infinite value if u is exactly 0)
+        x = ndtri(numpy.maximum(p_a + u * (p_b - p_a), numpy.finfo(float).tiny))
+        # Far in the tail (beyond about 37 standard deviations) the CDF
+        # underflows to zero. There, the density within the interval is very
+        # close to that of an exponential distribution.
+        underflow = p_b == 0
+        if numpy.any(underflow):
+            rate = -b
+            y = -numpy.log1p(-u * -numpy.expm1(-rate * (b - a))) / rate
+            x = numpy.where(underflow, b - y, x)
+    x = numpy.clip(x, a, b)  # guard against rounding errors
+    x = numpy.where(flip, -x, x)
+    return mu + sigma * x
+
+
 class AbstractRNG(object):
     """Abstract class for wrapping random number generators. The idea is to be
     able to use either simulator-native rngs, which may be more efficient, or a
     standard Python rng, e.g. a numpy.random.RandomState object, which would
     allow the same random numbers to be used across different simulators, or
     simply to read externally-generated numbers from files."""
+    # True if the RNG can generate any part of its sequence directly (see PhiloxRNG)
+    random_access = False
 
     def __init__(self, seed=None):
         if seed is not None:
@@ -90,6 +138,17 @@ class AbstractRNG(object):
         """
         raise NotImplementedError
 
+    def get_state(self):
+        """
+        Return the state of the generator, which can be saved and given to
+        `set_state()` to carry on the same sequence of random numbers.
+        """
+        raise NotImplementedError("The state of a %s cannot be saved" % self.__class__.__name__)
+
+    def set_state(self, state):
+        """Restore a state returned by `get_state()`."""
+        raise NotImplementedError("The state of a %s cannot be restored" % self.__class__.__name__)
+
 
 class WrappedRNG(AbstractRNG):
 
@@ -97,6 +156,7 @@ class WrappedRNG(AbstractRNG):
         AbstractRNG.__init__(self, seed)
         self.parallel_safe = parallel_safe
         self.mpi_rank, self.num_processes = get_mpi_config()
+        self._dispatch_table = {}
         if self.seed is not None and not parallel_safe:
             self.seed += self.mpi_rank  # ensure different nodes get different sequences
             if self.mpi_rank != 0:
@@ -136,6 +196,40 @@ class WrappedRNG(AbstractRNG):
             return rarr
     next.__doc__ = AbstractRNG.next.__doc__
 
+    def _dispatch(self, distribution, parameters):
+        """
+        Return the method which generates numbers from `distribution` (or None
+        if there is no such method) and `parameters` translated into its
+        argument names.
+
+        The method is looked up only once for each distribution, since `next()`
+        may be called very many times with small `n`.
+        """
+        try:
+            f_distr, parameter_map = self._dispatch_table[distribution]
+        except KeyError:
+            # TODO: allow non-standardized distributions to pass through without translation
+            name, parameter_map = self.translations[distribution]
+            f_distr = getattr(self, name, None)
+            self._dispatch_table[distribution] = (f_distr, parameter_map)
+        try:
+            translated_parameters = dict((parameter_map[k], v) for k, v in parameters.items())
+        except KeyError:
+            translated_parameters = None
+        if translated_parameters is None or len(translated_parameters) != len(parameter_map):
+            # all parameters must be provided. We do not provide default values (this can be discussed).
+            errmsg = "Incorrect parameterization of random distribution. Expected %s, got %s."
+            raise KeyError(errmsg % (parameter_map.keys(), parameters.keys()))
+        return f_distr, translated_parameters
+
+    def _stream_key(self):
+        """
+        Draw a key from which independent streams of random numbers can be
+        derived (see `_set_stream()`), for generating connections in several
+        processes.
+        """
+        return self.next(4, 'uniform_int', {'low': 0, 'high': 2**31 - 1}, mask_local=False)
+
     def _clipped(self, gen, low=-numpy.inf, high=numpy.inf, size=None):
         """ """
         res = gen(size)
@@ -197,19 +291,17 @@ class NumpyRNG(WrappedRNG):
         return getattr(self.rng, name)
 
     def _next(self, distribution, n, parameters):
-        # TODO: allow non-standardized distributions to pass through without translation
-        distribution_np, parameter_map = self.translations[distribution]
-        if set(parameters.keys()) != set(parameter_map.keys()):
-            # all parameters must be provided. We do not provide default values (this can be discussed).
-            errmsg = "Incorrect parameterization of random distribution. Expected %s, got %s."
-            raise KeyError(errmsg % (parameter_map.keys(), parameters.keys()))
-        parameters_np = dict((parameter_map[k], v) for k, v in parameters.items())
-        if hasattr(self, distribution_np):
-            f_distr = getattr(self, distribution_np)
-        else:
-            f_distr = getattr(self.rng, distribution_np)
+        f_distr, parameters_np = self._dispatch(distribution, parameters)
         return f_distr(size=n, **parameters_np)
 
+    def get_state(self):
+        return self.rng.get_state()
+    get_state.__doc__ = AbstractRNG.get_state.__doc__
+
+    def set_state(self, state):
+        self.rng.set_state(tuple(state))
+    set_state.__doc__ = AbstractRNG.set_state.__doc__
+
     def __deepcopy__(self, memo):
         obj = NumpyRNG.__new__(NumpyRNG)
         WrappedRNG.__init__(obj, seed=deepcopy(self.seed, memo),
@@ -217,8 +309,17 @@ class NumpyRNG(WrappedRNG):
         obj.rng = deepcopy(self.rng)
         return obj
 
+    def _set_stream(self, key, stream):
+        """
+        Re-seed the generator with the stream of random numbers identified by
+        the key returned by `_stream_key()` and the integer `stream`.
+        """
+        self.rng.seed(numpy.append(key, stream).astype(numpy.uint32))
+
     def normal_clipped(self, mu=0.0, sigma=1.0, low=-numpy.inf, high=numpy.inf, size=None):
         """ """
+        if have_scipy:
+            return truncated_normal_ppf(self.rng.uniform(size=size), mu, sigma, low, high)
         # not sure how well this works with parallel_safe, mask_local
         gen = lambda n: self.rng.normal(loc=mu, scale=sigma, size=n)
         return self._clipped(gen, low=low, high=high, size=size)
@@ -260,22 +361,20 @@ class GSLRNG(WrappedRNG):
         return getattr(self.rng, name)
 
     def _next(self, distribution, n, parameters):
-        distribution_gsl, parameter_map = self.translations[distribution]
-        if set(parameters.keys()) != set(parameter_map.keys()):
-            # all parameters must be provided. We do not provide default values (this can be discussed).
-            errmsg = "Incorrect parameterization of random distribution. Expected %s, got %s."
-            raise KeyError(errmsg % (parameter_map.keys(), parameters.keys()))
-        parameters_gsl = dict((parameter_map[k], v) for k, v in parameters.items())
-        if hasattr(self, distribution_gsl):
-            f_distr = getattr(self, distribution_gsl)
-        else:
-            f_distr = getattr(self.rng, distribution_gsl)
+        f_distr, parameters_gsl = self._dispatch(distribution, parameters)
         # Has this been tested? If so, move most of _next to Wrapped RNG since there is almost complete overlap with NumpyRNG._next
         values = f_distr(size=n, **parameters_gsl)
         if n == 1:
             values = [values]  # to be consistent with NumpyRNG
         return values
 
+    def _set_stream(self, key, stream):
+        """
+        Re-seed the generator with the stream of random numbers identified by
+        the key returned by `_stream_key()` and the integer `stream`.
+        """
+        self.rng.set(hash((tuple(int(k) for k in key), stream)) % 2**32)
+
     def uniform_int(self, low, high, size=None):
         return low + self.rng.uniform_int(high - low, size)
 
@@ -289,9 +388,214 @@ class GSLRNG(WrappedRNG):
 
     def normal_clipped(self, mu=0.0, sigma=1.0, low=-numpy.inf, high=numpy.inf, size=None):
         """ """
+        if have_scipy:
+            u = self._next('uniform', size, {'low': 0.0, 'high': 1.0})
+            return truncated_normal_ppf(numpy.asarray(u), mu, sigma, low, high)
         gen = lambda n: self.normal(mu, sigma, n)
         return self._clipped(gen, low=low, high=high, size=size)
 
+
+# Constants of the Philox4x32 generator (Salmon et al., 2011)
+PHILOX_M = (numpy.uint64(0xD2511F53), numpy.uint64(0xCD9E8D57))
+PHILOX_W = (0x9E3779B9, 0xBB67AE85)
+PHILOX_ROUNDS = 10
+
+
+def philox4x32(counter, key, rounds=PHILOX_ROUNDS):
+    """
+    The Philox4x32 counter-based random number generator (Salmon et al.,
+    "Parallel random numbers: as easy as 1, 2, 3", SC'11), vectorized over
+    counters.
+
+    `counter` should be a sequence of four arrays of unsigned 32-bit
+    integers, `key` a pair of integers. Returns four arrays of random unsigned
+    32-bit integers.
+    """
+    mask = numpy.uint64(0xFFFFFFFF)
+    shift = numpy.uint64(32)
+    c0, c1, c2, c3 = [numpy.array(c, dtype=numpy.uint64) for c in counter]
+    k0, k1 = [int(k) & 0xFFFFFFFF for k in key]
+    product0 = numpy.empty_like(c0)
+    product1 = numpy.empty_like(c0)
+    for i in range(rounds):
+        # the products of two 32-bit integers fit into 64 bits, so the high and
+        # low halves can be extracted with shifts and masks. Operations are
+        # done in-place to avoid allocating temporary arrays.
+        numpy.multiply(c0, PHILOX_M[0], out=product0)
+        numpy.multiply(c2, PHILOX_M[1], out=product1)
+        numpy.right_shift(product1, shift, out=c0)
+        c0 ^= c1
+        c0 ^= numpy.uint64(k0)
+        numpy.bitwise_and(product1, mask, out=c1)
+        numpy.right_shift(product0, shift, out=c2)
+        c2 ^= c3
+        c2 ^= numpy.uint64(k1)
+        numpy.bitwise_and(product0, mask, out=c3)
+        k0 = (k0 + PHILOX_W[0]) & 0xFFFFFFFF
+        k1 = (k1 + PHILOX_W[1]) & 0xFFFFFFFF
+    return c0, c1, c2, c3
+
+
+class PhiloxRNG(WrappedRNG):
+    """
+    Counter-based random number generator, using the Philox4x32-10 algorithm.
+
+    The random numbers form a sequence, like those of other generators, but
+    the value at a given position in the sequence is computed directly from
+    the seed and the position, so numbers can be generated for any part of the
+    sequence without generating those that come before. When `next()` is
+    called with a boolean array `mask_local`, only the values for which the
+    mask is True are generated (although the position in the sequence is
+    advanced by `n`). This means that parallel-safe generation costs only as
+    much as the number of values needed on the local MPI node, for the
+    `uniform`, `uniform_int`, `normal`, `lognormal`, `exponential`,
+    `normal_clipped` and `normal_clipped_to_boundary` distributions. Values
+    from the other distributions are generated sequentially for each call to
+    `next()`, from a :class:`numpy.random.RandomState` seeded with the
+    position in the sequence, so are still independent of the number of
+    nodes, but without the saving.
+
+    The sequences are not the same as those of :class:`NumpyRNG`.
+    """
+    random_access = True
+    translations = NumpyRNG.translations
+
+    def __init__(self, seed=None, parallel_safe=True):
+        if seed is None:
+            seed = int(numpy.random.randint(0, 2**31 - 1))
+        WrappedRNG.__init__(self, seed, parallel_safe)
+        self.position = 0
+
+    def next(self, n=None, distribution=None, parameters=None, mask_local=None):
+        if distribution is None:
+            distribution = 'uniform'
+            if parameters is None:
+                parameters = {"low": 0.0, "high": 1.0}
+        if n is None:
+            return self._generate(distribution, parameters, 1, None)[0]
+        elif n < 0:
+            raise ValueError("The sample number must be positive")
+        if self.num_processes > 1 and not self.parallel_safe:
+            # see WrappedRNG.next()
+            if mask_local is None:
+                n = n // self.num_processes + 1
+            elif mask_local is not False:
+                n = mask_local.sum()
+            mask_local = None
+        if hasattr(mask_local, 'size'):
+            assert mask_local.size == n
+            return self._generate(distribution, parameters, n, numpy.asarray(mask_local, dtype=bool))
+        return self._generate(distribution, parameters, n, None)
+    next.__doc__ = AbstractRNG.next.__doc__
+
+    def _generate(self, distribution, parameters, n, mask):
+        """
+        Return the values at the positions of the next `n` in the sequence
+        selected by the boolean array `mask` (or all of them if `mask` is None).
+        """
+        parameters_np = self._dispatch(distribution, parameters)[1]
+        start = self.position
+        self.position += n
+        method = getattr(self, "_" + distribution, None)
+        if method is None:
+            rng = numpy.random.RandomState(self._key(start, 1))
+            values = getattr(rng, self.translations[distribution][0])(size=n, **parameters_np)
+            if mask is not None:
+                values = values[mask]
+            return values
+        if mask is None:
+            positions = start + numpy.arange(n, dtype=numpy.uint64)
+        else:
+            positions = start + mask.nonzero()[0].astype(numpy.uint64)
+        return method(positions, **parameters)
+
+    def _key(self, position, stream):
+        return numpy.array([self.seed & 0xFFFFFFFF, self.seed >> 32, position & 0xFFFFFFFF,
+                            position >> 32, stream], dtype=numpy.uint32)
+
+    def _bits(self, positions, attempt=0):
+        """Return four arrays of random 32-bit integers for each position."""
+        positions = numpy.asarray(positions, dtype=numpy.uint64)
+        counter = (positions & numpy.uint64(0xFFFFFFFF), positions >> numpy.uint64(32),
+                   numpy.full(positions.shape, attempt, dtype=numpy.uint64),
+                   numpy.zeros(positions.shape, dtype=numpy.uint64))
+        return philox4x32(counter, (self.seed & 0xFFFFFFFF, self.seed >> 32))
+
+    @staticmethod
+    def _to_unit_interval(high_bits, low_bits):
+        """Combine two 32-bit integers into a float in [0, 1) with 53 random bits."""
+        return ((high_bits >> numpy.uint64(5)).astype(float) * 67108864.0
+                + (low_bits >> numpy.uint64(6)).astype(float)) / 9007199254740992.0
+
+    def _standard_uniform(self, positions, attempt=0):
+        x0, x1, x2, x3 = self._bits(positions, attempt)
+        return self._to_unit_interval(x0, x1)
+
+    def _standard_normal(self, positions, attempt=0):
+        # Box-Muller transform, which uses exactly two uniform numbers per value
+        x0, x1, x2, x3 = self._bits(positions, attempt)
+        u1 = self._to_unit_interval(x0, x1)
+        u2 = self._to_unit_interval(x2, x3)
+        return numpy.sqrt(-2.0 * numpy.log1p(-u1)) * numpy.cos(2 * numpy.pi * u2)
+
+    def _uniform(self, positions, low, high):
+        return low + (high - low) * self._standard_uniform(positions)
+
+    def _uniform_int(self, positions, low, high):
+        return low + numpy.floor((high - low) * self._standard_uniform(positions)).astype(int)
+
+    def _normal(self, positions, mu, sigma):
+        return mu + sigma * self._standard_normal(positions)
+
+    def _lognormal(self, positions, mu, sigma):
+        return numpy.exp(self._normal(positions, mu, sigma))
+
+    def _exponential(self, positions, beta):
+        return -beta * numpy.log1p(-self._standard_uniform(positions))
+
+    def _normal_clipped(self, positions, mu, sigma, low, high):
+        if have_scipy:
+            return truncated_normal_ppf(self._standard_uniform(positions), mu, sigma, low, high)
+        # values outside the range are redrawn, using a different part of the
+        # counter space for each attempt, so every value is computed independently
+        values = mu + sigma * self._standard_normal(positions)
+        idx = numpy.where((values > high) | (values < low))[0]
+        attempt = 0
+        while idx.size > 0:
+            attempt += 1
+            if attempt > MAX_REDRAWS:
+                raise Exception("Maximum number of redraws exceeded. Check the parameterization of your distribution.")
+            redrawn = mu + sigma * self._standard_normal(positions[idx], attempt)
+            values[idx] = redrawn
+            idx = idx[numpy.where((redrawn > high) | (redrawn < low))[0]]
+        return values
+
+    def _normal_clipped_to_boundary(self, positions, mu, sigma, low, high):
+        return numpy.maximum(numpy.minimum(self._normal(positions, mu, sigma), high), low)
+
+    def permutation(self, x):
+        """Return a random permutation of the array `x`, along its first axis."""
+        x = numpy.asarray(x)
+        u = self.next(len(x), 'uniform', {'low': 0.0, 'high': 1.0}, mask_local=False)
+        return x[numpy.argsort(u, kind='mergesort')]
+
+    def _set_stream(self, key, stream):
+        """
+        Switch to the stream of random numbers identified by the key returned
+        by `_stream_key()` and the integer `stream`.
+        """
+        self.position = (int(key[0]) << 32 | int(key[1])) + (stream << 48)
+
+    def get_state(self):
+        # the key is derived from the seed
+        return (self.seed, self.position)
+    get_state.__doc__ = AbstractRNG.get_state.__doc__
+
+    def set_state(self, state):
+        self.seed, self.position = (int(x) for x in state)
+    set_state.__doc__ = AbstractRNG.set_state.__doc__
+
+
 # should add a wrapper for the built-in Python random module.
 
 
@@ -320,6 +624,15 @@ class RandomDistribution(VectorizedIterable):
         `rng`:
             if present, should be a :class:`NumpyRNG`, :class:`GSLRNG` or
             :class:`NativeRNG` object.
+        `buffer_size`:
+            if given, numbers are drawn from `rng` in blocks of at least this
+            size, and requests for fewer numbers are served from the current
+            block. This removes most of the overhead of drawing a few numbers
+            at a time. For a given seed the numbers are still the same every
+            time, but if `rng` is shared with other distributions they are not
+            the same as without buffering. Buffering is not used with
+            :class:`PhiloxRNG`, with :class:`NativeRNG` or when the RNG is not
+            parallel safe and there is more than one MPI process.
         `parameters_named`:
             parameters of the distribution, provided as keyword arguments.
 
@@ -344,7 +657,7 @@ class RandomDistribution(VectorizedIterable):
     exponential                 beta
     lognormal                   mu, sigma
     normal                      mu, sigma
-    normal_clipped              mu, sigma, low, high  Values outside (low, high) are redrawn
+    normal_clipped              mu, sigma, low, high  Normal distribution truncated to (low, high)
     normal_clipped_to_boundary  mu, sigma, low, high  Values below/above low/high are set to low/high
     poisson                     lambda_               Trailing underscore since lambda is a Python keyword
     uniform                     low, high
@@ -353,7 +666,8 @@ class RandomDistribution(VectorizedIterable):
     ==========================  ====================  ====================================================
     """
 
-    def __init__(self, distribution, parameters_pos=None, rng=None, **parameters_named):
+    def __init__(self, distribution, parameters_pos=None, rng=None, buffer_size=None,
+                 **parameters_named):
         """
         Create a new RandomDistribution.
         """
@@ -364,15 +678,51 @@ class RandomDistribution(VectorizedIterable):
             self.rng = rng
         else:  # use numpy.random.RandomState() by default
             self.rng = NumpyRNG()  # should we provide a seed?
+        self.buffer_size = buffer_size
+        self._buffer = numpy.zeros((0,))  # numbers drawn but not yet used
+        self._buffer_position = 0
 
     def next(self, n=None, mask_local=None):
         """Return `n` random numbers from the distribution."""
+        if self._use_buffer():
+            if n is None:
+                return self._take(1)[0]
+            elif n < 0:
+                raise ValueError("The sample number must be positive")
+            res = self._take(n)
+            if self.rng.num_processes > 1 and hasattr(mask_local, 'size'):
+                assert mask_local.size == n
+                res = res[mask_local]  # see WrappedRNG.next()
+            return res
         res = self.rng.next(n=n,
                             distribution=self.name,
                             parameters=self.parameters,
                             mask_local=mask_local)
         return res
 
+    def _use_buffer(self):
+        return (self.buffer_size is not None
+                and isinstance(self.rng, WrappedRNG)
+                and not isinstance(self.rng, NativeRNG)
+                and not self.rng.random_access
+                and (self.rng.parallel_safe or self.rng.num_processes == 1))
+
+    def _take(self, n):
+        """Return the next `n` numbers from the buffer, refilling it as needed."""
+        available = self._buffer.size - self._buffer_position
+        if n > available:
+            new_values = self.rng.next(n=max(self.buffer_size, n - available),
+                                       distribution=self.name,
+                                       parameters=self.parameters,
+                                       mask_local=False)
+            if available > 0:
+                new_values = numpy.hstack((self._buffer[self._buffer_position:], new_values))
+            self._buffer = new_values
+            self._buffer_position = 0
+        res = self._buffer[self._buffer_position:self._buffer_position + n]
+        self._buffer_position += n
+        return res
+
     def __str__(self):
         return "RandomDistribution('%(name)s', %(parameters)s, %(rng)s)" % self.__dict__
 
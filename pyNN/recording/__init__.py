@@ -64,6 +64,65 @@ def gather_array(data):
         return gdata.reshape((gdata.size / num_columns, num_columns))
 
 
+def gather_columns(columns, all=False):
+    """
+    Gather a list of 1D numpy arrays, all of the same length, from all MPI
+    nodes. Each array is sent as a contiguous typed buffer (using `Gatherv`,
+    or `Allgatherv` if `all` is True), and the arrays from the different nodes
+    are concatenated in order of rank.
+
+    Returns the gathered arrays on the root node (or on all nodes if `all` is
+    True). Other nodes get back their own arrays.
+    """
+    mpi_comm, mpi_flags = get_mpi_comm()
+    size = columns[0].size if columns else 0
+    if all:
+        sizes = mpi_comm.allgather(size)
+    else:
+        sizes = mpi_comm.gather(size, root=MPI_ROOT)
+    receiving = all or mpi_comm.rank == MPI_ROOT
+    if receiving:
+        displacements = [sum(sizes[:i]) for i in range(len(sizes))]
+    gathered = []
+    for column in columns:
+        column = numpy.ascontiguousarray(column)
+        if receiving:
+            gcolumn = numpy.empty((sum(sizes),), dtype=column.dtype)
+            recvbuf = [gcolumn, (sizes, displacements)]
+        else:
+            gcolumn = column
+            recvbuf = None
+        if all:
+            mpi_comm.Allgatherv(column, recvbuf)
+        else:
+            mpi_comm.Gatherv(column, recvbuf, root=MPI_ROOT)
+        gathered.append(gcolumn)
+    return gathered
+
+
+def broadcast_columns(columns):
+    """
+    Send a list of 1D numpy arrays, all of the same length, from the root MPI
+    node to all the others. Each array is sent as a contiguous typed buffer,
+    using `Bcast`. On the other nodes, `columns` is used only for the number
+    of arrays and their dtypes.
+
+    Returns the arrays from the root node.
+    """
+    mpi_comm, mpi_flags = get_mpi_comm()
+    is_root = mpi_comm.rank == MPI_ROOT
+    size = mpi_comm.bcast(columns[0].size if is_root else None, root=MPI_ROOT)
+    broadcast = []
+    for column in columns:
+        if is_root:
+            column = numpy.ascontiguousarray(column)
+        else:
+            column = numpy.empty((size,), dtype=column.dtype)
+        mpi_comm.Bcast(column, root=MPI_ROOT)
+        broadcast.append(column)
+    return broadcast
+
+
 def gather_dict(D, all=False):
     # Note that if the same key exists on multiple nodes, the value from the
     # node with the highest rank will appear in the final dict.
@@ -7,6 +7,7 @@ Classes:
     StandardTextFile
     PickleFile
     NumpyBinaryFile
+    NumpyMemmapFile
     HDF5ArrayFile - requires PyTables
 
 :copyright: Copyright 2006-2016 by the PyNN team, see AUTHORS.
@@ -14,9 +15,11 @@ Classes:
 
 """
 
+import json
 import numpy
 import os
 import shutil
+from itertools import islice
 try:
     import cPickle as pickle
 except ImportError:
@@ -130,6 +133,15 @@ class BaseFile(object):
         """
         raise NotImplementedError
 
+    def read_chunks(self, chunk_size):
+        """
+        Read data from the file and return an iterator over NumPy arrays of at
+        most `chunk_size` rows.
+        """
+        data = self.read()
+        for start in range(0, len(data), chunk_size):
+            yield data[start:start + chunk_size]
+
     def get_metadata(self):
         """
         Read metadata from the file and return a dict.
@@ -166,6 +178,17 @@ class StandardTextFile(BaseFile):
         self._check_open()
         return numpy.loadtxt(self.fileobj)
 
+    def read_chunks(self, chunk_size):
+        __doc__ = BaseFile.read_chunks.__doc__
+        self._check_open()
+        lines = (line for line in self.fileobj if line.strip() and line.lstrip()[:1] not in ("#", b"#"))
+        while True:
+            chunk = list(islice(lines, chunk_size))
+            if not chunk:
+                break
+            yield numpy.loadtxt(chunk, ndmin=2)
+        self.fileobj.seek(0)
+
     def get_metadata(self):
         self._check_open()
         D = {}
@@ -242,6 +265,85 @@ class NumpyBinaryFile(BaseFile):
         return D
 
 
+class NumpyMemmapFile(BaseFile):
+    """
+    Data are saved as a single two-dimensional array, either in .npy format
+    (if the filename given to the constructor ends in ".npy") or as raw binary
+    data with no header, in which case the `dtype` and the number of columns,
+    `n_columns`, must be given when reading. The format is kept if the file is
+    renamed.
+
+    Data are read through a memory map, so that reading in chunks
+    only loads the requested rows. Metadata are saved in JSON format in a
+    separate file, with ".json" appended to the file name. A `metadata` dict
+    passed to the constructor is returned by :meth:`get_metadata` instead.
+    """
+
+    def __init__(self, filename, mode='rb', dtype=float, n_columns=None, metadata=None):
+        """
+        Open a file with the given filename and mode.
+        """
+        if 'b' not in mode:
+            mode += 'b'
+        if 'r' in mode:
+            # data are read through numpy.memmap, so no file object is needed
+            self.name = filename
+            self.mode = mode
+        else:
+            BaseFile.__init__(self, filename, mode)
+        self.npy_format = filename.endswith(".npy")
+        self.dtype = numpy.dtype(dtype)
+        self.n_columns = n_columns
+        self.metadata = metadata
+
+    def rename(self, filename):
+        if 'r' in self.mode:
+            self.name = filename
+        else:
+            BaseFile.rename(self, filename)
+
+    def write(self, data, metadata):
+        __doc__ = BaseFile.write.__doc__
+        self._check_open()
+        data = numpy.asarray(data, dtype=self.dtype)
+        if self.npy_format:
+            numpy.save(self.fileobj, data)
+        else:
+            data.tofile(self.fileobj)
+        self.fileobj.close()
+        with open(self.name + ".json", "w") as fp:
+            json.dump(metadata, fp)
+        self.metadata = metadata
+
+    def _memmap(self):
+        if self.npy_format:
+            return numpy.load(self.name, mmap_mode='r')
+        if self.n_columns is None:
+            raise ValueError("The number of columns must be given to read a raw binary file")
+        if os.path.getsize(self.name) == 0:
+            return numpy.zeros((0, self.n_columns), dtype=self.dtype)
+        return numpy.memmap(self.name, dtype=self.dtype, mode='r').reshape((-1, self.n_columns))
+
+    def read(self):
+        __doc__ = BaseFile.read.__doc__
+        return numpy.array(self._memmap())
+
+    def read_chunks(self, chunk_size):
+        __doc__ = BaseFile.read_chunks.__doc__
+        data = self._memmap()
+        for start in range(0, data.shape[0], chunk_size):
+            yield numpy.array(data[start:start + chunk_size])
+
+    def get_metadata(self):
+        __doc__ = BaseFile.get_metadata.__doc__
+        if self.metadata is not None:
+            return self.metadata
+        if os.path.exists(self.name + ".json"):
+            with open(self.name + ".json") as fp:
+                return json.load(fp)
+        return {}
+
+
 if have_hdf5:
     class HDF5ArrayFile(BaseFile):
         """
@@ -281,6 +383,12 @@ if have_hdf5:
             __doc__ = BaseFile.read.__doc__
             return self.fileobj.root.data.read()
 
+        def read_chunks(self, chunk_size):
+            __doc__ = BaseFile.read_chunks.__doc__
+            node = self.fileobj.root.data
+            for start in range(0, node.nrows, chunk_size):
+                yield node.read(start, min(start + chunk_size, node.nrows))
+
         def get_metadata(self):
             __doc__ = BaseFile.get_metadata.__doc__
             D = {}
@@ -31,6 +31,11 @@ except NameError:
 import numpy
 import math
 from operator import and_
+try:
+    from scipy.spatial import cKDTree
+    have_scipy = True
+except ImportError:
+    have_scipy = False
 from pyNN.random import NumpyRNG
 from pyNN import descriptions
 import logging
@@ -128,8 +133,77 @@ class Space(object):
         numpy.sqrt(d, d)
         return d.flatten()
 
+    def paired_distances(self, A, B):
+        """
+        Calculate the distances between corresponding pairs of points in two
+        sets of coordinates of the same length, i.e. between A[k] and B[k]
+        for all k, given the topology of the current space.
+        """
+        assert A.shape == B.shape
+        assert A.shape[-1] == 3
+        A = A.reshape(-1, 3)
+        B = self.scale_factor * (B.reshape(-1, 3) + self.offset)
+        d = numpy.zeros((A.shape[0],), dtype=A.dtype)
+        for axis in self.axes:
+            diff2 = A[:, axis] - B[:, axis]
+            if self.periodic_boundaries is not None:
+                boundaries = self.periodic_boundaries[axis]
+                if boundaries is not None:
+                    range = boundaries[1] - boundaries[0]
+                    ad2 = abs(diff2)
+                    diff2 = numpy.minimum(ad2, range - ad2)
+            d += diff2**2
+        return numpy.sqrt(d)
+
+    def neighbours(self, A, B, radius):
+        """
+        For each point in the set of coordinates B, find the points in A which
+        lie within distance `radius`, given the topology of the current space.
+
+        Returns a list containing, for each point in B, a sorted array of
+        indices into A.
+
+        If scipy is available, a KD-tree is used to find candidate points,
+        otherwise the full distance matrix is calculated, one point of B at a
+        time.
+        """
+        assert A.shape[-1] == 3
+        assert B.shape[-1] == 3
+        if have_scipy and A.shape[0] > 0:
+            A_tree = A.copy()
+            B_tree = self.scale_factor * (B + self.offset)
+            boxsize = None
+            if self.periodic_boundaries is not None:
+                # the tree needs coordinates wrapped into [0, L) along periodic axes
+                boxsize = numpy.zeros((3,))
+                for axis, boundaries in enumerate(self.periodic_boundaries):
+                    if boundaries is not None:
+                        boxsize[axis] = boundaries[1] - boundaries[0]
+                        A_tree[:, axis] = (A_tree[:, axis] - boundaries[0]) % boxsize[axis]
+                        B_tree[:, axis] = (B_tree[:, axis] - boundaries[0]) % boxsize[axis]
+                boxsize = boxsize[self.axes]
+            tree = cKDTree(A_tree[:, self.axes], boxsize=boxsize)
+            candidates = [numpy.sort(numpy.array(c, dtype=int))
+                          for c in tree.query_ball_point(B_tree[:, self.axes], radius)]
+            # check the distances with the same metric as used elsewhere, to
+            # avoid any discrepancies at the edge of the radius
+            sizes = [c.size for c in candidates]
+            sources = numpy.hstack(candidates + [numpy.array([], dtype=int)])
+            targets = numpy.repeat(numpy.arange(B.shape[0]), sizes)
+            within = self.paired_distances(A[sources], B[targets]) <= radius
+            bounds = numpy.cumsum([0] + sizes)
+            return [sources[start:stop][within[start:stop]]
+                    for start, stop in zip(bounds[:-1], bounds[1:])]
+        else:
+            return [(self.distances(A, B[j]) <= radius).nonzero()[0]
+                    for j in range(B.shape[0])]
+
     def distance_generator(self, f, g):
         def distance_map(i, j):
+            if (isinstance(i, numpy.ndarray) and isinstance(j, numpy.ndarray)
+                    and i.ndim == 1 and j.ndim == 1):
+                # lists of (i, j) addresses, e.g. the connections of a projection
+                return self.paired_distances(f(i), g(j))
             shape = []
             if isinstance(i, numpy.ndarray) and i.ndim == 2:
                 i = i[:, 0]
@@ -14,6 +14,10 @@ from pyNN import connectors, random, errors, space, recording
 import numpy
 import os
 import sys
+try:
+    from unittest.mock import patch
+except ImportError:
+    from mock import patch
 from numpy.testing import assert_array_equal, assert_array_almost_equal
 from .mocks import MockRNG, MockRNG2
 import pyNN.mock as sim
@@ -223,6 +227,29 @@ class TestFixedProbabilityConnector(unittest.TestCase):
                           (2, 1, 0.0, 0.123),
                           (3, 1, 0.0, 0.123)])
 
+    def test_connect_sparse(self, sim=sim):
+        C = connectors.FixedProbabilityConnector(p_connect=0.5, sparse=True,
+                                                 rng=random.NumpyRNG(seed=8658764, parallel_safe=True))
+        syn = sim.StaticSynapse()
+        prj = sim.Projection(self.p1, self.p2, C, syn)
+        # the same connections as if all columns were local
+        C.rng = random.NumpyRNG(seed=8658764, parallel_safe=True)
+        sources = list(C._sparse_connection_map(prj)())
+        expected = [(i, j) for j in (1, 3) for i in sources[j]]
+        self.assertEqual([(int(i), int(j)) for i, j, w in prj.get('weight', format='list', gather=False)],
+                         expected)
+
+    def test_connect_with_random_access_rng(self, sim=sim):
+        C = connectors.FixedProbabilityConnector(p_connect=0.5,
+                                                 rng=random.PhiloxRNG(seed=8658764, parallel_safe=True))
+        prj = sim.Projection(self.p1, self.p2, C, sim.StaticSynapse())
+        self.assertEqual(C.rng.position, 20)
+        # the same connections as if all columns were local
+        connected = random.PhiloxRNG(seed=8658764).next(20).reshape((5, 4)).T < 0.5
+        expected = [(i, j) for j in (1, 3) for i in range(4) if connected[i, j]]
+        self.assertEqual([(int(i), int(j)) for i, j, w in prj.get('weight', format='list', gather=False)],
+                         expected)
+
     @register()
     def test_connect_with_default_args_again(self, sim=sim):
         C = connectors.FixedProbabilityConnector(p_connect=0.5,
@@ -438,7 +465,8 @@ class TestFromFileConnector(unittest.TestCase):
             ]
 
     def tearDown(self, sim=sim):
-        for path in ("test.connections", "test.connections.1", "test.connections.2"):
+        for path in ("test.connections", "test.connections.1", "test.connections.2",
+                     "test.connections.npy", "test.connections.bin"):
             if os.path.exists(path):
                 os.remove(path)
 
@@ -463,6 +491,28 @@ class TestFromFileConnector(unittest.TestCase):
                          [(0, 1, 0.5, 0.14),
                           (2, 3, 0.3, 0.12)])
 
+    @register()
+    def test_connect_with_npy_file_in_chunks(self, sim=sim):
+        numpy.save("test.connections.npy", numpy.array(self.connection_list))
+        C = connectors.FromFileConnector("test.connections.npy", chunk_size=2)
+        syn = sim.StaticSynapse()
+        prj = sim.Projection(self.p1, self.p2, C, syn)
+        self.assertEqual(sorted(prj.get(["weight", "delay"], format='list', gather=False)),
+                         [(0, 1, 0.5, 0.14),
+                          (2, 3, 0.3, 0.12)])
+
+    @register()
+    def test_connect_with_raw_binary_file(self, sim=sim):
+        numpy.array(self.connection_list).tofile("test.connections.bin")
+        file = recording.files.NumpyMemmapFile("test.connections.bin", mode='r', n_columns=4,
+                                               metadata={"columns": ["i", "j", "weight", "delay"]})
+        C = connectors.FromFileConnector(file, chunk_size=3)
+        syn = sim.StaticSynapse()
+        prj = sim.Projection(self.p1, self.p2, C, syn)
+        self.assertEqual(sorted(prj.get(["weight", "delay"], format='list', gather=False)),
+                         [(0, 1, 0.5, 0.14),
+                          (2, 3, 0.3, 0.12)])
+
     @register()
     def test_with_plastic_synapses_not_distributed(self, sim=sim):
         connection_list = [
@@ -496,10 +546,16 @@ class TestFixedNumberPostConnector(unittest.TestCase):
         C = connectors.FixedNumberPostConnector(n=3, rng=MockRNG(delta=1))
         syn = sim.StaticSynapse(weight="0.5*d")
         prj = sim.Projection(self.p1, self.p2, C, syn)
-        # MockRNG.permutation(arr) returns the reverse of arr, so each pre neuron will connect to neurons 4, 3, 2
-        # however, only neuron 3 is on the "local" (fake MPI) node
+        # connections as follows: (pre - list of post)
+        #   0 - 0 3 4
+        #   1 - 1 3 4
+        #   2 - 0 2 3
+        #   3 - 0 1 3
+        # however, only neurons 1 and 3 are on the "local" (fake MPI) node
         self.assertEqual(prj.get(["weight", "delay"], format='list', gather=False),  # use gather False because we are faking the MPI
-                         [(0, 3, 1.5, 0.123),
+                         [(1, 1, 0.0, 0.123),
+                          (3, 1, 1.0, 0.123),
+                          (0, 3, 1.5, 0.123),
                           (1, 3, 1.0, 0.123),
                           (2, 3, 0.5, 0.123),
                           (3, 3, 0.0, 0.123)])
@@ -509,17 +565,20 @@ class TestFixedNumberPostConnector(unittest.TestCase):
         C = connectors.FixedNumberPostConnector(n=7, rng=MockRNG(delta=1))
         syn = sim.StaticSynapse()
         prj = sim.Projection(self.p1, self.p2, C, syn)
-        # each pre neuron will connect to all post neurons (population size 5 is less than n), then to 4, 3 (MockRNG.permutation)
+        # each pre neuron will connect to all post neurons (population size 5 is less than n), then to two more:
+        #   0 - 0 4
+        #   1 - 0 1
+        #   2 - 1 2
+        #   3 - 2 3
         self.assertEqual(prj.get(["weight", "delay"], format='list', gather=False),  # use gather False because we are faking the MPI
                          [(0, 1, 0.0, 0.123),
                           (1, 1, 0.0, 0.123),
+                          (1, 1, 0.0, 0.123),
+                          (2, 1, 0.0, 0.123),
                           (2, 1, 0.0, 0.123),
                           (3, 1, 0.0, 0.123),
                           (0, 3, 0.0, 0.123),
-                          (0, 3, 0.0, 0.123),
                           (1, 3, 0.0, 0.123),
-                          (1, 3, 0.0, 0.123),
-                          (2, 3, 0.0, 0.123),
                           (2, 3, 0.0, 0.123),
                           (3, 3, 0.0, 0.123),
                           (3, 3, 0.0, 0.123)])
@@ -530,27 +589,25 @@ class TestFixedNumberPostConnector(unittest.TestCase):
         syn = sim.StaticSynapse()
         prj = sim.Projection(self.p2, self.p2, C, syn)
         # connections as follows: (pre - list of post)
-        #   0 - 1 2 3 4 4 3 2
-        #   1 - 0 2 3 4 4 3 2
-        #   2 - 0 1 3 4 4 3 1
-        #   3 - 0 1 2 4 4 2 1
-        #   4 - 0 1 2 3 3 2 1
+        #   0 - 1 2 3 4 1 3 4
+        #   1 - 0 2 3 4 0 2 4
+        #   2 - 0 1 3 4 0 1 4
+        #   3 - 0 1 2 4 1 2 4
+        #   4 - 0 1 2 3 0 2 3
         self.assertEqual(prj.get(["weight", "delay"], format='list', gather=False),  # use gather False because we are faking the MPI
                          [(0, 1, 0.0, 0.123),
+                          (0, 1, 0.0, 0.123),
                           (2, 1, 0.0, 0.123),
                           (2, 1, 0.0, 0.123),
                           (3, 1, 0.0, 0.123),
                           (3, 1, 0.0, 0.123),
                           (4, 1, 0.0, 0.123),
-                          (4, 1, 0.0, 0.123),
                           (0, 3, 0.0, 0.123),
                           (0, 3, 0.0, 0.123),
                           (1, 3, 0.0, 0.123),
-                          (1, 3, 0.0, 0.123),
-                          (2, 3, 0.0, 0.123),
                           (2, 3, 0.0, 0.123),
                           (4, 3, 0.0, 0.123),
-                          (4, 3, 0.0, 0.123),])
+                          (4, 3, 0.0, 0.123)])
 
     @register()
     def test_with_replacement(self, sim=sim):
@@ -589,16 +646,18 @@ class TestFixedNumberPostConnector(unittest.TestCase):
                                                allow_self_connections=False, rng=MockRNG(start=2, delta=1))
         syn = sim.StaticSynapse()
         prj = sim.Projection(self.p2, self.p2, C, syn)
-        # 0 - 2 3 4
-        # 1 - 0 2 3
-        # 2 - 4 0 1
-        # 3 - 2 4 0
-        # 4 - 1 2 3
+        # 0 - 1 3 4
+        # 1 - 2 3 4
+        # 2 - 0 1 3
+        # 3 - 0 1 4
+        # 4 - 0 2 3
         self.assertEqual(prj.get(["weight", "delay"], format='list', gather=False),  # use gather False because we are faking the MPI
-                         [(2, 1, 0.0, 0.123),
-                          (4, 1, 0.0, 0.123),
+                         [(0, 1, 0.0, 0.123),
+                          (2, 1, 0.0, 0.123),
+                          (3, 1, 0.0, 0.123),
                           (0, 3, 0.0, 0.123),
                           (1, 3, 0.0, 0.123),
+                          (2, 3, 0.0, 0.123),
                           (4, 3, 0.0, 0.123)])
 
 
@@ -617,12 +676,12 @@ class TestFixedNumberPreConnector(unittest.TestCase):
         syn = sim.StaticSynapse(weight="0.1*d")
         prj = sim.Projection(self.p1, self.p2, C, syn)
         self.assertEqual(prj.get(["weight", "delay"], format='list', gather=False),  # use gather False because we are faking the MPI
-                         [(3, 1, 0.2, 0.123),
-                          (2, 1, 0.1, 0.123),
-                          (1, 1, 0.0, 0.123),
-                          (3, 3, 0.0, 0.123),
+                         [(1, 1, 0.0, 0.123),
+                          (0, 1, 0.1, 0.123),
+                          (3, 1, 0.2, 0.123),
+                          (1, 3, 0.2, 0.123),
                           (2, 3, 0.1, 0.123),
-                          (1, 3, 0.2, 0.123),])
+                          (3, 3, 0.0, 0.123)])
 
     @register()
     def test_with_n_larger_than_population_size(self, sim=sim):
@@ -634,16 +693,16 @@ class TestFixedNumberPreConnector(unittest.TestCase):
                           (1, 1, 0.0, 0.123),
                           (2, 1, 0.0, 0.123),
                           (3, 1, 0.0, 0.123),
-                          (3, 1, 0.0, 0.123),
-                          (2, 1, 0.0, 0.123),
                           (1, 1, 0.0, 0.123),
+                          (0, 1, 0.0, 0.123),
+                          (3, 1, 0.0, 0.123),
                           (0, 3, 0.0, 0.123),
                           (1, 3, 0.0, 0.123),
                           (2, 3, 0.0, 0.123),
                           (3, 3, 0.0, 0.123),
-                          (3, 3, 0.0, 0.123),
+                          (1, 3, 0.0, 0.123),
                           (2, 3, 0.0, 0.123),
-                          (1, 3, 0.0, 0.123),])
+                          (3, 3, 0.0, 0.123)])
 
     @register()
     def test_with_n_larger_than_population_size_no_self_connections(self, sim=sim):
@@ -655,16 +714,16 @@ class TestFixedNumberPreConnector(unittest.TestCase):
                           (2, 1, 0.0, 0.123),
                           (3, 1, 0.0, 0.123),
                           (4, 1, 0.0, 0.123),
-                          (4, 1, 0.0, 0.123),
-                          (3, 1, 0.0, 0.123),
                           (2, 1, 0.0, 0.123),
+                          (0, 1, 0.0, 0.123),
+                          (4, 1, 0.0, 0.123),
                           (0, 3, 0.0, 0.123),
                           (1, 3, 0.0, 0.123),
                           (2, 3, 0.0, 0.123),
                           (4, 3, 0.0, 0.123),
-                          (4, 3, 0.0, 0.123),
+                          (1, 3, 0.0, 0.123),
                           (2, 3, 0.0, 0.123),
-                          (1, 3, 0.0, 0.123),])
+                          (4, 3, 0.0, 0.123)])
 
     @register()
     def test_with_replacement(self, sim=sim):
@@ -707,21 +766,12 @@ class TestFixedNumberPreConnector(unittest.TestCase):
         syn = sim.StaticSynapse()
         prj = sim.Projection(self.p2, self.p2, C, syn)
         self.assertEqual(prj.get(["weight", "delay"], format='list', gather=False),  # use gather False because we are faking the MPI
-                         [#(2, 0, 0.0, 0.123),  # [2, 3, 4] --> [2, 3, 4]
-                          #(3, 0, 0.0, 0.123),
-                          #(4, 0, 0.0, 0.123),
-                          (0, 1, 0.0, 0.123),   # [0, 1, 2] --> [0, 3, 2]
-                          #(1, 1, 0.0, 0.123),
+                         [(2, 1, 0.0, 0.123),
                           (3, 1, 0.0, 0.123),
-                          (2, 1, 0.0, 0.123),
-                          #(4, 2, 0.0, 0.123),  # [4, 0, 1] --> [4, 0, 1]
-                          #(0, 2, 0.0, 0.123),
-                          #(1, 2, 0.0, 0.123),
-                          (2, 3, 0.0, 0.123),   # [2, 3, 4] --> [2, 0, 4]
-                          #(3, 3, 0.0, 0.123),
-                          (0, 3, 0.0, 0.123),
+                          (4, 1, 0.0, 0.123),
                           (4, 3, 0.0, 0.123),
-                          ])
+                          (0, 3, 0.0, 0.123),
+                          (1, 3, 0.0, 0.123)])
 
     @register()
     def test_no_replacement_no_self_connections(self, sim=sim):
@@ -730,13 +780,12 @@ class TestFixedNumberPreConnector(unittest.TestCase):
         syn = sim.StaticSynapse()
         prj = sim.Projection(self.p2, self.p2, C, syn)
         self.assertEqual(prj.get(["weight", "delay"], format='list', gather=False),  # use gather False because we are faking the MPI
-                         [(4, 1, 0.0, 0.123),
+                         [(2, 1, 0.0, 0.123),
                           (3, 1, 0.0, 0.123),
-                          (2, 1, 0.0, 0.123),
-                          (4, 3, 0.0, 0.123),
-                          #(3, 3, 0.0, 0.123),
+                          (4, 1, 0.0, 0.123),
+                          (1, 3, 0.0, 0.123),
                           (2, 3, 0.0, 0.123),
-                          (1, 3, 0.0, 0.123),])
+                          (4, 3, 0.0, 0.123)])
 
     @register()
     def test_with_replacement_parallel_unsafe(self, sim=sim):
@@ -757,12 +806,12 @@ class TestFixedNumberPreConnector(unittest.TestCase):
         syn = sim.StaticSynapse()
         prj = sim.Projection(self.p1, self.p2, C, syn)
         self.assertEqual(prj.get(["weight", "delay"], format='list', gather=False),  # use gather False because we are faking the MPI
-                         [(3, 1, 0.0, 0.123),
+                         [(0, 1, 0.0, 0.123),
                           (2, 1, 0.0, 0.123),
-                          (1, 1, 0.0, 0.123),
-                          (3, 3, 0.0, 0.123),
-                          (2, 3, 0.0, 0.123),
-                          (1, 3, 0.0, 0.123),])
+                          (3, 1, 0.0, 0.123),
+                          (1, 3, 0.0, 0.123),
+                          (0, 3, 0.0, 0.123),
+                          (3, 3, 0.0, 0.123)])
 
 
 @register_class()
@@ -801,10 +850,28 @@ class TestArrayConnector(unittest.TestCase):
             ], dtype=bool)
         C = connectors.ArrayConnector(connections, safe=False)
         prj = sim.Projection(self.p1, self.p2, C, syn)
-        self.assertEqual(prj.get(["weight", "delay"], format='list', gather=False),  # use gather False because we are faking the MPI
-                         [(1, 0, 0.0, 1.0),
-                          (0, 2, 3.0, 1.3),
-                          (2, 2, 4.0, 1.4000000000000001)])  # better to do an "almost-equal" check
+        assert_array_almost_equal(prj.get(["weight", "delay"], format='list', gather=False),  # use gather False because we are faking the MPI
+                                  [(1, 0, 0.0, 1.0),
+                                   (0, 2, 3.0, 1.3),
+                                   (2, 2, 4.0, 1.4)])
+
+    @unittest.skipUnless(connectors.have_scipy, "Requires SciPy")
+    @register()
+    def test_connect_with_sparse_matrix_and_random_weights_parallel_safe(self, sim=sim):
+        import scipy.sparse
+        rd_w = random.RandomDistribution('uniform', (0, 1), rng=MockRNG(delta=1.0, parallel_safe=True))
+        syn = sim.StaticSynapse(weight=rd_w, delay=0.5)
+        connections = scipy.sparse.csc_matrix(numpy.array([
+                [0, 1, 1, 0],
+                [1, 1, 0, 1],
+                [0, 0, 1, 0],
+            ], dtype=bool))
+        C = connectors.ArrayConnector(connections, safe=False)
+        prj = sim.Projection(self.p1, self.p2, C, syn)
+        assert_array_almost_equal(prj.get(["weight", "delay"], format='list', gather=False),  # use gather False because we are faking the MPI
+                                  [(1, 0, 0.0, 0.5),
+                                   (0, 2, 3.0, 0.5),
+                                   (2, 2, 4.0, 0.5)])
 
 
 @register_class()
@@ -915,6 +982,15 @@ class TestIndexBasedProbabilityConnector(unittest.TestCase):
                           (4, 2, 1, 7),
                           (2, 4, 1, 7)])
 
+    @register()
+    def test_connect_with_max_offset(self, sim=sim):
+        syn = sim.StaticSynapse(weight=self.IndexBasedWeights(), delay=2)
+        C = connectors.IndexBasedProbabilityConnector(self.IndexBasedProbability(), max_offset=1)
+        prj = sim.Projection(self.p1, self.p2, C, syn)
+        self.assertEqual(prj.get(["weight", "delay"], format='list', gather=False),  # use gather False because we are faking the MPI
+                         [(0, 0, 1, 2),
+                          (1, 2, 3, 2)])
+
 
 @register_class()
 class TestDisplacementDependentProbabilityConnector(unittest.TestCase):
@@ -1030,3 +1106,53 @@ class TestFixedTotalNumberConnector(unittest.TestCase):
         connections = prj.get(["weight", "delay"], format='list', gather=False)
         self.assertLess(len(connections), 12)    # unlikely to be 12, since we have 2 MPI nodes
         self.assertGreater(len(connections), 0)  # unlikely to be 0
+
+    def test_parallel_safe(self):
+        # with a parallel-safe RNG, the local connections should be the same
+        # as those to the local neurons in a serial run
+        def connect():
+            C = connectors.FixedTotalNumberConnector(n=12, rng=random.NumpyRNG(seed=372,
+                                                                               parallel_safe=True))
+            prj = sim.Projection(self.p1, self.p2, C, sim.StaticSynapse(weight=0.5))
+            return sorted((int(i), int(j)) for i, j, w in prj.get('weight', format='list', gather=False))
+        local_connections = connect()
+        sim.setup(num_processes=1, rank=0, min_delay=0.123)
+        self.p1 = sim.Population(4, sim.IF_cond_exp(), structure=space.Line())
+        self.p2 = sim.Population(5, sim.HH_cond_exp(), structure=space.Line())
+        all_connections = connect()
+        self.assertEqual(len(all_connections), 12)
+        self.assertEqual(local_connections,
+                         [(i, j) for i, j in all_connections if j in (1, 3)])
+
+class TestSmallWorldConnector(unittest.TestCase):
+
+    def setUp(self, sim=sim):
+        sim.setup(num_processes=2, rank=1, min_delay=0.123)
+        self.p = sim.Population(20, sim.IF_cond_exp(), structure=space.Line())
+
+    def test_parallel_safe(self):
+        # with a parallel-safe RNG, the local connections should be the same
+        # as those to the local neurons in a serial run
+        def connect():
+            C = connectors.SmallWorldConnector(degree=2.5, rewiring=0.3, allow_self_connections=False,
+                                               rng=random.NumpyRNG(seed=8, parallel_safe=True))
+            prj = sim.Projection(self.p, self.p, C, sim.StaticSynapse())
+            return sorted((int(i), int(j)) for i, j, w in prj.get('weight', format='list', gather=False))
+        local_connections = connect()
+        sim.setup(num_processes=1, rank=0, min_delay=0.123)
+        self.p = sim.Population(20, sim.IF_cond_exp(), structure=space.Line())
+        all_connections = connect()
+        self.assertEqual(local_connections,
+                         [(i, j) for i, j in all_connections if j % 2 == 1])
+
+    def test_not_parallel_safe_uses_connections_from_root(self):
+        C = connectors.SmallWorldConnector(degree=2.5, rewiring=0.3, allow_self_connections=False,
+                                           rng=random.NumpyRNG(seed=8, parallel_safe=False))
+        root_connections = [numpy.array([0, 1, 2, 4]), numpy.array([1, 3, 4, 5])]
+        with patch.object(recording, "broadcast_columns", return_value=root_connections) as broadcast_columns:
+            with patch.object(connectors.SmallWorldConnector, "_generate_connections") as generate_connections:
+                prj = sim.Projection(self.p, self.p, C, sim.StaticSynapse())
+        self.assertTrue(broadcast_columns.called)
+        self.assertFalse(generate_connections.called)  # this is not the root node
+        self.assertEqual(sorted((int(i), int(j)) for i, j, w in prj.get('weight', format='list', gather=False)),
+                         [(0, 1), (1, 3), (4, 5)])
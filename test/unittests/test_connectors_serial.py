@@ -15,6 +15,12 @@ import numpy
 from numpy import nan
 import os
 import sys
+import shutil
+import tempfile
+try:
+    from unittest.mock import Mock, patch
+except ImportError:
+    from mock import Mock, patch
 from numpy.testing import assert_array_equal, assert_array_almost_equal
 from .mocks import MockRNG, MockRNG2, MockRNG3
 import pyNN.mock as sim
@@ -331,6 +337,73 @@ class TestFixedProbabilityConnector(unittest.TestCase):
                           (3, 4, 0.0, 0.123)
                           ])
 
+    def test_connect_with_small_blocks(self, sim=sim):
+        def create_projection():
+            C = connectors.FixedProbabilityConnector(p_connect=0.5,
+                                                     rng=MockRNG(delta=0.07, parallel_safe=True))
+            syn = sim.StaticSynapse(weight=random.RandomDistribution('uniform', (0, 1),
+                                                                     rng=MockRNG(delta=0.1)))
+            return sim.Projection(self.p1, self.p2, C, syn)
+        orig_max_block_memory = connectors.MAX_BLOCK_MEMORY
+        prj1 = create_projection()
+        connectors.MAX_BLOCK_MEMORY = 8 * self.p1.size  # one column per block
+        try:
+            prj2 = create_projection()
+        finally:
+            connectors.MAX_BLOCK_MEMORY = orig_max_block_memory
+        self.assertEqual(len(prj2), 8)
+        assert_array_almost_equal(numpy.array(prj1.get(["weight", "delay"], format='list')),
+                                  numpy.array(prj2.get(["weight", "delay"], format='list')))
+
+    def test_connect_sparse(self, sim=sim):
+        p = sim.Population(200, sim.IF_cond_exp())
+        C = connectors.FixedProbabilityConnector(p_connect=0.1, sparse=True,
+                                                 allow_self_connections=False,
+                                                 rng=random.NumpyRNG(seed=84379))
+        prj = sim.Projection(p, p, C, sim.StaticSynapse())
+        connections = numpy.array(prj.get('weight', format='list'))[:, :2].astype(int)
+        self.assertTrue(3600 < len(prj) < 4400)  # mean 3980, sd 60
+        self.assertFalse((connections[:, 0] == connections[:, 1]).any())
+        self.assertEqual(len(set(map(tuple, connections))), len(prj))
+
+    def test_connect_sparse_no_mutual(self, sim=sim):
+        C = connectors.FixedProbabilityConnector(p_connect=1.0, sparse=True,
+                                                 allow_self_connections='NoMutual')
+        prj = sim.Projection(self.p1, self.p1, C, sim.StaticSynapse())
+        self.assertEqual([(int(i), int(j)) for i, j, w in prj.get('weight', format='list')],
+                         [(1, 0), (2, 0), (3, 0), (2, 1), (3, 1), (3, 2)])
+
+    def test_connect_in_processes(self, sim=sim):
+        p = sim.Population(200, sim.IF_cond_exp())
+
+        def build(processes, sparse):
+            C = connectors.FixedProbabilityConnector(p_connect=0.1, sparse=sparse,
+                                                     allow_self_connections=False,
+                                                     rng=random.NumpyRNG(seed=84379))
+            C.processes = processes
+            syn = sim.StaticSynapse(weight=random.RandomDistribution('uniform', (0.0, 1.0),
+                                                                     rng=random.NumpyRNG(seed=3)))
+            return numpy.array(sim.Projection(p, p, C, syn).get('weight', format='list'))
+
+        for sparse in (False, True):
+            connections = build(2, sparse)
+            # the result does not depend on the number of processes
+            assert_array_equal(connections, build(3, sparse))
+            self.assertTrue(3600 < len(connections) < 4400)  # mean 3980, sd 60
+            self.assertFalse((connections[:, 0] == connections[:, 1]).any())
+            self.assertEqual(len(numpy.unique(connections[:, 2])), len(connections))
+
+    def test_connect_in_processes_without_stream_support(self, sim=sim):
+        # MockRNG does not support independent streams, so a single process is used
+        connections = []
+        for processes in (1, 2):
+            C = connectors.FixedProbabilityConnector(p_connect=0.85,
+                                                     rng=MockRNG(delta=0.1, parallel_safe=True))
+            C.processes = processes
+            prj = sim.Projection(self.p1, self.p2, C, sim.StaticSynapse())
+            connections.append(prj.get(["weight", "delay"], format='list'))
+        self.assertEqual(connections[0], connections[1])
+
     @register()
     def test_connect_with_probability_one(self, sim=sim):
         C = connectors.FixedProbabilityConnector(p_connect=1.)
@@ -455,6 +528,35 @@ class TestDistanceDependentProbabilityConnector(unittest.TestCase):
                           (3, 3, 0.0, 0.123),
                           (3, 4, 0.0, 0.123)])
 
+    def test_connect_with_cutoff(self, sim=sim):
+        C = connectors.DistanceDependentProbabilityConnector(d_expression="d<1.5", cutoff=1.5,
+                                                             rng=MockRNG(delta=0.01))
+        syn = sim.StaticSynapse(weight=lambda d: d)
+        prj = sim.Projection(self.p1, self.p2, C, syn)
+        self.assertEqual(prj.get(["weight", "delay"], format='list'),
+                         [(0, 0, 0.0, 0.123),
+                          (1, 0, 1.0, 0.123),
+                          (0, 1, 1.0, 0.123),
+                          (1, 1, 0.0, 0.123),
+                          (2, 1, 1.0, 0.123),
+                          (1, 2, 1.0, 0.123),
+                          (2, 2, 0.0, 0.123),
+                          (3, 2, 1.0, 0.123),
+                          (2, 3, 1.0, 0.123),
+                          (3, 3, 0.0, 0.123),
+                          (3, 4, 1.0, 0.123)])
+
+    def test_connect_with_cutoff_periodic_boundaries(self, sim=sim):
+        C = connectors.DistanceDependentProbabilityConnector(d_expression="1", cutoff=1.0,
+                                                             allow_self_connections=False,
+                                                             rng=MockRNG(delta=0.01))
+        syn = sim.StaticSynapse()
+        prj = sim.Projection(self.p2, self.p2, C, syn,
+                             space=space.Space(periodic_boundaries=((0, 5), None, None)))
+        self.assertEqual([(int(i), int(j)) for i, j, w in prj.get('weight', format='list')],
+                         [(1, 0), (4, 0), (0, 1), (2, 1), (1, 2), (3, 2),
+                          (2, 3), (4, 3), (0, 4), (3, 4)])
+
 
 @register_class()
 class TestFromListConnector(unittest.TestCase):
@@ -478,6 +580,22 @@ class TestFromListConnector(unittest.TestCase):
         self.assertEqual(prj.get(["weight", "delay"], format='list'),  
                          [(0, 0, 0.1, 0.18)])
                          
+    @register()
+    def test_connect_with_long_list(self, sim=sim):
+        numpy.random.seed(281)
+        n = 1000
+        connection_list = numpy.vstack((numpy.random.randint(0, 4, n),
+                                        numpy.random.randint(0, 5, n),
+                                        numpy.random.uniform(0, 1, n),
+                                        numpy.random.uniform(0.2, 1, n))).T
+        C = connectors.FromListConnector(connection_list)
+        syn = sim.StaticSynapse()
+        prj = sim.Projection(self.p1, self.p2, C, syn)
+        connections = numpy.array(prj.get(["weight", "delay"], format='list'))
+        # connections are grouped by target, in list order for each target
+        order = numpy.argsort(connection_list[:, 1], kind='mergesort')
+        assert_array_almost_equal(connections, connection_list[order], decimal=12)
+
     @register()
     def test_connect_with_valid_list(self, sim=sim):
         connection_list = [
@@ -547,7 +665,9 @@ class TestFromFileConnector(unittest.TestCase):
 
     def tearDown(self, sim=sim):
         sim.end()
-        for path in ("test.connections", "test.connections.1", "test.connections.2"):
+        for path in ("test.connections", "test.connections.1", "test.connections.2",
+                     "test.connections.npy", "test.connections.bin",
+                     "test.connections.npy.0", "test.connections.npy.json"):
             if os.path.exists(path):
                 os.remove(path)
         
@@ -564,6 +684,63 @@ class TestFromFileConnector(unittest.TestCase):
                           (2, 2, 0.4, 0.13),
                           (2, 3, 0.3, 0.12)])
 
+    @register()
+    def test_connect_with_npy_file_in_chunks(self, sim=sim):
+        numpy.save("test.connections.npy", numpy.array(self.connection_list))
+        C = connectors.FromFileConnector("test.connections.npy", chunk_size=2)
+        syn = sim.StaticSynapse()
+        prj = sim.Projection(self.p1, self.p2, C, syn)
+        self.assertEqual(sorted(prj.get(["weight", "delay"], format='list')),
+                         [(0, 0, 0.1, 0.1),
+                          (0, 1, 0.5, 0.14),
+                          (2, 2, 0.4, 0.13),
+                          (2, 3, 0.3, 0.12),
+                          (3, 0, 0.2, 0.11)])
+
+    @register()
+    def test_connect_with_raw_binary_file(self, sim=sim):
+        numpy.array(self.connection_list).tofile("test.connections.bin")
+        file = recording.files.NumpyMemmapFile("test.connections.bin", mode='r', n_columns=4,
+                                               metadata={"columns": ["i", "j", "weight", "delay"]})
+        C = connectors.FromFileConnector(file, chunk_size=3)
+        syn = sim.StaticSynapse()
+        prj = sim.Projection(self.p1, self.p2, C, syn)
+        self.assertEqual(sorted(prj.get(["weight", "delay"], format='list')),
+                         [(0, 0, 0.1, 0.1),
+                          (0, 1, 0.5, 0.14),
+                          (2, 2, 0.4, 0.13),
+                          (2, 3, 0.3, 0.12),
+                          (3, 0, 0.2, 0.11)])
+
+    def test_connect_with_distributed_npy_file(self, sim=sim):
+        numpy.save("test.connections.npy", numpy.zeros((0, 4)))
+        with open("test.connections.npy.0", "wb") as fp:
+            numpy.save(fp, numpy.array(self.connection_list))
+        C = connectors.FromFileConnector("test.connections.npy", distributed=True)
+        prj = sim.Projection(self.p1, self.p2, C, sim.StaticSynapse())
+        self.assertEqual(len(prj), 5)
+        self.assertTrue(os.path.exists("test.connections.npy"))
+
+    def test_connect_with_npy_file_with_metadata(self, sim=sim):
+        connection_list = [(0, 0, 0.1, 0.1, 0.5), (2, 3, 0.3, 0.12, 0.6)]
+        file = recording.files.NumpyMemmapFile("test.connections.npy", mode='wb')
+        file.write(connection_list, {"columns": ["i", "j", "weight", "delay", "U"]})
+        C = connectors.FromFileConnector("test.connections.npy")
+        prj = sim.Projection(self.p1, self.p2, C, sim.TsodyksMarkramSynapse())
+        self.assertEqual(prj.get(["weight", "delay", "U"], format='list'),
+                         [(0, 0, 0.1, 0.1, 0.5), (2, 3, 0.3, 0.12, 0.6)])
+
+    def test_connect_with_wrong_number_of_columns(self, sim=sim):
+        numpy.save("test.connections.npy", numpy.array(self.connection_list)[:, :3])
+        C = connectors.FromFileConnector("test.connections.npy")
+        self.assertRaises(errors.ConnectionError,
+                          sim.Projection, self.p1, self.p2, C, sim.StaticSynapse())
+        file = recording.files.NumpyMemmapFile("test.connections.npy", mode='wb')
+        file.write(self.connection_list, {"columns": ["i", "j", "weight"]})
+        C = connectors.FromFileConnector("test.connections.npy")
+        self.assertRaises(errors.ConnectionError,
+                          sim.Projection, self.p1, self.p2, C, sim.StaticSynapse())
+
     @register()
     def test_with_plastic_synapses_not_distributed(self, sim=sim):
         connection_list = [
@@ -604,21 +781,26 @@ class TestFixedNumberPreConnector(unittest.TestCase):
         prj = sim.Projection(self.p1, self.p2, C, syn)
         rec = prj.get(["weight", "delay"], format='list')
         assert_array_almost_equal([list(r) for r in rec],  
-                         [(3, 0, 0.3, 0.123),
+                         [(0, 0, 0.0, 0.123),
                           (2, 0, 0.2, 0.123),
-                          (1, 0, 0.1, 0.123),
-                          (3, 1, 0.2, 0.123),
-                          (2, 1, 0.1, 0.123),
+                          (3, 0, 0.3, 0.123),
                           (1, 1, 0.0, 0.123),
-                          (3, 2, 0.1, 0.123),
-                          (2, 2, 0.0, 0.123),
+                          (0, 1, 0.1, 0.123),
+                          (3, 1, 0.2, 0.123),
+                          (0, 2, 0.2, 0.123),
                           (1, 2, 0.1, 0.123),
-                          (3, 3, 0.0, 0.123),
-                          (2, 3, 0.1, 0.123),
+                          (3, 2, 0.1, 0.123),
                           (1, 3, 0.2, 0.123),
-                          (3, 4, 0.1, 0.123),
+                          (2, 3, 0.1, 0.123),
+                          (3, 3, 0.0, 0.123),
+                          (0, 4, 0.4, 0.123),
                           (2, 4, 0.2, 0.123),
-                          (1, 4, 0.3, 0.123)])
+                          (3, 4, 0.1, 0.123)])
+
+    def test_with_numpy_integer_n(self, sim=sim):
+        C = connectors.FixedNumberPreConnector(n=numpy.int64(3), rng=MockRNG(delta=1))
+        prj = sim.Projection(self.p1, self.p2, C, sim.StaticSynapse())
+        self.assertEqual(len(prj), 15)
 
     @register()
     def test_with_n_larger_than_population_size(self, sim=sim):
@@ -630,37 +812,37 @@ class TestFixedNumberPreConnector(unittest.TestCase):
                           (1, 0, 0.0, 0.123),
                           (2, 0, 0.0, 0.123),
                           (3, 0, 0.0, 0.123),
-                          (3, 0, 0.0, 0.123),
+                          (0, 0, 0.0, 0.123),
                           (2, 0, 0.0, 0.123),
-                          (1, 0, 0.0, 0.123),
+                          (3, 0, 0.0, 0.123),
                           (0, 1, 0.0, 0.123),
                           (1, 1, 0.0, 0.123),
                           (2, 1, 0.0, 0.123),
                           (3, 1, 0.0, 0.123),
-                          (3, 1, 0.0, 0.123),
-                          (2, 1, 0.0, 0.123),
                           (1, 1, 0.0, 0.123),
+                          (0, 1, 0.0, 0.123),
+                          (3, 1, 0.0, 0.123),
                           (0, 2, 0.0, 0.123),
                           (1, 2, 0.0, 0.123),
                           (2, 2, 0.0, 0.123),
                           (3, 2, 0.0, 0.123),
-                          (3, 2, 0.0, 0.123),
-                          (2, 2, 0.0, 0.123),
+                          (0, 2, 0.0, 0.123),
                           (1, 2, 0.0, 0.123),
+                          (3, 2, 0.0, 0.123),
                           (0, 3, 0.0, 0.123),
                           (1, 3, 0.0, 0.123),
                           (2, 3, 0.0, 0.123),
                           (3, 3, 0.0, 0.123),
-                          (3, 3, 0.0, 0.123),
-                          (2, 3, 0.0, 0.123),
                           (1, 3, 0.0, 0.123),
+                          (2, 3, 0.0, 0.123),
+                          (3, 3, 0.0, 0.123),
                           (0, 4, 0.0, 0.123),
                           (1, 4, 0.0, 0.123),
                           (2, 4, 0.0, 0.123),
                           (3, 4, 0.0, 0.123),
-                          (3, 4, 0.0, 0.123),
+                          (0, 4, 0.0, 0.123),
                           (2, 4, 0.0, 0.123),
-                          (1, 4, 0.0, 0.123)])
+                          (3, 4, 0.0, 0.123)])
 
     @register()
     def test_with_n_larger_than_population_size_no_self_connections(self, sim=sim):
@@ -672,37 +854,37 @@ class TestFixedNumberPreConnector(unittest.TestCase):
                           (2, 0, 0.0, 0.123),
                           (3, 0, 0.0, 0.123),
                           (4, 0, 0.0, 0.123),
-                          (4, 0, 0.0, 0.123),
+                          (1, 0, 0.0, 0.123),
                           (3, 0, 0.0, 0.123),
-                          (2, 0, 0.0, 0.123),
+                          (4, 0, 0.0, 0.123),
                           (0, 1, 0.0, 0.123),
                           (2, 1, 0.0, 0.123),
                           (3, 1, 0.0, 0.123),
                           (4, 1, 0.0, 0.123),
-                          (4, 1, 0.0, 0.123),
-                          (3, 1, 0.0, 0.123),
                           (2, 1, 0.0, 0.123),
+                          (0, 1, 0.0, 0.123),
+                          (4, 1, 0.0, 0.123),
                           (0, 2, 0.0, 0.123),
                           (1, 2, 0.0, 0.123),
                           (3, 2, 0.0, 0.123),
                           (4, 2, 0.0, 0.123),
-                          (4, 2, 0.0, 0.123),
-                          (3, 2, 0.0, 0.123),
+                          (0, 2, 0.0, 0.123),
                           (1, 2, 0.0, 0.123),
+                          (4, 2, 0.0, 0.123),
                           (0, 3, 0.0, 0.123),
                           (1, 3, 0.0, 0.123),
                           (2, 3, 0.0, 0.123),
                           (4, 3, 0.0, 0.123),
-                          (4, 3, 0.0, 0.123),
-                          (2, 3, 0.0, 0.123),
                           (1, 3, 0.0, 0.123),
+                          (2, 3, 0.0, 0.123),
+                          (4, 3, 0.0, 0.123),
                           (0, 4, 0.0, 0.123),
                           (1, 4, 0.0, 0.123),
                           (2, 4, 0.0, 0.123),
                           (3, 4, 0.0, 0.123),
-                          (3, 4, 0.0, 0.123),
+                          (0, 4, 0.0, 0.123),
                           (2, 4, 0.0, 0.123),
-                          (1, 4, 0.0, 0.123)])
+                          (3, 4, 0.0, 0.123)])
 
     @register()
     def test_with_replacement(self, sim=sim):
@@ -764,24 +946,21 @@ class TestFixedNumberPreConnector(unittest.TestCase):
         syn = sim.StaticSynapse()
         prj = sim.Projection(self.p2, self.p2, C, syn)
         self.assertEqual(prj.get(["weight", "delay"], format='list'),  
-                         [(2, 0, 0.0, 0.123),  # [2, 3, 4] --> [2, 3, 4]
-                          (3, 0, 0.0, 0.123),
+                         [(3, 0, 0.0, 0.123),
                           (4, 0, 0.0, 0.123),
-                          (0, 1, 0.0, 0.123),   # [0, 1, 2] --> [0, 3, 2]
-                          #(1, 1, 0.0, 0.123),
-                          (3, 1, 0.0, 0.123),
+                          (1, 0, 0.0, 0.123),
                           (2, 1, 0.0, 0.123),
-                          (4, 2, 0.0, 0.123),  # [4, 0, 1] --> [4, 0, 1]
+                          (3, 1, 0.0, 0.123),
+                          (4, 1, 0.0, 0.123),
                           (0, 2, 0.0, 0.123),
                           (1, 2, 0.0, 0.123),
-                          (2, 3, 0.0, 0.123),   # [2, 3, 4] --> [2, 0, 4]
-                          #(3, 3, 0.0, 0.123),
-                          (0, 3, 0.0, 0.123),
+                          (3, 2, 0.0, 0.123),
                           (4, 3, 0.0, 0.123),
-                          (1, 4, 0.0, 0.123),
+                          (0, 3, 0.0, 0.123),
+                          (1, 3, 0.0, 0.123),
                           (2, 4, 0.0, 0.123),
                           (3, 4, 0.0, 0.123),
-                          ])
+                          (0, 4, 0.0, 0.123)])
 
     @register()
     #TOCHECK
@@ -791,21 +970,21 @@ class TestFixedNumberPreConnector(unittest.TestCase):
         syn = sim.StaticSynapse()
         prj = sim.Projection(self.p2, self.p2, C, syn)
         self.assertEqual(prj.get(["weight", "delay"], format='list'),  
-                         [(4, 0, 0.0, 0.123),
-                          (3, 0, 0.0, 0.123),
+                         [(1, 0, 0.0, 0.123),
                           (2, 0, 0.0, 0.123),
-                          (4, 1, 0.0, 0.123),
-                          (3, 1, 0.0, 0.123),
+                          (4, 0, 0.0, 0.123),
                           (2, 1, 0.0, 0.123),
-                          (4, 2, 0.0, 0.123),
+                          (3, 1, 0.0, 0.123),
+                          (4, 1, 0.0, 0.123),
+                          (0, 2, 0.0, 0.123),
                           (3, 2, 0.0, 0.123),
-                          (1, 2, 0.0, 0.123),
-                          (4, 3, 0.0, 0.123),
-                          (2, 3, 0.0, 0.123),
+                          (4, 2, 0.0, 0.123),
                           (1, 3, 0.0, 0.123),
-                          (3, 4, 0.0, 0.123),
+                          (2, 3, 0.0, 0.123),
+                          (4, 3, 0.0, 0.123),
+                          (0, 4, 0.0, 0.123),
                           (2, 4, 0.0, 0.123),
-                          (1, 4, 0.0, 0.123)])
+                          (3, 4, 0.0, 0.123)])
 
     @register()
     #TOCHECK
@@ -836,21 +1015,35 @@ class TestFixedNumberPreConnector(unittest.TestCase):
         syn = sim.StaticSynapse()
         prj = sim.Projection(self.p1, self.p2, C, syn)
         self.assertEqual(prj.get(["weight", "delay"], format='list'),  
-                         [(3, 0, 0.0, 0.123),
+                         [(0, 0, 0.0, 0.123),
                           (2, 0, 0.0, 0.123),
-                          (1, 0, 0.0, 0.123),
-                          (3, 1, 0.0, 0.123),
-                          (2, 1, 0.0, 0.123),
+                          (3, 0, 0.0, 0.123),
                           (1, 1, 0.0, 0.123),
-                          (3, 2, 0.0, 0.123),
-                          (2, 2, 0.0, 0.123),
+                          (0, 1, 0.0, 0.123),
+                          (3, 1, 0.0, 0.123),
+                          (0, 2, 0.0, 0.123),
                           (1, 2, 0.0, 0.123),
-                          (3, 3, 0.0, 0.123),
-                          (2, 3, 0.0, 0.123),
+                          (3, 2, 0.0, 0.123),
                           (1, 3, 0.0, 0.123),
-                          (3, 4, 0.0, 0.123),
+                          (2, 3, 0.0, 0.123),
+                          (3, 3, 0.0, 0.123),
+                          (0, 4, 0.0, 0.123),
                           (2, 4, 0.0, 0.123),
-                          (1, 4, 0.0, 0.123),])
+                          (3, 4, 0.0, 0.123)])
+
+
+    def test_no_replacement_large_population(self, sim=sim):
+        p1 = sim.Population(100, sim.IF_cond_exp())
+        C = connectors.FixedNumberPreConnector(n=60, with_replacement=False,
+                                               allow_self_connections=False,
+                                               rng=random.NumpyRNG(seed=29873))
+        prj = sim.Projection(p1, p1, C, sim.StaticSynapse())
+        connections = numpy.array(prj.get('weight', format='list'))[:, :2].astype(int)
+        self.assertEqual(len(prj), 6000)
+        for j in range(p1.size):
+            sources = connections[connections[:, 1] == j, 0]
+            self.assertEqual(numpy.unique(sources).size, 60)
+            self.assertNotIn(j, sources)
 
 
 @register_class()
@@ -901,8 +1094,44 @@ class TestArrayConnector(unittest.TestCase):
                           (1, 1, 2.0, 1.2),
                           (0, 2, 3.0, 1.3),
                           (2, 2, 4.0, 1.4),
-                          (1, 3, 5.0, 1.5)]) 
+                          (1, 3, 5.0, 1.5)])
 
+    @unittest.skipUnless(connectors.have_scipy, "Requires SciPy")
+    @register()
+    def test_connect_with_sparse_matrix(self, sim=sim):
+        import scipy.sparse
+        connections = scipy.sparse.coo_matrix(numpy.array([
+                [0, 1, 1, 0],
+                [1, 1, 0, 1],
+                [0, 0, 1, 0],
+            ], dtype=bool))
+        weights = scipy.sparse.csr_matrix(numpy.array([
+                [0.0, 0.1, 0.2, 0.0],
+                [0.4, 0.5, 0.0, 0.7],
+                [0.0, 0.0, 1.0, 0.0],
+            ]))
+        C = connectors.ArrayConnector(connections, parameters={'weight': weights}, safe=False)
+        syn = sim.StaticSynapse(weight=5.0, delay=0.5)
+        prj = sim.Projection(self.p1, self.p2, C, syn)
+        self.assertEqual(prj.get(["weight", "delay"], format='list'),
+                         [(1, 0, 0.4, 0.5),
+                          (0, 1, 0.1, 0.5),
+                          (1, 1, 0.5, 0.5),
+                          (0, 2, 0.2, 0.5),
+                          (2, 2, 1.0, 0.5),
+                          (1, 3, 0.7, 0.5)])
+
+
+    @unittest.skipUnless(connectors.have_scipy, "Requires SciPy")
+    @register()
+    def test_connect_does_not_modify_sparse_matrix(self, sim=sim):
+        import scipy.sparse
+        connections = scipy.sparse.coo_matrix(([1, 1, 0], ([0, 0, 2], [1, 1, 3])), shape=(3, 4))
+        C = connectors.ArrayConnector(connections, safe=False)
+        prj = sim.Projection(self.p1, self.p2, C, sim.StaticSynapse())
+        self.assertEqual(connections.nnz, 3)
+        assert_array_equal(connections.row, [0, 0, 2])
+        self.assertEqual(prj.get("weight", format='list', with_address=True)[0][:2], (0, 1))
 
 @register_class()
 class TestCloneConnector(unittest.TestCase):
@@ -1026,6 +1255,27 @@ class TestIndexBasedProbabilityConnector(unittest.TestCase):
                           (3, 3, 1., 7),
                           (2, 4, 1., 7)])
 
+    @register()
+    def test_connect_with_max_offset(self, sim=sim):
+        syn = sim.StaticSynapse(weight=self.IndexBasedWeights(), delay=2)
+        C = connectors.IndexBasedProbabilityConnector(self.IndexBasedProbability(), max_offset=1)
+        prj = sim.Projection(self.p1, self.p2, C, syn)
+        self.assertEqual(prj.get(["weight", "delay"], format='list'),
+                         [(0, 0, 1., 2),
+                          (2, 1, 3., 2),
+                          (1, 2, 3., 2),
+                          (3, 3, 10., 2)])
+
+    @register()
+    def test_displacement_dependent_with_max_displacement(self, sim=sim):
+        syn = sim.StaticSynapse(weight=1.0, delay=2)
+        C = connectors.DisplacementDependentProbabilityConnector(
+                lambda d: numpy.ones(d.shape[1:]) * (d[0] >= 0),
+                allow_self_connections=False, max_displacement=2.5)
+        prj = sim.Projection(self.p1, self.p1, C, syn)
+        self.assertEqual(sorted(prj.get(["weight", "delay"], format='list')),
+                         [(i, j, 1., 2) for i in range(5) for j in range(5) if 0 < j - i <= 2])
+
 
 #TOCHECK, not included
 #class TestDisplacementDependentProbabilityConnector(unittest.TestCase):
@@ -1140,6 +1390,215 @@ class TestFixedTotalNumberConnector(unittest.TestCase):
         connections = prj.get(["weight", "delay"], format='list', gather=False)
         self.assertEqual(len(connections), 12)
 
+    def test_no_replacement_no_self_connections(self):
+        C = connectors.FixedTotalNumberConnector(n=15, with_replacement=False,
+                                                 allow_self_connections=False,
+                                                 rng=random.NumpyRNG(seed=761))
+        syn = sim.StaticSynapse(weight=0.5)
+        prj = sim.Projection(self.p2, self.p2, C, syn)
+        connections = [(int(i), int(j)) for i, j, w in prj.get('weight', format='list', gather=False)]
+        self.assertEqual(len(connections), 15)
+        self.assertEqual(len(set(connections)), 15)
+        for i, j in connections:
+            self.assertNotEqual(i, j)
+
+    def test_too_many_without_replacement(self):
+        C = connectors.FixedTotalNumberConnector(n=21, with_replacement=False,
+                                                 rng=random.NumpyRNG(seed=761))
+        syn = sim.StaticSynapse(weight=0.5)
+        self.assertRaises(errors.ConnectionError, sim.Projection, self.p1, self.p2, C, syn)
+
+
+@unittest.skipUnless(connectors.haveCSA, "Requires csa")
+class TestCSAConnector(unittest.TestCase):
+
+    def setUp(self, sim=sim):
+        sim.setup(num_processes=1, rank=0, min_delay=0.123)
+        self.p1 = sim.Population(4, sim.IF_cond_exp(), structure=space.Line())
+        self.p2 = sim.Population(5, sim.HH_cond_exp(), structure=space.Line())
+
+    def test_connect_with_mask_in_small_blocks(self):
+        import csa
+        C = connectors.CSAConnector(csa.full - csa.oneToOne)
+        syn = sim.StaticSynapse(weight=0.5, delay=0.2)
+        orig_max_block_memory = connectors.MAX_BLOCK_MEMORY
+        connectors.MAX_BLOCK_MEMORY = 40
+        try:
+            prj = sim.Projection(self.p1, self.p2, C, syn)
+        finally:
+            connectors.MAX_BLOCK_MEMORY = orig_max_block_memory
+        self.assertEqual(sorted(prj.get(["weight", "delay"], format='list')),
+                         [(i, j, 0.5, 0.2) for i in range(4) for j in range(5) if i != j])
+
+    def test_connect_with_connection_set(self):
+        import csa
+        C = connectors.CSAConnector(csa.cset(csa.oneToOne, 0.3, 1.5))
+        syn = sim.StaticSynapse()
+        prj = sim.Projection(self.p1, self.p2, C, syn)
+        self.assertEqual(prj.get(["weight", "delay"], format='list'),
+                         [(i, i, 0.3, 1.5) for i in range(4)])
+
+class TestCSAColumnBlocks(unittest.TestCase):
+
+    def setUp(self, sim=sim):
+        sim.setup(num_processes=1, rank=0, min_delay=0.123)
+        p1 = sim.Population(4, sim.IF_cond_exp())
+        p2 = sim.Population(5, sim.HH_cond_exp())
+        self.prj = Mock(pre=p1, post=p2)
+        self.C = connectors.CSAConnector.__new__(connectors.CSAConnector)
+        self.C.cset = None
+
+    def _column_blocks(self, connections, block_memory):
+        mock_csa = Mock(arity=Mock(return_value=0))
+        mock_csa.cross.return_value.__mul__ = Mock(return_value=connections)
+        orig_max_block_memory = connectors.MAX_BLOCK_MEMORY
+        connectors.MAX_BLOCK_MEMORY = block_memory
+        try:
+            with patch.object(connectors, "csa", mock_csa, create=True):
+                return list(self.C._column_blocks(self.prj))
+        finally:
+            connectors.MAX_BLOCK_MEMORY = orig_max_block_memory
+
+    def test_unordered_block_sorted_by_column(self):
+        blocks = self._column_blocks([(0, 2), (1, 0), (3, 2), (2, 1)], 1000)
+        assert_array_equal(numpy.vstack(blocks), [(1, 0), (2, 1), (0, 2), (3, 2)])
+
+    def test_column_revisited_in_later_block(self):
+        self.assertRaises(errors.ConnectionError, self._column_blocks,
+                          [(0, 0), (1, 1), (2, 2), (3, 0)], 48)
+
+
+class TestSmallWorldConnector(unittest.TestCase):
+
+    def setUp(self, sim=sim):
+        sim.setup(num_processes=1, rank=0, min_delay=0.123)
+        self.p = sim.Population(20, sim.IF_cond_exp(), structure=space.Line())
+
+    def _connections(self, C):
+        prj = sim.Projection(self.p, self.p, C, sim.StaticSynapse())
+        return sorted((int(i), int(j)) for i, j, w in prj.get('weight', format='list'))
+
+    def test_no_rewiring(self):
+        C = connectors.SmallWorldConnector(degree=1.5, rewiring=0.0, allow_self_connections=False)
+        self.assertEqual(self._connections(C),
+                         [(i, j) for i in range(20) for j in range(20) if 0 < abs(i - j) < 1.5])
+
+    def test_no_rewiring_no_mutual_connections(self):
+        C = connectors.SmallWorldConnector(degree=2.5, rewiring=0.0, allow_self_connections='NoMutual')
+        self.assertEqual(self._connections(C),
+                         [(i, j) for i in range(20) for j in range(20) if 0 < i - j < 2.5])
+
+    def test_full_rewiring_no_self_connections(self):
+        C = connectors.SmallWorldConnector(degree=2.5, rewiring=1.0, allow_self_connections=False,
+                                           rng=random.NumpyRNG(seed=5122))
+        connections = self._connections(C)
+        self.assertEqual(len(connections), 20 * 4 - 6)  # the number of connections is unchanged
+        for i, j in connections:
+            self.assertNotEqual(i, j)
+
+    def test_n_connections(self):
+        C = connectors.SmallWorldConnector(degree=3.5, rewiring=0.0, n_connections=2,
+                                           rng=random.NumpyRNG(seed=5122))
+        connections = self._connections(C)
+        sources = numpy.array([i for i, j in connections])
+        assert_array_equal(numpy.bincount(sources), 2 * numpy.ones((20,)))
+        for i, j in connections:
+            self.assertLess(abs(i - j), 3.5)
+
+
+@register_class()
+class TestCachedConnector(unittest.TestCase):
+
+    def setUp(self, sim=sim):
+        sim.setup(num_processes=1, rank=0, min_delay=0.123)
+        self.p1 = sim.Population(20, sim.IF_cond_exp(), structure=space.Line())
+        self.p2 = sim.Population(15, sim.HH_cond_exp(), structure=space.Line())
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self, sim=sim):
+        shutil.rmtree(self.directory)
+
+    def _connections(self, C, weight=0.5):
+        prj = sim.Projection(self.p1, self.p2, C, sim.StaticSynapse(weight=weight, delay=0.5))
+        return prj.get(['weight', 'delay'], format='list')
+
+    def test_connect_stores_and_replays(self):
+        C = connectors.CachedConnector(
+                connectors.FixedProbabilityConnector(0.3, rng=random.NumpyRNG(seed=87)),
+                self.directory)
+        uncached = self._connections(C)
+        self.assertEqual(len(os.listdir(self.directory)), 1)
+        C.connector.rng = random.NumpyRNG(seed=87)
+        with patch.object(connectors.FixedProbabilityConnector, "connect") as connect:
+            cached = self._connections(C)
+        self.assertFalse(connect.called)
+        self.assertEqual(cached, uncached)
+        self.assertGreater(len(cached), 0)
+
+    def test_rng_state_restored(self):
+        for rng_class in (random.NumpyRNG, random.PhiloxRNG):
+            rng = rng_class(seed=87)
+            C = connectors.CachedConnector(connectors.FixedProbabilityConnector(0.3, rng=rng),
+                                           self.directory)
+            self._connections(C)
+            expected = rng.next(5)
+            C.connector.rng = rng = rng_class(seed=87)
+            self._connections(C)
+            assert_array_equal(rng.next(5), expected)
+        self.assertEqual(len(os.listdir(self.directory)), 2)
+
+    def test_cache_files_contain_no_pickled_objects(self):
+        C = connectors.CachedConnector(
+                connectors.FixedProbabilityConnector(0.3, rng=random.NumpyRNG(seed=87)),
+                self.directory)
+        self._connections(C)
+        path, = os.listdir(self.directory)
+        data = numpy.load(os.path.join(self.directory, path), allow_pickle=False)
+        for name in data.files:
+            self.assertNotEqual(data[name].dtype, object)
+
+    def test_rng_without_state_not_cached(self):
+        C = connectors.CachedConnector(
+                connectors.FixedProbabilityConnector(0.3, rng=MockRNG(delta=0.1)),
+                self.directory)
+        connections = self._connections(C)
+        self.assertEqual(os.listdir(self.directory), [])
+        self.assertGreater(len(connections), 0)
+
+    def test_different_parameters_not_shared(self):
+        C = connectors.CachedConnector(connectors.AllToAllConnector(), self.directory)
+        self._connections(C, weight=0.5)
+        connections = self._connections(C, weight=0.7)
+        self.assertEqual(len(os.listdir(self.directory)), 2)
+        self.assertEqual(set(w for i, j, w, d in connections), set([0.7]))
+
+    def test_closures_with_different_values_not_shared(self):
+        def gaussian(sigma):
+            return lambda d: numpy.exp(-numpy.sum(d**2, axis=0) / sigma**2)
+
+        def connections(sigma):
+            C = connectors.CachedConnector(
+                connectors.DisplacementDependentProbabilityConnector(gaussian(sigma),
+                                                                     rng=random.NumpyRNG(seed=87)),
+                self.directory)
+            return sim.Projection(self.p1, self.p1, C, sim.StaticSynapse()).get('weight', format='list')
+        narrow = connections(1.0)
+        wide = connections(1000.0)
+        self.assertEqual(len(os.listdir(self.directory)), 2)
+        self.assertGreater(len(wide), len(narrow))
+
+    @unittest.skipUnless(connectors.have_scipy, "Requires SciPy")
+    def test_sparse_matrices_with_different_values_not_shared(self):
+        import scipy.sparse
+        for value in (1, 2):
+            weights = scipy.sparse.csr_matrix(value * numpy.ones((20, 15)))
+            C = connectors.CachedConnector(
+                connectors.ArrayConnector(numpy.ones((20, 15), dtype=bool),
+                                          parameters={'weight': weights}),
+                self.directory)
+            connections = self._connections(C)
+            self.assertEqual(set(w for i, j, w, d in connections), set([value]))
+        self.assertEqual(len(os.listdir(self.directory)), 2)
 
 if __name__ == "__main__":
     unittest.main()
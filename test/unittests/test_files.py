@@ -120,3 +120,37 @@ def test_HDF5ArrayFile():
         h5f.close()
     
         os.remove("tmp.h5")
+
+
+def test_StandardTextFile_read_chunks():
+    stf = files.StandardTextFile("tmp.txt", "wb")
+    data = [(0, 2.3), (1, 3.4), (2, 4.3)]
+    stf.write(data, {'a': 1})
+    stf = files.StandardTextFile("tmp.txt", "r")
+    chunks = list(stf.read_chunks(2))
+    assert_equal([chunk.shape for chunk in chunks], [(2, 2), (1, 2)])
+    assert_arrays_equal(numpy.vstack(chunks).flatten(), numpy.array(data).flatten())
+    stf.close()
+    os.remove("tmp.txt")
+
+
+def test_NumpyMemmapFile():
+    for filename in ("tmp.npy", "tmp.bin"):
+        nmf = files.NumpyMemmapFile(filename, "w")
+        data = [(0, 2.3), (1, 3.4), (2, 4.3)]
+        nmf.write(data, {'columns': ['i', 'x']})
+        nmf.close()
+
+        nmf = files.NumpyMemmapFile(filename, "r", n_columns=2)
+        assert_equal(nmf.get_metadata(), {'columns': ['i', 'x']})
+
+        nmf = files.NumpyMemmapFile(filename, "r", n_columns=2, metadata={'a': 1})
+        assert not hasattr(nmf, 'fileobj')
+        assert_equal(nmf.get_metadata(), {'a': 1})
+        assert_arrays_equal(nmf.read().flatten(), numpy.array(data).flatten())
+        chunks = list(nmf.read_chunks(2))
+        assert_equal([chunk.shape for chunk in chunks], [(2, 2), (1, 2)])
+        nmf.close()
+
+        os.remove(filename)
+        os.remove(filename + ".json")
@@ -12,6 +12,12 @@ try:
     basestring
 except NameError:
     basestring = str
+from pyNN import connectors
+from pyNN.random import NativeRNG
+try:
+    from unittest.mock import patch
+except ImportError:
+    from mock import patch
 import numpy
 from numpy.testing import assert_array_equal, assert_array_almost_equal
 
@@ -131,6 +137,12 @@ class TestProjection(unittest.TestCase):
         weights_array = prj.get("weight", format="array")
         self.assertTrue((weights_array > 0.).all())
 
+    def test_inhibitory_weight_does_not_modify_connection_list(self):
+        connection_list = numpy.array([(0, 0, 0.1, 1.0), (1, 1, 0.2, 1.0)])
+        prj = sim.Projection(self.p1, self.p2, sim.FromListConnector(connection_list),
+                             receptor_type="inhibitory")
+        assert_array_equal(connection_list[:, 2], [0.1, 0.2])
+
     @unittest.skip("causes core dump with NEST master branch")
     def test_create_with_homogeneous_common_properties(self):
         with self.assertRaises(ValueError):
@@ -184,6 +196,44 @@ class TestProjection(unittest.TestCase):
         prj.set(weight=weight_array)
         self.assertTrue((weight_array == prj.get("weight", format="array")).all())
 
+    def test_fixed_number_without_autapses_not_native_when_n_equals_size(self):
+        C = sim.FixedNumberPreConnector(n=7, allow_self_connections=False,
+                                        with_replacement=False, rng=NativeRNG())
+        with patch.object(sim.FixedNumberPreConnector, "native_connect") as native_connect:
+            with patch.object(connectors.FixedNumberPreConnector, "connect") as connect:
+                sim.Projection(self.p1, self.p1, C)
+        self.assertFalse(native_connect.called)
+        self.assertTrue(connect.called)
+
+    def test_connect_bulk_in_chunks_with_local_parameters(self):
+        prj = sim.Projection(self.p1, self.p2, sim.FromListConnector([]),
+                             synapse_type=sim.TsodyksMarkramSynapse())
+        for sources, targets, U in (([0, 1, 2], [0, 0, 1], [0.1, 0.2, 0.3]),
+                                    ([3, 4, 5], [0, 1, 1], [0.4, 0.5, 0.6])):
+            prj._connect_bulk(numpy.array(sources), numpy.array(targets),
+                              weight=numpy.ones(3), delay=numpy.ones(3),
+                              U=numpy.array(U), tau_rec=100.0, tau_fac=0.0)
+        self.assertEqual(sorted(prj.get("U", format="list")),
+                         [(0, 0, 0.1), (1, 0, 0.2), (2, 1, 0.3),
+                          (3, 0, 0.4), (4, 1, 0.5), (5, 1, 0.6)])
+
+    def test_len_and_iteration_use_cached_connections(self):
+        prj = sim.Projection(self.p1, self.p2, self.all2all, synapse_type=self.syn_a2a)
+        self.assertEqual(len(prj), 28)
+        self.assertEqual(prj.size(gather=False), 28)
+        self.assertIs(prj.nest_connections, prj.nest_connections)
+        connections = list(prj)
+        self.assertEqual(len(connections), 28)
+        self.assertEqual([c.index for c in connections], list(range(28)))
+
+    def test_cached_connections_reset_by_connect(self):
+        prj = sim.Projection(self.p1, self.p2, sim.FromListConnector([(0, 0), (1, 1)]),
+                             synapse_type=self.syn_a2a)
+        self.assertEqual(len(prj), 2)
+        prj._convergent_connect(numpy.array([2, 3]), 2, weight=0.1, delay=0.5)
+        self.assertEqual(len(prj), 4)
+        self.assertEqual(len(list(prj)), 4)
+
     def test_stdp_set_tau_minus(self):
         """cf https://github.com/NeuralEnsemble/PyNN/issues/423"""
         intended_tau_minus = 18.9
@@ -346,6 +346,25 @@ class TestProjection(unittest.TestCase):
         prj = sim.Projection(self.p1, self.p2, self.all2all,
                              synapse_type=sim.TsodyksMarkramSynapse())
 
+    def test_connections_grouped_by_target(self):
+        prj = sim.Projection(self.p1, self.p2, sim.FromListConnector([(0, 3), (5, 1), (2, 1)]), self.syn2)
+        prj._convergent_connect(numpy.array([4]), 0, weight=0.1, delay=0.5)  # created after the others
+        self.assertEqual(len(prj), 4)
+        assert_array_equal(prj._indptr, numpy.array([0, 1, 3, 3, 4]))
+        assert_array_equal(prj._presynaptic_indices, numpy.array([4, 5, 2, 0]))
+        self.assertEqual(prj[1].presynaptic_index, 5)
+        self.assertEqual([c.postsynaptic_index for c in prj.connections], [0, 1, 1, 3])
+        columns = prj.get("weight", format="columns")
+        assert_array_almost_equal(columns["weight"], numpy.array([0.1, 0.456, 0.456, 0.456]))
+
+    def test_set_weights_with_array(self):
+        prj = sim.Projection(self.p1, self.p2, self.all2all, self.syn2)
+        weights = numpy.arange(28.0).reshape((7, 4))
+        prj.set(weight=weights)
+        assert_array_almost_equal(prj.get("weight", format="array"), weights)
+        prj.set(weight=numpy.ones((len(prj),)))
+        assert_array_almost_equal(prj.get("weight", format="array"), numpy.ones((7, 4)))
+
 
 @unittest.skipUnless(sim, "Requires NEURON")
 class TestCurrentSources(unittest.TestCase):
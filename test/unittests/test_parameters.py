@@ -14,7 +14,7 @@ import numpy as np
 from lazyarray import larray
 from numpy.testing import assert_array_equal, assert_array_almost_equal
 from nose.tools import assert_raises, assert_equal
-from pyNN.parameters import LazyArray, ParameterSpace, Sequence
+from pyNN.parameters import LazyArray, ParameterSpace, Sequence, ConnectionValues
 from pyNN import random, errors
 from .mocks import MockRNG
 
@@ -140,6 +140,30 @@ def test_columnwise_iteration_with_random_array_parallel_safe_with_mask():
     random.get_mpi_config = orig_get_mpi_config
 
 
+def test_columnwise_iteration_with_random_access_rng_with_mask():
+    full = [col for col in LazyArray(random.RandomDistribution('normal', (0, 1), rng=random.PhiloxRNG(seed=8763)),
+                                     shape=(4, 5)).by_column()]
+    m = LazyArray(random.RandomDistribution('normal', (0, 1), rng=random.PhiloxRNG(seed=8763)),
+                  shape=(4, 5))
+    mask = np.array([False, True, False, True, True])
+    cols = [col for col in m.by_column(mask=mask)]
+    assert_array_almost_equal(np.array(cols), np.array(full)[mask], 15)
+
+
+def test_columnwise_block_iteration_with_random_access_rng_with_mask():
+    full = [col for col in LazyArray(random.RandomDistribution('uniform', (0, 1), rng=random.PhiloxRNG(seed=8763)),
+                                     shape=(4, 5)).by_column()]
+    m = LazyArray(random.RandomDistribution('uniform', (0, 1), rng=random.PhiloxRNG(seed=8763)),
+                  shape=(4, 5))
+    mask = np.array([False, True, False, True, True])
+    blocks = [block for block in m.by_column_block(2, mask=mask)]
+    assert_array_equal(blocks[0][0], [1])
+    assert_array_equal(blocks[1][0], [3])
+    assert_array_equal(blocks[2][0], [4])
+    assert_array_almost_equal(np.hstack([block for columns, block in blocks]),
+                              np.array(full).T[:, mask], 15)
+
+
 def test_evaluate_with_flat_array():
     m = LazyArray(5, shape=(4, 3))
     assert_array_equal(m.evaluate(), 5 * np.ones((4, 3)))
@@ -271,6 +295,32 @@ def test_getitem_from_constant_array():
     assert_raises(IndexError, m.__getitem__, (2, -4))
 
 
+class ConnectionValuesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.values = ConnectionValues([0, 2, 1, 2], [1, 0, 3, 3], [0.1, 0.2, 0.3, 0.4], (3, 4))
+
+    def test_evaluate_at_connections(self):
+        assert_array_equal(self.values(np.array([2, 0, 1]), np.array([3, 1, 3])),
+                           np.array([0.4, 0.1, 0.3]))
+
+    def test_unconnected_pairs_are_nan(self):
+        A = LazyArray(self.values, shape=(3, 4))
+        expected = np.array([[np.nan, 0.1, np.nan, np.nan],
+                             [np.nan, np.nan, np.nan, 0.3],
+                             [0.2, np.nan, np.nan, 0.4]])
+        assert_array_equal(A.evaluate(), expected)
+        assert_array_equal(A[:, 3], expected[:, 3])
+
+    def test_multiple_connections_take_first_value(self):
+        values = ConnectionValues([1, 1], [2, 2], [5.0, 7.0], (2, 3))
+        self.assertEqual(values(1, 2), 5.0)
+
+    def test_wrong_number_of_values(self):
+        self.assertRaises(errors.InvalidDimensionsError,
+                          ConnectionValues, [0, 1], [1, 0], [0.5], (2, 2))
+
+
 class ParameterSpaceTest(unittest.TestCase):
 
     def test_evaluate(self):
@@ -288,6 +338,16 @@ class ParameterSpaceTest(unittest.TestCase):
         for key in expected:
             assert_array_equal(expected[key], ps[key])
 
+    def test_evaluate_with_mask_and_random_access_rng(self):
+        rd = lambda: random.RandomDistribution('uniform', (0, 1), rng=random.PhiloxRNG(seed=6352))
+        ps = ParameterSpace({'a': rd(), 'b': 2 * LazyArray(rd(), shape=(5,)) + 1}, shape=(5,))
+        ps_full = ParameterSpace({'a': rd(), 'b': 2 * LazyArray(rd(), shape=(5,)) + 1}, shape=(5,))
+        mask = np.array([False, True, False, True, True])
+        ps.evaluate(mask=mask)
+        ps_full.evaluate()
+        for name in ('a', 'b'):
+            assert_array_almost_equal(ps[name], ps_full[name][mask], 15)
+
     def test_evaluate_with_mask_2D(self):
         ps2d = ParameterSpace({'a': [[2, 3, 5, 8, 13], [21, 34, 55, 89, 144]],
                                'b': 7,
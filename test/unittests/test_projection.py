@@ -26,8 +26,8 @@ except NameError:
 from .mocks import MockRNG
 import pyNN.mock as sim
 
-from pyNN import random, errors, space
-from pyNN.parameters import Sequence
+from pyNN import random, errors, space, common, recording
+from pyNN.parameters import Sequence, ConnectionValues
 
 from .backends.registry import register_class, register
 
@@ -93,14 +93,40 @@ class ProjectionTest(unittest.TestCase):
         prj = sim.Projection(self.p1, self.p2, connector=self.all2all, synapse_type=self.syn2)
         self.assertEqual(prj.size(gather=True), self.p1.size * self.p2.size)
 
-# Need to extend the mock backend before setting synaptic parameters can be properly tested
+    def test_set_weights(self, sim=sim):
+        prj = sim.Projection(self.p1, self.p2, connector=self.all2all, synapse_type=self.syn2)
+        prj.set(weight=0.789)
+        weights = prj.get("weight", format="array", gather=False)  # use gather False because we are faking the MPI
+        target = 0.789 * numpy.ones((self.p1.size, self.p2.size))
+        assert_array_equal(weights, target)
 
-    #def test_set_weights(self, sim=sim):
-    #    prj = sim.Projection(self.p1, self.p2, connector=self.all2all, synapse_type=self.syn2)
-    #    prj.set(weight=0.789)
-    #    weights = prj.get("weight", format="array", gather=False)  # use gather False because we are faking the MPI
-    #    target = 0.789*numpy.ones((self.p1.size, self.p2.size))
-    #    assert_array_equal(weights, target)
+    def test_set_weights_with_list(self, sim=sim):
+        connector = sim.FromListConnector([(0, 1), (3, 0), (6, 3), (3, 2), (3, 2)])
+        prj = sim.Projection(self.p1, self.p2, connector, synapse_type=self.syn2)
+        weights = [0.1, 0.2, 0.3, 0.4, 0.5]
+        prj.set(weight=weights, delay=0.7)
+        # values are in the same order as the connections returned by get()
+        assert_array_equal(prj.get(["weight", "delay"], format="list", with_address=False),
+                           [(w, 0.7) for w in weights])
+        prj.set(weight=2 * numpy.array(weights))
+        assert_array_equal(prj.get("weight", format="list", with_address=False),
+                           [0.2, 0.4, 0.6, 0.8, 1.0])
+
+    def test_set_with_list_of_wrong_length(self, sim=sim):
+        prj = sim.Projection(self.p1, self.p2, connector=self.all2all, synapse_type=self.syn2)
+        self.assertRaises(errors.InvalidDimensionsError, prj.set, weight=[0.1, 0.2])
+
+    def test_set_connection_values_with_sparse_array(self, sim=sim):
+        # the default implementation, for backends without direct access to their connections
+        connector = sim.FromListConnector([(0, 1), (3, 0), (6, 3), (3, 2)])
+        prj = sim.Projection(self.p1, self.p2, connector, synapse_type=self.syn2)
+        with patch.object(prj, "_set_attributes") as set_attributes:
+            common.Projection._set_connection_values(prj, {"WEIGHT": numpy.array([0.1, 0.2, 0.3, 0.4])})
+        values = set_attributes.call_args[0][0]["WEIGHT"]
+        self.assertIsInstance(values.base_value, ConnectionValues)
+        assert_array_equal(values[numpy.array([3, 0, 3, 6]), numpy.array([0, 1, 2, 3])],
+                           numpy.array([0.1, 0.2, 0.3, 0.4]))
+        self.assertTrue(numpy.isnan(values[1, 1]))
 
     #def test_randomize_weights(self, sim=sim):
     #    orig_len = sim.Projection.__len__
@@ -166,6 +192,22 @@ class ProjectionTest(unittest.TestCase):
         target = 0.007 * numpy.ones((5,))
         assert_array_equal(weights, target)
 
+    def test_get_weights_as_columns(self, sim=sim):
+        prj = sim.Projection(self.p1, self.p2, connector=self.all2all, synapse_type=self.syn2)
+        columns = prj.get(["weight", "delay"], format="columns", gather=False)
+        self.assertEqual(set(columns), set(["presynaptic_index", "postsynaptic_index", "weight", "delay"]))
+        # same order as the list format
+        assert_array_equal(numpy.array([columns[name] for name in ("presynaptic_index", "postsynaptic_index",
+                                                                  "weight", "delay")]).T,
+                           numpy.array(prj.get(["weight", "delay"], format="list", gather=False)))
+        self.assertEqual(columns["presynaptic_index"].dtype.kind, 'i')
+
+    def test_get_weights_as_columns_no_address(self, sim=sim):
+        prj = sim.Projection(self.p1, self.p2, connector=self.all2all, synapse_type=self.syn2)
+        columns = prj.get("weight", format="columns", gather=False, with_address=False)
+        self.assertEqual(list(columns), ["weight"])
+        assert_array_equal(columns["weight"], 0.007 * numpy.ones((self.p1.size * self.p2.size,)))
+
     @register()
     def test_get_weights_as_array(self, sim=sim):
         prj = sim.Projection(self.p1, self.p2, connector=self.all2all, synapse_type=self.syn2)
@@ -177,11 +219,11 @@ class ProjectionTest(unittest.TestCase):
     def test_get_weights_as_array_with_multapses(self, sim=sim):
         C = sim.FixedNumberPreConnector(n=7, rng=MockRNG(delta=1))
         prj = sim.Projection(self.p2, self.p3, C, synapse_type=self.syn1)
-        # because we use a fake RNG, it is always the last three presynaptic cells which receive the double connection
+        # each postsynaptic cell receives a double connection from three of the four presynaptic cells
         target = numpy.array([
-            [0.006, 0.006, 0.006, 0.006, 0.006],
-            [0.012, 0.012, 0.012, 0.012, 0.012],
-            [0.012, 0.012, 0.012, 0.012, 0.012],
+            [0.012, 0.012, 0.012, 0.006, 0.012],
+            [0.006, 0.012, 0.012, 0.012, 0.006],
+            [0.012, 0.006, 0.006, 0.012, 0.012],
             [0.012, 0.012, 0.012, 0.012, 0.012],
             ])
         weights = prj.get("weight", format="array", gather=False)  # use gather False because we are faking the MPI
@@ -201,6 +243,22 @@ class ProjectionTest(unittest.TestCase):
         weights = prj.get("weight", format="array", gather=False, multiple_synapses='min')
         assert_array_equal(weights, target)
 
+    def test_get_weights_as_array_with_multapses_first_last_max(self, sim=sim):
+        connections = [(0, 1, 0.5, 0.1), (2, 0, 0.3, 0.1), (0, 1, 0.2, 0.1), (0, 1, 0.9, 0.1)]
+        C = sim.FromListConnector(connections, column_names=["weight", "delay"])
+        prj = sim.Projection(self.p2, self.p3, C, synapse_type=self.syn1)
+        for multiple_synapses, value in (('first', 0.5), ('last', 0.9), ('max', 0.9), ('sum', 1.6)):
+            weights = prj.get("weight", format="array", gather=False, multiple_synapses=multiple_synapses)
+            self.assertAlmostEqual(weights[0, 1], value, places=12)
+            self.assertEqual(weights[2, 0], 0.3)
+            self.assertEqual(numpy.isnan(weights).sum(), weights.size - 2)
+
+    def test_get_weights_as_array_no_connections(self, sim=sim):
+        prj = sim.Projection(self.p1, self.p2, sim.FixedProbabilityConnector(0.0), synapse_type=self.syn2)
+        weights = prj.get("weight", format="array", gather=False)
+        self.assertEqual(weights.shape, (self.p1.size, self.p2.size))
+        self.assertTrue(numpy.isnan(weights).all())
+
     @register()
     def test_synapse_with_lambda_parameter(self, sim=sim):
         syn = sim.StaticSynapse(weight=lambda d: 0.01 + 0.001 * d)
@@ -261,6 +319,68 @@ class ProjectionTest(unittest.TestCase):
         assert os.path.exists(filename)
         os.remove(filename)
 
+    def test_save_list_can_be_read_by_FromFileConnector(self, sim=sim):
+        filename = "test_save_list.connections"
+        connections = [(0, 1, 0.5, 0.1), (2, 0, 0.3, 0.2), (6, 3, 0.9, 0.3)]
+        C = sim.FromListConnector(connections, column_names=["weight", "delay"])
+        prj = sim.Projection(self.p1, self.p2, C, synapse_type=self.syn2)
+        prj.save(["weight", "delay"], filename, gather=False)
+        prj2 = sim.Projection(self.p1, self.p2, sim.FromFileConnector(filename), synapse_type=self.syn2)
+        os.remove(filename)
+        assert_array_almost_equal(numpy.array(prj2.get(["weight", "delay"], format="list")),
+                                  numpy.array(prj.get(["weight", "delay"], format="list")), 12)
+
+    def test_save_without_gather_writes_one_file_per_node(self, sim=sim):
+        sim.setup(num_processes=2, rank=1)
+        p1 = sim.Population(7, sim.IF_cond_exp())
+        p2 = sim.Population(4, sim.IF_cond_exp())
+        filename = "test_save_shards.connections"
+        prj = sim.Projection(p1, p2, sim.AllToAllConnector(), synapse_type=self.syn2)
+        prj.save("weight", filename, gather=False)
+        self.assertFalse(os.path.exists(filename))
+        self.assertTrue(os.path.exists(filename + ".1"))
+        # the shard can be read back with FromFileConnector
+        prj2 = sim.Projection(p1, p2, sim.FromFileConnector(filename, distributed=True),
+                              synapse_type=self.syn2)
+        os.remove(filename + ".1")
+        self.assertEqual(prj2.get("weight", format="list", gather=False),
+                         prj.get("weight", format="list", gather=False))
+
+    def test_save_npy_without_gather_can_be_read_by_FromFileConnector(self, sim=sim):
+        sim.setup(num_processes=2, rank=1)
+        p1 = sim.Population(7, sim.IF_cond_exp())
+        p2 = sim.Population(4, sim.IF_cond_exp())
+        filename = "test_save_shards.npy"
+        prj = sim.Projection(p1, p2, sim.AllToAllConnector(),
+                             synapse_type=sim.StaticSynapse(weight=lambda d: d, delay=0.5))
+        prj.save(["weight", "delay"], recording.files.NumpyMemmapFile(filename, mode='wb'), gather=False)
+        prj2 = sim.Projection(p1, p2, sim.FromFileConnector(filename, distributed=True),
+                              synapse_type=self.syn2)
+        for path in (filename + ".1", filename + ".1.json"):
+            os.remove(path)
+        self.assertEqual(prj2.get(["weight", "delay"], format="list", gather=False),
+                         prj.get(["weight", "delay"], format="list", gather=False))
+
+    def test_get_with_gather_uses_typed_buffers(self, sim=sim):
+        sim.setup(num_processes=2, rank=0)
+        p1 = sim.Population(7, sim.IF_cond_exp())
+        p2 = sim.Population(4, sim.IF_cond_exp())
+        prj = sim.Projection(p1, p2, sim.FromListConnector([(0, 1), (3, 3)]), synapse_type=self.syn2)
+
+        def gather_columns(columns, all=False):
+            # pretend that the other node has one connection, from 5 to 2
+            return [numpy.hstack((column, other)) for column, other in zip(columns, ([5], [2], [0.9]))]
+
+        with patch.object(recording, "gather_columns", side_effect=gather_columns) as mock_gather:
+            values = prj.get("weight", format="list", gather=True)
+            columns = prj.get("weight", format="columns", gather="all")
+            weights = prj.get("weight", format="array", gather=True)
+        self.assertEqual(mock_gather.call_count, 3)
+        self.assertEqual(values, [(0, 1, 0.007), (3, 3, 0.007), (5, 2, 0.9)])
+        assert_array_equal(columns["postsynaptic_index"], numpy.array([1, 3, 2]))
+        self.assertEqual(weights[5, 2], 0.9)
+        self.assertEqual(numpy.isnan(weights).sum(), weights.size - 3)
+
     #def test_print_weights_as_list(self, sim=sim):
     #    filename = "test.weights"
     #    if os.path.exists(filename):
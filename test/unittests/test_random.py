@@ -30,7 +30,7 @@ class SimpleTests(unittest.TestCase):
     """Simple tests on a single RNG function."""
 
     def setUp(self):
-        self.rnglist = [random.NumpyRNG(seed=987)]
+        self.rnglist = [random.NumpyRNG(seed=987), random.PhiloxRNG(seed=987)]
         for rng in self.rnglist:
             rng.mpi_rank = 0; rng.num_processes = 1
         if random.have_gsl:
@@ -68,11 +68,19 @@ class SimpleTests(unittest.TestCase):
     def test_invalid_seed(self):
         self.assertRaises(AssertionError, random.NumpyRNG, seed=2.3)
 
+    def test_get_and_set_state(self):
+        for rng in self.rnglist[:2]:  # NumpyRNG and PhiloxRNG
+            state = rng.get_state()
+            values = rng.next(5)
+            rng.next(3)
+            rng.set_state(state)
+            assert_arrays_almost_equal(rng.next(5), values, 1e-15)
+
 
 class ParallelTests(unittest.TestCase):
 
     def setUp(self):
-        self.rng_types = [random.NumpyRNG]
+        self.rng_types = [random.NumpyRNG, random.PhiloxRNG]
         if random.have_gsl:
             self.rng_types.append(random.GSLRNG)
         if have_nrn:
@@ -132,12 +140,69 @@ class ParallelTests(unittest.TestCase):
         assert_arrays_almost_equal(perm0, perm1, 1e-99)
 
 
+class PhiloxRNGTests(unittest.TestCase):
+
+    def setUp(self):
+        self.orig_mpi_config = random.get_mpi_config
+        random.get_mpi_config = lambda: (0, 1)
+
+    def tearDown(self):
+        random.get_mpi_config = self.orig_mpi_config
+
+    def test_known_answers(self):
+        # test vectors from the Random123 library
+        counters_keys_answers = [
+            ((0, 0, 0, 0), (0, 0), (0x6627e8d5, 0xe169c58d, 0xbc57ac4c, 0x9b00dbd8)),
+            ((0xffffffff,) * 4, (0xffffffff,) * 2, (0x408f276d, 0x41c83b0e, 0xa20bc7c6, 0x6d5451fd)),
+            ((0x243f6a88, 0x85a308d3, 0x13198a2e, 0x03707344), (0xa4093822, 0x299f31d0),
+             (0xd16cfe09, 0x94fdcceb, 0x5001e420, 0x24126ea1)),
+        ]
+        for counter, key, answer in counters_keys_answers:
+            result = random.philox4x32([numpy.array([c]) for c in counter], key)
+            self.assertEqual(tuple(int(x[0]) for x in result), answer)
+
+    def test_random_access(self):
+        mask = numpy.arange(20) % 3 == 1
+        for distribution, parameters in (('uniform', {'low': -1.0, 'high': 2.0}),
+                                         ('normal', {'mu': 1.0, 'sigma': 0.5}),
+                                         ('normal_clipped', {'mu': 0.0, 'sigma': 1.0, 'low': 0.0, 'high': 1.5}),
+                                         ('uniform_int', {'low': 2, 'high': 12}),
+                                         ('gamma', {'k': 2.0, 'theta': 0.5})):
+            rng1 = random.PhiloxRNG(seed=4632)
+            rng2 = random.PhiloxRNG(seed=4632)
+            all_values = numpy.hstack((rng1.next(7, distribution, parameters),
+                                       rng1.next(20, distribution, parameters)))
+            rng2.next(7, distribution, parameters, mask_local=numpy.zeros((7,), bool))
+            masked_values = rng2.next(20, distribution, parameters, mask_local=mask)
+            self.assertEqual(masked_values.size, mask.sum())
+            assert_arrays_almost_equal(masked_values, all_values[7:][mask], 1e-15)
+
+    def test_same_sequence_whatever_the_split(self):
+        rng1 = random.PhiloxRNG(seed=4632)
+        rng2 = random.PhiloxRNG(seed=4632)
+        assert_arrays_almost_equal(rng1.next(10, 'normal', {'mu': 0.0, 'sigma': 1.0}),
+                                   numpy.hstack([rng2.next(n, 'normal', {'mu': 0.0, 'sigma': 1.0})
+                                                 for n in (1, 3, 6)]),
+                                   1e-15)
+
+    def test_different_seeds(self):
+        self.assertNotEqual(random.PhiloxRNG(seed=1).next(5).tolist(),
+                            random.PhiloxRNG(seed=2).next(5).tolist())
+
+    def test_permutation(self):
+        perm = random.PhiloxRNG(seed=87).permutation(numpy.arange(10))
+        self.assertEqual(sorted(perm), list(range(10)))
+
+
 class NativeRNGTests(unittest.TestCase):
 
     def test_create(self):
         rng = random.NativeRNG(seed=8274528)
         str(rng)
 
+    def test_state_cannot_be_saved(self):
+        self.assertRaises(NotImplementedError, random.NativeRNG(seed=8274528).get_state)
+
 
 class RandomDistributionTests(unittest.TestCase):
 
@@ -198,12 +263,74 @@ class RandomDistributionTests(unittest.TestCase):
         self.assertRaises(ValueError, random.RandomDistribution, 'normal', (0.5,))
         self.assertRaises(ValueError, random.RandomDistribution, 'normal', (0.5, 0.2), mu=0.5, sigma=0.2)
 
+    def test_buffered_same_sequence(self):
+        rd = random.RandomDistribution('uniform_int', (0, 10), rng=random.NumpyRNG(seed=76))
+        rd_buffered = random.RandomDistribution('uniform_int', (0, 10), rng=random.NumpyRNG(seed=76),
+                                                buffer_size=7)
+        expected = rd.next(50)
+        values = numpy.hstack([rd_buffered.next(n) for n in (1, 2, 10, 0, 3, 20, 13)]
+                              + [rd_buffered.next()])
+        self.assertEqual(values.tolist(), expected.tolist())
+
+    def test_buffered_draws_in_blocks(self):
+        rng1 = random.NumpyRNG(seed=76)
+        rng2 = random.NumpyRNG(seed=76)
+        rd = random.RandomDistribution('normal', (0.0, 1.0), rng=rng1, buffer_size=100)
+        for i in range(10):
+            rd.next(3)
+        rng2.next(100, 'normal', {'mu': 0.0, 'sigma': 1.0})
+        self.assertEqual(rng1.next(), rng2.next())
+
+    def test_buffered_parallel_safe_with_mask_local(self):
+        orig_get_mpi_config = random.get_mpi_config
+        random.get_mpi_config = lambda: (1, 2)
+        rd = random.RandomDistribution('uniform', (0.0, 1.0), rng=random.NumpyRNG(seed=76), buffer_size=4)
+        expected = random.NumpyRNG(seed=76).next(10, mask_local=False)
+        random.get_mpi_config = orig_get_mpi_config
+        mask = numpy.array([0, 1, 0, 1, 0], bool)
+        self.assertEqual(rd.next(5, mask_local=mask).tolist(), expected[:5][mask].tolist())
+        self.assertEqual(rd.next(5, mask_local=mask).tolist(), expected[5:][mask].tolist())
+
+    def test_invalid_parameters(self):
+        for rng in self.rnglist:
+            self.assertRaises(KeyError, rng.next, 5, 'normal', {'mu': 0.0})
+            self.assertRaises(KeyError, rng.next, 5, 'normal', {'mu': 0.0, 'sigma': 1.0, 'low': 1.0})
+            self.assertRaises(KeyError, rng.next, 5, 'normal', {'mu': 0.0, 'tau': 1.0})
+
     def test_max_redraws(self):
-        # for certain parameterizations, clipped distributions can require a very large, possibly infinite
+        # without scipy, clipped distributions are sampled by redrawing values outside the
+        # bounds. For certain parameterizations, this can require a very large, possibly infinite
         # number of redraws. This should be caught.
-        for rng in self.rnglist:
-            rd1 = random.RandomDistribution('normal_clipped', mu=0, sigma=1, low=5, high=numpy.inf, rng=rng)
-            self.assertRaises(Exception, rd1.next, 1000)
+        orig_have_scipy = random.have_scipy
+        random.have_scipy = False
+        try:
+            for rng in self.rnglist:
+                rd1 = random.RandomDistribution('normal_clipped', mu=0, sigma=1, low=5, high=numpy.inf, rng=rng)
+                self.assertRaises(Exception, rd1.next, 1000)
+        finally:
+            random.have_scipy = orig_have_scipy
+
+    @unittest.skipUnless(random.have_scipy, "requires scipy")
+    def test_normal_clipped_tight_bounds(self):
+        for rng in self.rnglist + [random.PhiloxRNG(seed=987)]:
+            rd = random.RandomDistribution('normal_clipped', mu=1.0, sigma=2.0, low=11.0, high=numpy.inf, rng=rng)
+            vals = rd.next(10000)
+            assert vals.min() >= 11.0
+            # the mean of the standard normal distribution truncated to [5, inf) is 5.186
+            assert abs(vals.mean() - (1.0 + 2.0 * 5.186)) < 0.01, vals.mean()
+            rd = random.RandomDistribution('normal_clipped', mu=0.0, sigma=1.0, low=-50.0, high=-49.0, rng=rng)
+            vals = rd.next(1000)
+            assert vals.min() >= -50.0
+            assert vals.max() <= -49.0
+
+    @unittest.skipUnless(random.have_scipy, "requires scipy")
+    def test_truncated_normal_ppf(self):
+        u = numpy.array([0.0, 0.5, 1 - 1e-16])
+        assert_arrays_almost_equal(random.truncated_normal_ppf(u, 0.0, 1.0, -1.0, 1.0),
+                                   numpy.array([-1.0, 0.0, 1.0]), 1e-9)
+        assert_arrays_almost_equal(random.truncated_normal_ppf(u, 0.0, 1.0, 0.0, numpy.inf)[:2],
+                                   numpy.array([0.0, 0.6744897501960817]), 1e-9)
+        self.assertRaises(ValueError, random.truncated_normal_ppf, u, 0.0, 1.0, 1.0, -1.0)
 
 
 # ==============================================================================
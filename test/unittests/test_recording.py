@@ -29,6 +29,76 @@ from pyNN.utility import assert_arrays_equal
     
 #def test_gather_no_MPI():
 
+class MockComm(object):
+    """Pretend to be the root node of two MPI nodes, the other node having `other_columns`."""
+
+    def __init__(self, other_columns):
+        self.rank = 0
+        self.other_columns = list(other_columns)
+        self.sent = []
+
+    def gather(self, size, root=0):
+        return [size, self.other_columns[0].size]
+
+    allgather = gather
+
+    def Gatherv(self, sendbuf, recvbuf, root=0):
+        other = self.other_columns[len(self.sent)]
+        self.sent.append(sendbuf)
+        buf, (sizes, displacements) = recvbuf
+        assert_equal(list(displacements), [0, sizes[0]])
+        buf[:] = numpy.concatenate((sendbuf, other))
+
+    def Allgatherv(self, sendbuf, recvbuf):
+        self.Gatherv(sendbuf, recvbuf)
+
+
+def test_gather_columns():
+    orig_get_mpi_comm = recording.get_mpi_comm
+    comm = MockComm([numpy.array([7, 8]), numpy.array([0.7, 0.8])])
+    recording.get_mpi_comm = lambda: (comm, {})
+    try:
+        for all in (False, True):
+            comm.sent = []
+            indices, values = recording.gather_columns([numpy.array([1, 2, 3]),
+                                                        numpy.array([0.1, 0.2, 0.3])],
+                                                       all=all)
+            assert_arrays_equal(indices, numpy.array([1, 2, 3, 7, 8]))
+            assert_equal(indices.dtype, numpy.array([1]).dtype)  # typed buffers, not converted to float
+            assert_arrays_equal(values, numpy.array([0.1, 0.2, 0.3, 0.7, 0.8]))
+            assert_equal(len(comm.sent), 2)
+    finally:
+        recording.get_mpi_comm = orig_get_mpi_comm
+
+class MockBroadcastComm(object):
+    """Pretend to be a non-root MPI node, receiving `root_columns` from the root node."""
+
+    def __init__(self, root_columns):
+        self.rank = 1
+        self.root_columns = list(root_columns)
+        self.received = 0
+
+    def bcast(self, obj, root=0):
+        return self.root_columns[0].size
+
+    def Bcast(self, buf, root=0):
+        buf[:] = self.root_columns[self.received]
+        self.received += 1
+
+
+def test_broadcast_columns():
+    orig_get_mpi_comm = recording.get_mpi_comm
+    comm = MockBroadcastComm([numpy.array([7, 8]), numpy.array([0.7, 0.8])])
+    recording.get_mpi_comm = lambda: (comm, {})
+    try:
+        indices, values = recording.broadcast_columns([numpy.zeros((0,), dtype=int),
+                                                       numpy.zeros((0,))])
+        assert_arrays_equal(indices, numpy.array([7, 8]))
+        assert_equal(indices.dtype, numpy.array([1]).dtype)
+        assert_arrays_equal(values, numpy.array([0.7, 0.8]))
+    finally:
+        recording.get_mpi_comm = orig_get_mpi_comm
+
 #def test_gather_dict():
 
 #def test_mpi_sum():
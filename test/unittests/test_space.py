@@ -127,6 +127,24 @@ class SpaceTest(unittest.TestCase):
         self.assertArraysEqual(s.distances(self.C, self.ABCD),
                                numpy.array([sqrt(3), sqrt(4 + 4 + 4), 0.0, sqrt(4 + 1 + 0)]))
 
+    def test_neighbours(self):
+        spaces = (space.Space(),
+                  space.Space(axes='yz'),
+                  space.Space(scale_factor=2.0, offset=1.0),
+                  space.Space(periodic_boundaries=((-1.0, 4.0), None, (-1.0, 4.0))))
+        orig_have_scipy = space.have_scipy
+        try:
+            for have_scipy in (orig_have_scipy, False):
+                space.have_scipy = have_scipy
+                for s in spaces:
+                    for radius in (0.0, 2.0, 4.0, 10.0):
+                        neighbours = s.neighbours(self.ABCD, self.ABCD, radius)
+                        d = s.distances(self.ABCD, self.ABCD).reshape((4, 4))
+                        for j in range(4):
+                            assert_arrays_equal(neighbours[j], (d[:, j] <= radius).nonzero()[0])
+        finally:
+            space.have_scipy = orig_have_scipy
+
 
 class LineTest(unittest.TestCase):
 